@@ -3,9 +3,22 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import time
-import pyttsx3
 import platform
 import threading
+import os
+import json
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from adaptive_quality import DEFAULT_LEVEL, QualityController
+from exercise_rules import compile_rules, load_rules
+from frame_pipeline import StageTimer, run_pipelined, run_sequential
+from hud import BandShade, FormHud
+from pose_kernels import LandmarkBuffer
+from pose_roi import RoiTracker
+from pose_runtime import PoseRuntime
+from session_output import FORMATS, open_writer
 
 # ============================================================
 #  CONFIG
@@ -21,28 +34,37 @@ GOOD_THRESH = 0.80
 EXCELLENT_THRESH = 0.90
 MASTERED_THRESH = 0.999
 REP_SCORE_THRESHOLD = 0.80
-
-# ============================================================
-#  MEDIAPIPE SETUP
-# ============================================================
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
-
-LS = mp_pose.PoseLandmark.LEFT_SHOULDER.value
-RS = mp_pose.PoseLandmark.RIGHT_SHOULDER.value
-LH = mp_pose.PoseLandmark.LEFT_HIP.value
-RH = mp_pose.PoseLandmark.RIGHT_HIP.value
-LK = mp_pose.PoseLandmark.LEFT_KNEE.value
-LA = mp_pose.PoseLandmark.LEFT_ANKLE.value
-LW = mp_pose.PoseLandmark.LEFT_WRIST.value
-RA = mp_pose.PoseLandmark.RIGHT_ANKLE.value
-LE = mp_pose.PoseLandmark.LEFT_ELBOW.value
+EXERCISE_RULES_PATH = Path(__file__).with_name("exercise_rules.json")
+# Capture, inference and rendering on separate threads (see frame_pipeline.py).
+# The API launches MLH.py as a subprocess, so the env var reaches it too.
+PIPELINED = os.getenv("MAJKA_MLH_PIPELINED", "0") == "1"
+# Pose inference adapts model complexity and input size to hold this frame
+# rate (see adaptive_quality.py); 0 keeps complexity 1 at full resolution.
+TARGET_FPS = float(os.getenv("MAJKA_MLH_TARGET_FPS", "15"))
+FRAME_SKIP = os.getenv("MAJKA_MLH_FRAME_SKIP", "0") == "1"
+# Let the controller step up to the heavy model (complexity 2) when there is headroom.
+ALLOW_HEAVY = os.getenv("MAJKA_MLH_ALLOW_HEAVY", "0") == "1"
+# Run inference on a padded box around the previous landmarks (see pose_roi.py).
+ROI_TRACKING = os.getenv("MAJKA_MLH_ROI", "1") == "1"
 
 # ============================================================
 #  TTS SETUP (mac-friendly)
 # ============================================================
-if VOICE_ENABLED:
+# The engine is created on the first spoken cue, so headless runs never
+# import or start pyttsx3.
+tts_engine = None
+_tts_initialized = False
+tts_lock = threading.Lock()
+
+
+def _get_tts_engine():
+    global tts_engine, _tts_initialized, VOICE_ENABLED
+    if _tts_initialized:
+        return tts_engine
+    _tts_initialized = True
     try:
+        import pyttsx3
+
         if platform.system() == "Darwin":
             tts_engine = pyttsx3.init("nsss")
         else:
@@ -53,20 +75,19 @@ if VOICE_ENABLED:
         print("??  Could not initialize pyttsx3:", e)
         VOICE_ENABLED = False
         tts_engine = None
-else:
-    tts_engine = None
-
-tts_lock = threading.Lock()
+    return tts_engine
 
 
 def _speak_thread_safe(text: str):
-    if not tts_engine or not text:
+    if not text:
         return
     if not tts_lock.acquire(blocking=False):
         return
     try:
-        tts_engine.say(text)
-        tts_engine.runAndWait()
+        engine = _get_tts_engine()
+        if engine:
+            engine.say(text)
+            engine.runAndWait()
     except Exception as e:
         print("??  TTS error:", e)
     finally:
@@ -75,7 +96,7 @@ def _speak_thread_safe(text: str):
 
 
 def speak(text: str):
-    if not VOICE_ENABLED or not text or not tts_engine:
+    if not VOICE_ENABLED or not text:
         return
     try:
         threading.Thread(target=_speak_thread_safe, args=(text,), daemon=True).start()
@@ -87,14 +108,16 @@ def speak(text: str):
 #  BREATHING COACH
 # ============================================================
 class BreathingCoach:
-    """Guided breathing session that calibrates and then guides in real time."""
+    """Guided breathing session that calibrates and then guides in real time.
 
-    def __init__(self, session_duration_sec=120):
+    ``runtime`` is the process's shared ``PoseRuntime``; without one the coach
+    loads (and closes) its own model.
+    """
+
+    def __init__(self, session_duration_sec=120, runtime: PoseRuntime | None = None):
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        )
+        self._owns_runtime = runtime is None
+        self.runtime = runtime or PoseRuntime()
         self.app_state = "CALIBRATING"
         self.breath_state = "Welcome"
         self.session_duration_sec = session_duration_sec
@@ -116,6 +139,7 @@ class BreathingCoach:
         self.MOVEMENT_THRESHOLD = 0.005
         self.SHRUG_THRESHOLD = 0.015
         self.shrug_warning = False
+        self._band = BandShade(90, (60, 60, 60), 0.7)
 
     def _run_calibration_logic(self, movement, current_time):
         if movement > self.MOVEMENT_THRESHOLD:
@@ -166,7 +190,7 @@ class BreathingCoach:
         frame = cv2.flip(frame, 1)
         frame_h, frame_w, _ = frame.shape
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(rgb)
+        results = self.runtime.process(rgb)
 
         if self.session_start_time and not self.session_complete:
             if current_time - self.session_start_time > self.session_duration_sec:
@@ -202,9 +226,7 @@ class BreathingCoach:
         return self._draw_ui(frame, frame_h, frame_w)
 
     def _draw_ui(self, frame, frame_h, frame_w):
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (frame_w, 90), (60, 60, 60), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        self._band.draw(frame)
 
         if self.session_complete:
             feedback_text = "Great job! Session complete."
@@ -267,412 +289,20 @@ class BreathingCoach:
         return frame
 
     def close(self):
-        self.pose.close()
+        if self._owns_runtime:
+            self.runtime.close()
 
 
 # ============================================================
-#  GEOMETRY + SCORING
+#  EXERCISE REGISTRY
 # ============================================================
-def calculate_angle(a, b, c):
-    a = np.array(a, dtype=float)
-    b = np.array(b, dtype=float)
-    c = np.array(c, dtype=float)
-    ba = a - b
-    bc = c - b
-    denom = (np.linalg.norm(ba) * np.linalg.norm(bc)) + 1e-6
-    cosine = np.dot(ba, bc) / denom
-    cosine = np.clip(cosine, -1.0, 1.0)
-    return np.degrees(np.arccos(cosine))
-
-
-def get_xy(landmarks, idx, shape):
-    h, w, _ = shape
-    lm = landmarks[idx]
-    return np.array([lm.x * w, lm.y * h], dtype=float)
-
-
-def score_range(value, lo, hi, margin=20.0):
-    if lo <= value <= hi:
-        mid = 0.5 * (lo + hi)
-        half = 0.5 * (hi - lo)
-        if half <= 0:
-            return 1.0
-        return max(0.0, 1.0 - abs(value - mid) / half)
-    diff = lo - value if value < lo else value - hi
-    return max(0.0, 1.0 - diff / margin)
+# Evaluators are compiled from the declarative rules in EXERCISE_RULES_PATH.
+EXERCISE_REGISTRY = compile_rules(load_rules(EXERCISE_RULES_PATH), GOOD_THRESH)
 
-# ============================================================
-#  LEVEL 1 EXERCISES
-# ============================================================
-def eval_breathing(landmarks, shape):
-    feedback = [
-        "Inhale wide into your ribs and back.",
-        "Exhale slowly through the mouth.",
-        "Keep your shoulders relaxed away from your ears.",
-    ]
-    return True, feedback, 1.0
-
-
-def eval_pelvic_floor(landmarks, shape):
-    feedback = [
-        "Gently squeeze and lift around the vagina and rectum.",
-        "Hold for 3 to 5 seconds, then fully relax.",
-        "Do not hold your breath while you squeeze.",
-    ]
-    return True, feedback, 1.0
-
-
-def eval_pelvic_tilt(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    rs = get_xy(landmarks, RS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    rh = get_xy(landmarks, RH, shape)
-    shoulder_mid = (ls + rs) / 2
-    hip_mid = (lh + rh) / 2
-    w = shape[1]
-    dx = abs(shoulder_mid[0] - hip_mid[0])
-    score = max(0.0, 1.0 - dx / (0.15 * w + 1e-6))
-    score = float(np.clip(score, 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if not correct:
-        feedback.append("Keep your ribs stacked over your pelvis, not leaning too far.")
-    else:
-        feedback.append("Nice neutral posture. Gently rock your pelvis forward and back.")
-    return correct, feedback, score
-
-
-def eval_heel_slide(landmarks, shape):
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    la = get_xy(landmarks, LA, shape)
-    knee_angle = calculate_angle(lh, lk, la)
-    score_angle = score_range(knee_angle, 80, 180, margin=30)
-    pelvis_shift = abs(lh[1] - lk[1])
-    score_pelvis = max(0.0, 1.0 - pelvis_shift / (0.2 * shape[0] + 1e-6))
-    score = float(np.clip(min(score_angle, score_pelvis), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_angle < GOOD_THRESH:
-        feedback.append("Slide your heel slowly along the floor, keep your knee pointing to the ceiling.")
-    else:
-        feedback.append("Straighten the leg fully, then bend back in with control.")
-    if score_pelvis < GOOD_THRESH:
-        feedback.append("Keep your pelvis steady, avoid rocking side to side.")
-    return correct, feedback, score
-
-
-def eval_glute_bridge(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    hip_angle = calculate_angle(ls, lh, lk)
-    score = score_range(hip_angle, 160, 210, margin=30)
-    score = float(np.clip(score, 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if hip_angle < 160:
-        feedback.append("Lift your hips so your body makes a straight line from shoulders to knees.")
-    elif hip_angle > 210:
-        feedback.append("Keep your ribs soft, avoid arching your low back too much.")
-    else:
-        feedback.append("Nice bridge height. Keep ribs soft and glutes gently engaged.")
-    return correct, feedback, score
-
-
-def eval_walking(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    rs = get_xy(landmarks, RS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    rh = get_xy(landmarks, RH, shape)
-    shoulder_mid = (ls + rs) / 2
-    hip_mid = (lh + rh) / 2
-    dx = abs(shoulder_mid[0] - hip_mid[0])
-    dy = abs(shoulder_mid[1] - hip_mid[1])
-    score_balance = max(0.0, 1.0 - dx / (0.20 * shape[1] + 1e-6))
-    score_shoulder_relax = max(0.0, 1.0 - dy / (0.10 * shape[0] + 1e-6))
-    score = float(np.clip(min(score_balance, score_shoulder_relax), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_balance < GOOD_THRESH:
-        feedback.append("Keep your chest stacked over your hips, not leaning too far.")
-    else:
-        feedback.append("Nice upright posture. Take short, easy steps.")
-    if score_shoulder_relax < GOOD_THRESH:
-        feedback.append("Relax the shoulders and let your arms swing naturally.")
-    return correct, feedback, score
 
-# ============================================================
-#  LEVEL 2 EXERCISES
-# ============================================================
-def eval_squat(landmarks, shape):
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    la = get_xy(landmarks, LA, shape)
-    ls = get_xy(landmarks, LS, shape)
-    knee_angle = calculate_angle(lh, lk, la)
-    torso_angle = calculate_angle(ls, lh, lk)
-    score_knee = score_range(knee_angle, 60, 170, margin=30)
-    score_torso = score_range(torso_angle, 140, 200, margin=40)
-    score = float(np.clip(min(score_knee, score_torso), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_knee < 0.7 and knee_angle > 140:
-        feedback.append("Sit a bit lower into your squat, like sitting back into a chair.")
-    elif score_knee < 0.7 and knee_angle < 60:
-        feedback.append("You are going very deep, only go as low as feels safe.")
-    else:
-        feedback.append("Good squat depth, keep weight in the middle of your feet.")
-    if score_torso < GOOD_THRESH:
-        feedback.append("Keep your chest more lifted, avoid collapsing forward.")
-    return correct, feedback, score
-
-
-def eval_lunge(landmarks, shape):
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    la = get_xy(landmarks, LA, shape)
-    knee_angle = calculate_angle(lh, lk, la)
-    score_angle = score_range(knee_angle, 70, 130, margin=25)
-    knee_foot_x = abs(lk[0] - la[0])
-    score_stack = max(0.0, 1.0 - knee_foot_x / (0.15 * shape[1] + 1e-6))
-    score = float(np.clip(min(score_angle, score_stack), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_angle < GOOD_THRESH:
-        feedback.append("Bend your front knee so it is roughly over your ankle.")
-    else:
-        feedback.append("Nice lunge position, keep your front knee over your ankle.")
-    if score_stack < GOOD_THRESH:
-        feedback.append("Keep your front knee stacked over your foot, not drifting inward or outward.")
-    return correct, feedback, score
-
-
-def eval_bird_dog(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    rs = get_xy(landmarks, RS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    rh = get_xy(landmarks, RH, shape)
-    lw = get_xy(landmarks, LW, shape)
-    ra = get_xy(landmarks, RA, shape)
-    feedback = []
-    sd = abs(ls[1] - rs[1])
-    hd = abs(lh[1] - rh[1])
-    score_level = max(0.0, 1.0 - max(sd, hd) / (0.05 * shape[0] + 1e-6))
-    trunk_vec = (rh + lh) / 2 - (rs + ls) / 2
-    arm_vec = lw - ls
-    leg_vec = ra - rh
-
-    def ang(v1, v2):
-        v1 = v1 / (np.linalg.norm(v1) + 1e-6)
-        v2 = v2 / (np.linalg.norm(v2) + 1e-6)
-        return np.degrees(np.arccos(np.clip(np.dot(v1, v2), -1.0, 1.0)))
-
-    arm_angle = ang(trunk_vec, arm_vec)
-    leg_angle = ang(trunk_vec, leg_vec)
-    score_arm = max(0.0, 1.0 - arm_angle / 40.0)
-    score_leg = max(0.0, 1.0 - leg_angle / 40.0)
-    score = float(np.clip(min(score_level, score_arm, score_leg), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    if score_level < GOOD_THRESH:
-        feedback.append("Keep your hips and shoulders level, avoid tilting to one side.")
-    else:
-        feedback.append("Nice level hips and shoulders.")
-    if score_arm < GOOD_THRESH:
-        feedback.append("Reach your arm straight forward from your shoulder, not out to the side.")
-    if score_leg < GOOD_THRESH:
-        feedback.append("Reach your leg straight back from your hip, not out to the side.")
-    if correct:
-        feedback.append("Great bird-dog. Keep your core gently engaged and breathe.")
-    return correct, feedback, score
-
-
-def eval_dead_bug(landmarks, shape):
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    la = get_xy(landmarks, LA, shape)
-    ls = get_xy(landmarks, LS, shape)
-    le = get_xy(landmarks, LE, shape)
-    lw = get_xy(landmarks, LW, shape)
-    hip_knee_angle = calculate_angle(lh, lk, la)
-    shoulder_angle = calculate_angle(ls, le, lw)
-    score_legs = score_range(hip_knee_angle, 70, 180, margin=25)
-    score_arms = score_range(shoulder_angle, 70, 180, margin=30)
-    score = float(np.clip(min(score_legs, score_arms), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_legs < 0.7 and hip_knee_angle < 70:
-        feedback.append("Bend your knees to about 90 degrees over your hips.")
-    elif score_legs < 0.7 and hip_knee_angle > 170:
-        feedback.append("Extend your leg fully, then return to 90 degrees.")
-    else:
-        feedback.append("Good leg position, keep your shins parallel to the floor.")
-    if score_arms < GOOD_THRESH:
-        feedback.append("Reach your arms toward the ceiling with soft elbows.")
-    else:
-        feedback.append("Nice arm position, keep ribs heavy toward the mat.")
-    return correct, feedback, score
-
-
-def eval_modified_plank(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    body_angle = calculate_angle(ls, lh, lk)
-    score = score_range(body_angle, 160, 200, margin=30)
-    score = float(np.clip(score, 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if correct:
-        feedback.append("Nice plank line. Keep your neck long and breathe steadily.")
-    else:
-        feedback.append("Aim for a straight line from shoulders through hips to knees.")
-    return correct, feedback, score
-
-
-def eval_bent_over_row(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    le = get_xy(landmarks, LE, shape)
-    lw = get_xy(landmarks, LW, shape)
-    torso_angle = calculate_angle(lk, lh, ls)
-    score_torso = score_range(torso_angle, 120, 180, margin=30)
-    elbow_angle = calculate_angle(ls, le, lw)
-    score_elbow = score_range(elbow_angle, 60, 170, margin=40)
-    score = float(np.clip(min(score_torso, score_elbow), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_torso < GOOD_THRESH:
-        feedback.append("Hinge from your hips with a flat back, not rounding.")
-    else:
-        feedback.append("Nice hip hinge. Keep your back flat as you row.")
-    if score_elbow < 0.7 and elbow_angle > 150:
-        feedback.append("Pull your elbows back, squeezing shoulder blades.")
-    elif score_elbow < 0.7 and elbow_angle < 70:
-        feedback.append("Lower the weight fully with control.")
-    return correct, feedback, score
-
-
-def eval_bicep_curl(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    le = get_xy(landmarks, LE, shape)
-    lw = get_xy(landmarks, LW, shape)
-    elbow_angle = calculate_angle(ls, le, lw)
-    score = score_range(elbow_angle, 40, 150, margin=40)
-    score = float(np.clip(score, 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if elbow_angle < 40:
-        feedback.append("Lower your hands a bit and fully straighten without locking.")
-    elif elbow_angle > 150:
-        feedback.append("Curl your hands up toward your shoulders with control.")
-    else:
-        feedback.append("Great curl range. Keep your elbows close to your ribs.")
-    return correct, feedback, score
-
-
-def eval_overhead_press(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    le = get_xy(landmarks, LE, shape)
-    lw = get_xy(landmarks, LW, shape)
-    elbow_angle = calculate_angle(ls, le, lw)
-    score = score_range(elbow_angle, 70, 170, margin=30)
-    score = float(np.clip(score, 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if elbow_angle < 70:
-        feedback.append("Start with elbows bent, hands near shoulders.")
-    elif elbow_angle > 170:
-        feedback.append("Press fully up, but avoid locking your elbows.")
-    else:
-        feedback.append("Press up toward the ceiling, keeping ribs down and spine neutral.")
-    return correct, feedback, score
-
-# ============================================================
-#  LEVEL 3 EXERCISES
-# ============================================================
-def eval_single_leg_deadlift(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    lk = get_xy(landmarks, LK, shape)
-    ra = get_xy(landmarks, RA, shape)
-    torso_angle = calculate_angle(lk, lh, ls)
-    score_torso = score_range(torso_angle, 120, 180, margin=30)
-    body_vec = ls - lh
-    leg_vec = ra - lh
-    body_vec = body_vec / (np.linalg.norm(body_vec) + 1e-6)
-    leg_vec = leg_vec / (np.linalg.norm(leg_vec) + 1e-6)
-    angle = np.degrees(np.arccos(np.clip(np.dot(body_vec, leg_vec), -1.0, 1.0)))
-    score_leg = max(0.0, 1.0 - angle / 40.0)
-    score = float(np.clip(min(score_torso, score_leg), 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if score_torso < GOOD_THRESH:
-        feedback.append("Hinge from your hips with a long spine, like a see-saw.")
-    else:
-        feedback.append("Nice hip hinge. Keep your back long and core engaged.")
-    if score_leg < GOOD_THRESH:
-        feedback.append("Reach your back leg in line with your torso, not hanging down.")
-    return correct, feedback, score
-
-
-def eval_squat_jump(landmarks, shape):
-    correct, feedback, score = eval_squat(landmarks, shape)
-    feedback.insert(0, "Focus on a soft landing with knees tracking over toes.")
-    return correct, feedback, score
-
-
-def eval_run_intervals(landmarks, shape):
-    return eval_walking(landmarks, shape)
-
-
-def eval_hiit(landmarks, shape):
-    ls = get_xy(landmarks, LS, shape)
-    rs = get_xy(landmarks, RS, shape)
-    lh = get_xy(landmarks, LH, shape)
-    rh = get_xy(landmarks, RH, shape)
-    shoulder_mid = (ls + rs) / 2
-    hip_mid = (lh + rh) / 2
-    dx = abs(shoulder_mid[0] - hip_mid[0])
-    score = max(0.0, 1.0 - dx / (0.25 * shape[1] + 1e-6))
-    score = float(np.clip(score, 0.0, 1.0))
-    correct = score >= GOOD_THRESH
-    feedback = []
-    if correct:
-        feedback.append("Nice upright posture. Keep moves controlled and breathe.")
-    else:
-        feedback.append("Keep your chest more stacked over your hips while you move.")
-    return correct, feedback, score
-
-# ============================================================
-#  EXERCISE REGISTRY
-# ============================================================
-EXERCISE_REGISTRY = {
-    "breathing": {"label": "Breathing Coach", "type": "breathing"},
-    "pelvic_floor": {"label": "Pelvic Floor", "fn": eval_pelvic_floor},
-    "pelvic_tilt": {"label": "Pelvic Tilt", "fn": eval_pelvic_tilt},
-    "heel_slide": {"label": "Heel Slide", "fn": eval_heel_slide},
-    "glute_bridge": {"label": "Glute Bridge", "fn": eval_glute_bridge},
-    "walking": {"label": "Walking", "fn": eval_walking},
-    "bodyweight_squat": {"label": "Bodyweight Squat", "fn": eval_squat},
-    "stationary_lunge": {"label": "Stationary Lunge", "fn": eval_lunge},
-    "bird_dog": {"label": "Bird-Dog", "fn": eval_bird_dog},
-    "dead_bug": {"label": "Dead Bug", "fn": eval_dead_bug},
-    "modified_plank": {"label": "Modified Plank", "fn": eval_modified_plank},
-    "bent_over_row": {"label": "Bent-Over Row", "fn": eval_bent_over_row},
-    "bicep_curl": {"label": "Bicep Curl", "fn": eval_bicep_curl},
-    "overhead_press": {"label": "Overhead Press", "fn": eval_overhead_press},
-    "goblet_squat": {"label": "Goblet Squat", "fn": eval_squat},
-    "weighted_lunge": {"label": "Weighted Lunge", "fn": eval_lunge},
-    "single_leg_deadlift": {"label": "Single-Leg Deadlift", "fn": eval_single_leg_deadlift},
-    "squat_jump": {"label": "Squat Jump", "fn": eval_squat_jump},
-    "run_intervals": {"label": "Run/Walk", "fn": eval_run_intervals},
-    "hiit": {"label": "HIIT Posture", "fn": eval_hiit},
-}
-
-
-def _resolve_capture():
+def _resolve_capture(source: str | None = None):
+    if source is not None:
+        return cv2.VideoCapture(source)
     backend_flag = None
     system_name = platform.system()
     if system_name == "Darwin":
@@ -687,159 +317,375 @@ def _resolve_capture():
 
 
 # ============================================================
-#  MAIN LOOP
+#  FORM SESSION
 # ============================================================
-def main(selected_exercise: str | None = None):
-    cap = _resolve_capture()
-    if not cap.isOpened():
-        print("? Could not open camera")
-        return
+@dataclass
+class FormFrame:
+    """One analysed frame, handed from the inference stage to rendering."""
+
+    frame: np.ndarray
+    points: np.ndarray | None = None
+    feedback: list = field(default_factory=list)
+    score: float = 0.0
+    smooth_score: float = 0.0
+    status_text: str = "NO POSE"
+    status_color: tuple = (128, 128, 128)
+    quality: str = ""
+    sub_scores: np.ndarray | None = None
+    index: int = 0
+    timestamp: float = 0.0
+
+
+class FormSession:
+    """Scores frames for one exercise: evaluation, smoothing and spoken cues."""
+
+    def __init__(
+        self,
+        evaluator,
+        controller: QualityController | None = None,
+        roi: RoiTracker | None = None,
+        voice: bool = True,
+        timer: StageTimer | None = None,
+    ):
+        self.evaluator = evaluator
+        self.controller = controller
+        self.roi = roi
+        self.voice = voice
+        # Per-step timings (flip, resize, cvtColor, pose, evaluate, smoothing).
+        self.timer = timer
+        self.landmark_buffer = LandmarkBuffer()
+        self.global_score = 0.0
+        self.last_level = None
+        self.last_speech_time = 0.0
+        # Last two inferred landmark sets, for frames the controller skips.
+        self._last_points = None
+        self._prev_points = None
+        self._since_inference = 0
+
+    def _stage(self, name: str):
+        return self.timer.time(name) if self.timer else nullcontext()
+
+    def analyze(self, pose, frame) -> FormFrame:
+        stage = self._stage
+        with stage("flip"):
+            frame = cv2.flip(frame, 1)
+        controller, roi = self.controller, self.roi
+        quality_level = controller.level if controller else DEFAULT_LEVEL
+        quality = " ".join(part.status() for part in (controller, roi) if part)
+        if controller and self._last_points is not None and controller.skip_frame():
+            points = self._extrapolate(quality_level.skip)
+        else:
+            started = time.perf_counter()
+            crop, origin = roi.crop(frame) if roi else (frame, None)
+            small = crop
+            if quality_level.scale != 1.0:
+                scale = quality_level.scale
+                with stage("resize"):
+                    small = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            with stage("cvtColor"):
+                rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            with stage("pose"):
+                results = pose.process(rgb)
+            if controller:
+                controller.observe(time.perf_counter() - started)
+            points = None
+            if results.pose_landmarks:
+                # Landmarks are normalised to the crop; origin moves them into the frame.
+                landmarks = results.pose_landmarks.landmark
+                # A copy: the buffer is refilled by the next frame, possibly while
+                # this one is still being drawn.
+                points = self.landmark_buffer.load(landmarks, crop.shape, origin).copy()
+            if roi:
+                roi.update(points, frame.shape)
+            self._prev_points, self._last_points = self._last_points, points
+            self._since_inference = 0
+        if points is None:
+            self.global_score *= (1 - SMOOTHING_FACTOR)
+            return FormFrame(frame, smooth_score=self.global_score, quality=quality)
+
+        with stage("evaluate"):
+            correct, feedback, score, sub_scores = self.evaluator.assess(points, frame.shape)
+        with stage("smoothing"):
+            score = float(np.clip(score, 0.0, 1.0))
+            self.global_score = (1 - SMOOTHING_FACTOR) * self.global_score + SMOOTHING_FACTOR * score
+            smooth_score = self.global_score
+            score_pct = int(smooth_score * 100)
+
+            if smooth_score >= MASTERED_THRESH:
+                level = "MASTERED"
+            elif smooth_score >= EXCELLENT_THRESH:
+                level = "EXCELLENT"
+            elif smooth_score >= GOOD_THRESH:
+                level = "GOOD"
+            else:
+                level = "ADJUST"
 
-    last_speech_time = 0.0
-    global_score = 0.0
-    last_level = None
-    session_start = time.time()
+            g = int(255 * smooth_score)
+            r = int(255 * (1.0 - smooth_score))
+            if self.voice:
+                self._speak(level, smooth_score, feedback)
+        return FormFrame(
+            frame,
+            points=points,
+            feedback=feedback,
+            score=score,
+            smooth_score=smooth_score,
+            status_text=f"{level} ({score_pct}%)",
+            status_color=(0, g, r),
+            quality=quality,
+            sub_scores=sub_scores,
+        )
 
-    exercise_key = (selected_exercise or CURRENT_EXERCISE) or "glute_bridge"
-    cfg = EXERCISE_REGISTRY.get(exercise_key, EXERCISE_REGISTRY["glute_bridge"])
-    window_title = cfg["label"]
-    evaluator = cfg.get("fn")
-    is_breathing = cfg.get("type") == "breathing"
-    breathing_coach = BreathingCoach(SESSION_DURATION_SECONDS) if is_breathing else None
-
-    with mp_pose.Pose(
-        static_image_mode=False,
-        model_complexity=1,
-        smooth_landmarks=True,
-        enable_segmentation=False,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-    ) as pose:
-        while cap.isOpened():
-            if time.time() - session_start >= SESSION_DURATION_SECONDS:
-                print("[INFO] Majka session complete - auto closing after 6 minutes.")
-                break
+    def _extrapolate(self, skip: int) -> np.ndarray:
+        """Landmarks for a skipped frame, continuing the last inferred motion."""
+        self._since_inference += 1
+        if self._prev_points is None:
+            return self._last_points
+        step = self._since_inference / skip
+        return self._last_points + (self._last_points - self._prev_points) * step
+
+    def _speak(self, level, smooth_score, feedback):
+        now = time.time()
+        if smooth_score < GOOD_THRESH and feedback and now - self.last_speech_time > SPEECH_INTERVAL:
+            speak(feedback[0])
+            self.last_speech_time = now
+        if level != self.last_level and smooth_score >= GOOD_THRESH:
+            if level == "GOOD":
+                speak("Good form, keep it up.")
+            elif level == "EXCELLENT":
+                speak("Excellent form.")
+            elif level == "MASTERED":
+                speak("You have mastered this movement.")
+            self.last_level = level
+
+
+class ProfileOverlay:
+    """``--profile-hud``: live per-stage mean/p95 timings in the top-right corner."""
+
+    def __init__(self, timer: StageTimer, refresh_frames: int = 15):
+        self.timer = timer
+        self.refresh_frames = refresh_frames
+        self._lines = []
+        self._frames = 0
+
+    def draw(self, frame: np.ndarray) -> np.ndarray:
+        if self._frames % self.refresh_frames == 0:
+            self._lines = [("ms", "mean", "p95")] + [
+                (stage, f"{values['mean_ms']:.1f}", f"{values['p95_ms']:.1f}")
+                for stage, values in self.timer.summary().items()
+            ]
+        self._frames += 1
+        width, line_h = 200, 16
+        x0, y0 = max(0, frame.shape[1] - width - 10), 50
+        y1 = min(frame.shape[0], y0 + line_h * len(self._lines) + 8)
+        # Darken only the panel, not the whole frame.
+        panel = frame[y0:y1, x0 : x0 + width]
+        panel //= 3
+        for i, columns in enumerate(self._lines):
+            y = y0 + 14 + i * line_h
+            for text, x in zip(columns, (x0 + 6, x0 + 100, x0 + 150)):
+                cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_PLAIN, 0.9, (255, 255, 255), 1, cv2.LINE_AA)
+        return frame
+
+
+def score_video(input_path, evaluator, pose, writer=None, roi_tracking: bool = ROI_TRACKING) -> dict:
+    """Score every frame of a clip with an already loaded ``pose`` (a ``PoseRuntime``).
+
+    This is ``--input --headless`` without the CLI around it. ``mlh_batch.py``
+    workers call it so one model serves many clips; the model is reset first so
+    tracking state from the previous clip does not leak into this one.
+    """
+    cap = _resolve_capture(str(input_path))
+    if not cap.isOpened():
+        raise OSError(f"Could not open {input_path}")
+    pose.reset()
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    session = FormSession(evaluator, roi=RoiTracker() if roi_tracking else None, voice=False)
+    frames = pose_frames = 0
+    score_total = 0.0
+    started = time.perf_counter()
+    try:
+        while True:
             ok, frame = cap.read()
             if not ok:
                 break
+            result = session.analyze(pose, frame)
+            result.index = frames
+            result.timestamp = frames / video_fps if video_fps else 0.0
+            if writer:
+                writer.write(result)
+            frames += 1
+            if result.points is not None:
+                pose_frames += 1
+                score_total += result.score
+    finally:
+        cap.release()
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": frames,
+        "pose_frames": pose_frames,
+        "mean_score": round(score_total / pose_frames, 4) if pose_frames else None,
+        "final_smooth_score": round(session.global_score, 4),
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else None,
+    }
 
-            if is_breathing and breathing_coach:
-                processed = breathing_coach.process_frame(frame)
-                cv2.imshow(window_title, processed)
-                if (
-                    cv2.getWindowProperty(window_title, cv2.WND_PROP_VISIBLE) < 1
-                    or cv2.waitKey(1) & 0xFF == ord("q")
-                    or breathing_coach.session_complete
-                ):
-                    break
-                continue
 
-            frame = cv2.flip(frame, 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(rgb)
+# ============================================================
+#  MAIN LOOP
+# ============================================================
+def main(
+    selected_exercise: str | None = None,
+    rules_path: str | None = None,
+    pipelined: bool = PIPELINED,
+    target_fps: float = TARGET_FPS,
+    frame_skip: bool = FRAME_SKIP,
+    roi_tracking: bool = ROI_TRACKING,
+    input_path: str | None = None,
+    headless: bool = False,
+    output_path: str | None = None,
+    profile_hud: bool = False,
+    runtime: PoseRuntime | None = None,
+):
+    """Run one session. Pass ``runtime`` to reuse a loaded model across sessions; it is left open."""
+    cap = _resolve_capture(input_path)
+    if not cap.isOpened():
+        print(f"? Could not open {input_path or 'camera'}")
+        return
 
-            status_text = "NO POSE"
-            status_color = (128, 128, 128)
-            feedback = []
-            score = 0.0
-            smooth_score = global_score
+    session_start = time.time()
 
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                correct, feedback, score = evaluator(landmarks, frame.shape)
-                score = float(np.clip(score, 0.0, 1.0))
-                global_score = (1 - SMOOTHING_FACTOR) * global_score + SMOOTHING_FACTOR * score
-                smooth_score = global_score
-                score_pct = int(smooth_score * 100)
-
-                if smooth_score >= MASTERED_THRESH:
-                    level = "MASTERED"
-                elif smooth_score >= EXCELLENT_THRESH:
-                    level = "EXCELLENT"
-                elif smooth_score >= GOOD_THRESH:
-                    level = "GOOD"
-                else:
-                    level = "ADJUST"
-
-                status_text = f"{level} ({score_pct}%)"
-                g = int(255 * smooth_score)
-                r = int(255 * (1.0 - smooth_score))
-                line_color = (0, g, r)
-                status_color = line_color
-
-                mp_drawing.draw_landmarks(
-                    frame,
-                    results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    landmark_drawing_spec=mp_drawing.DrawingSpec(color=line_color, thickness=8, circle_radius=8),
-                    connection_drawing_spec=mp_drawing.DrawingSpec(color=line_color, thickness=6, circle_radius=4),
-                )
-                h, w, _ = frame.shape
-                for lm in landmarks:
-                    x = int(lm.x * w)
-                    y = int(lm.y * h)
-                    cv2.circle(frame, (x, y), 12, line_color, -1)
-
-                now = time.time()
-                if smooth_score < GOOD_THRESH and feedback and now - last_speech_time > SPEECH_INTERVAL:
-                    speak(feedback[0])
-                    last_speech_time = now
-                if level != last_level and smooth_score >= GOOD_THRESH:
-                    if level == "GOOD":
-                        speak("Good form, keep it up.")
-                    elif level == "EXCELLENT":
-                        speak("Excellent form.")
-                    elif level == "MASTERED":
-                        speak("You have mastered this movement.")
-                    last_level = level
-            else:
-                global_score *= (1 - SMOOTHING_FACTOR)
-                smooth_score = global_score
-
-            cv2.rectangle(frame, (0, 0), (frame.shape[1], 40), (0, 0, 0), -1)
-            cv2.putText(
-                frame,
-                f"{window_title}: {status_text}",
-                (10, 25),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                status_color,
-                2,
-                cv2.LINE_AA,
-            )
+    exercise_key = (selected_exercise or CURRENT_EXERCISE) or "glute_bridge"
+    registry = (
+        compile_rules(load_rules(rules_path), GOOD_THRESH) if rules_path else EXERCISE_REGISTRY
+    )
+    cfg = registry.get(exercise_key, registry["glute_bridge"])
+    window_title = cfg["label"]
+    is_breathing = cfg.get("type") == "breathing"
+    if is_breathing and (headless or output_path):
+        print("? Breathing sessions have no form score to record")
+        cap.release()
+        return
+    owns_runtime = runtime is None
+    if owns_runtime:
+        runtime = PoseRuntime(DEFAULT_LEVEL.complexity)
+    else:
+        # A previous session's controller may have left it at another complexity.
+        runtime.configure(DEFAULT_LEVEL.complexity)
+    print(f"[INFO] Pose model: {runtime.status()}")
+    breathing_coach = BreathingCoach(SESSION_DURATION_SECONDS, runtime) if is_breathing else None
+    hud = FormHud(window_title)
+    timer = StageTimer()
+    overlay = ProfileOverlay(timer) if profile_hud else None
+    # Clips are scored frame by frame as fast as possible: no dropped frames,
+    # no quality trade-offs, no wall-clock session limit.
+    from_file = input_path is not None
+    if from_file:
+        pipelined, target_fps, frame_skip = False, 0, False
+    video_fps = cap.get(cv2.CAP_PROP_FPS) if from_file else 0
+    writer = open_writer(output_path, cfg["evaluator"].score_names) if output_path else None
+    frame_index = -1
+
+    def read():
+        nonlocal frame_index
+        if not cap.isOpened():
+            return None
+        ok, frame = cap.read()
+        if not ok:
+            return None
+        frame_index += 1
+        if video_fps:
+            timestamp = frame_index / video_fps
+        else:
+            timestamp = time.time() - session_start
+        return frame_index, timestamp, frame
+
+    def render(item) -> bool:
+        if not from_file and time.time() - session_start >= SESSION_DURATION_SECONDS:
+            print("[INFO] Majka session complete - auto closing after 6 minutes.")
+            return False
+        if writer:
+            writer.write(item)
+        if headless:
+            return True
+        if is_breathing:
+            frame = item
+        else:
+            with timer.time("draw"):
+                frame = hud.draw(item, int(time.time() - session_start))
+        if overlay:
+            frame = overlay.draw(frame)
+        cv2.imshow(window_title, frame)
+        if cv2.getWindowProperty(window_title, cv2.WND_PROP_VISIBLE) < 1:
+            return False
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            return False
+        return not (breathing_coach and breathing_coach.session_complete)
+
+    controller = None
+    if target_fps > 0 and not is_breathing:
+        controller = QualityController(target_fps, allow_skip=frame_skip, allow_upgrade=ALLOW_HEAVY)
+        print(f"[INFO] Pose quality: targeting {target_fps:g} fps, starting at {controller.level.label}")
+    form_session = None
+    logged_changes = 0
+    try:
+        if breathing_coach:
 
-            elapsed = int(time.time() - session_start)
-            cv2.putText(frame, f"Time: {elapsed}s", (frame.shape[1] - 150, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
-
-            bar_h = 20
-            bar_y = frame.shape[0] - bar_h - 40
-            bar_x1, bar_x2 = 10, frame.shape[1] - 10
-            cv2.rectangle(frame, (bar_x1, bar_y), (bar_x2, bar_y + bar_h), (50, 50, 50), -1)
-            fill_x = bar_x1 + int((bar_x2 - bar_x1) * smooth_score)
-            cv2.rectangle(frame, (bar_x1, bar_y), (fill_x, bar_y + bar_h), status_color, -1)
-            cv2.putText(frame, f"Form: {int(smooth_score * 100)}%", (bar_x1 + 5, bar_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
-
-            cv2.putText(
-                frame,
-                "Stop if you feel pain, dizziness, or pelvic pressure.",
-                (10, frame.shape[0] - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (200, 200, 200),
-                1,
-                cv2.LINE_AA,
-            )
+            def process(entry):
+                return breathing_coach.process_frame(entry[2])
 
-            cv2.imshow(window_title, frame)
-            if cv2.getWindowProperty(window_title, cv2.WND_PROP_VISIBLE) < 1:
-                break
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                break
+        else:
+            roi = RoiTracker() if roi_tracking else None
+            form_session = FormSession(cfg["evaluator"], controller, roi, voice=not headless, timer=timer)
+
+            def process(entry):
+                nonlocal logged_changes
+                if controller and len(controller.changes) > logged_changes:
+                    for change in controller.changes[logged_changes:]:
+                        print(
+                            f"[INFO] Pose quality: {change['from']} -> {change['to']} "
+                            f"({change['ms_per_frame']} ms/frame, budget {change['budget_ms']} ms)"
+                        )
+                    logged_changes = len(controller.changes)
+                    if runtime.configure(controller.level.complexity):
+                        print(f"[INFO] Pose model: {runtime.status()}")
+                index, timestamp, frame = entry
+                result = form_session.analyze(runtime, frame)
+                result.index, result.timestamp = index, timestamp
+                return result
+
+        run = run_pipelined if pipelined else run_sequential
+        stats = run(read, process, render, timer)
+    finally:
+        if owns_runtime:
+            runtime.close()
+        if writer:
+            writer.close()
 
     cap.release()
-    cv2.destroyAllWindows()
+    if not headless:
+        cv2.destroyAllWindows()
     if breathing_coach:
         breathing_coach.close()
+    mode = "pipelined" if pipelined else "sequential"
+    print(f"[INFO] Stage timings ({mode}): {timer.report(stats)}")
+    if controller:
+        print(f"[INFO] Pose quality: ended at {controller.status()} after {len(controller.changes)} change(s)")
+    if form_session and form_session.roi:
+        print(f"[INFO] ROI: {form_session.roi.summary()}")
+    if from_file or headless:
+        elapsed = time.perf_counter() - timer.started
+        summary = {
+            "input": input_path or "camera",
+            "exercise": exercise_key,
+            "frames": stats["frames"],
+            "seconds": round(elapsed, 3),
+            "fps": round(stats["frames"] / elapsed, 2) if elapsed > 0 else None,
+            "final_smooth_score": round(form_session.global_score, 4) if form_session else None,
+            "output": output_path,
+        }
+        print(json.dumps(summary))
+        return summary
 
 
 if __name__ == "__main__":
@@ -850,5 +696,68 @@ if __name__ == "__main__":
         default=CURRENT_EXERCISE,
         help="Exercise key from EXERCISE_REGISTRY (e.g., bird_dog)",
     )
+    parser.add_argument(
+        "--rules",
+        type=str,
+        default=None,
+        help="Exercise rules JSON to use instead of exercise_rules.json",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action=argparse.BooleanOptionalAction,
+        default=PIPELINED,
+        help="Run capture, pose inference and rendering on separate threads",
+    )
+    parser.add_argument(
+        "--target-fps",
+        type=float,
+        default=TARGET_FPS,
+        help="Frame rate the pose quality controller aims for (0 disables it)",
+    )
+    parser.add_argument(
+        "--frame-skip",
+        action=argparse.BooleanOptionalAction,
+        default=FRAME_SKIP,
+        help="Allow running pose inference on alternate frames when still too slow",
+    )
+    parser.add_argument(
+        "--roi",
+        action=argparse.BooleanOptionalAction,
+        default=ROI_TRACKING,
+        help="Crop pose inference to the region around the previous landmarks",
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        default=None,
+        help="Score a recorded video instead of the camera, frame by frame",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="No window and no voice; use with --input and --output",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help=f"Per-frame landmarks, sub-scores, smoothed score and feedback ({', '.join(FORMATS)})",
+    )
+    parser.add_argument(
+        "--profile-hud",
+        action="store_true",
+        help="Overlay live per-stage timings (flip, cvtColor, pose, evaluate, draw, ...)",
+    )
     args = parser.parse_args()
-    main(args.exercise)
+    main(
+        args.exercise,
+        args.rules,
+        args.pipelined,
+        args.target_fps,
+        args.frame_skip,
+        args.roi,
+        args.input,
+        args.headless,
+        args.output,
+        args.profile_hud,
+    )
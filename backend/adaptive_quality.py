@@ -0,0 +1,141 @@
+"""Keeps pose inference within a frame-rate target by trading accuracy for speed.
+
+``mp_pose.Pose`` used to always run at ``model_complexity=1`` on full-resolution
+frames, which drops below 10 FPS on low-end laptops, so the feedback lags the
+movement. ``QualityController`` measures every inference and walks a ladder of
+``QualityLevel``s, ordered from most to least expensive:
+
+* ``complexity``: the BlazePose model (0 lite, 1 full, 2 heavy).
+* ``scale``: the input downscale factor applied before ``pose.process``.
+  Landmarks are normalised, so they map back to the full frame unchanged.
+* ``skip``: run inference on one frame in ``skip``. The landmarks for the
+  frames in between are extrapolated from the last two inferences (opt-in).
+
+It steps down when the smoothed cost per displayed frame stays above the
+budget (``1 / target_fps``) for ``patience`` inferences. It steps up when the
+level above is expected to fit with some headroom, but never above the level
+it started at unless ``allow_upgrade`` is set: the heavy model only helps if
+the machine can hold it, and probing it costs a reload each way. A level it
+had to step down from is never tried again in that session, so it cannot
+oscillate between two levels. The first ``warmup`` inferences after a change
+are ignored, since a complexity switch reloads the model and re-runs
+detection. Only the standard library is needed.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    complexity: int
+    scale: float
+    skip: int = 1
+
+    @property
+    def label(self) -> str:
+        text = f"c{self.complexity} {int(self.scale * 100)}%"
+        return f"{text} 1/{self.skip}" if self.skip > 1 else text
+
+
+# Most to least expensive. Index 1 is the previous fixed setting.
+LEVELS = (
+    QualityLevel(2, 1.0),
+    QualityLevel(1, 1.0),
+    QualityLevel(1, 0.75),
+    QualityLevel(1, 0.5),
+    QualityLevel(0, 0.75),
+    QualityLevel(0, 0.5),
+    QualityLevel(0, 0.5, skip=2),
+    QualityLevel(0, 0.5, skip=3),
+)
+DEFAULT_LEVEL = QualityLevel(1, 1.0)
+
+
+class QualityController:
+    def __init__(
+        self,
+        target_fps: float,
+        levels=LEVELS,
+        start: QualityLevel = DEFAULT_LEVEL,
+        allow_skip: bool = False,
+        allow_upgrade: bool = False,
+        patience: int = 10,
+        warmup: int = 5,
+        headroom: float = 0.8,
+        smoothing: float = 0.2,
+    ):
+        self.levels = [level for level in levels if allow_skip or level.skip == 1]
+        self.index = self.levels.index(start) if start in self.levels else 0
+        self.top = 0 if allow_upgrade else self.index
+        self.target_fps = target_fps
+        self.budget = 1.0 / target_fps
+        self.patience = patience
+        self.warmup = warmup
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.cost = None
+        self.changes = []
+        self._known: dict[int, float] = {}
+        self._too_slow: set[int] = set()
+        self._observed = 0
+        self._over = 0
+        self._under = 0
+        self._frame = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    def skip_frame(self) -> bool:
+        """Call once per frame; ``True`` when this frame should reuse the last landmarks."""
+        skip = self.level.skip
+        self._frame += 1
+        return skip > 1 and self._frame % skip != 0
+
+    def observe(self, seconds: float) -> QualityLevel | None:
+        """Record one inference; returns the new level when it changed."""
+        self._observed += 1
+        if self._observed <= self.warmup:
+            return None
+        self.cost = seconds if self.cost is None else self.cost + self.smoothing * (seconds - self.cost)
+        per_frame = self.cost / self.level.skip
+        self._known[self.index] = per_frame
+
+        self._over = self._over + 1 if per_frame > self.budget else 0
+        self._under = self._under + 1 if self._fits(self.index - 1, per_frame) else 0
+        if self._over >= self.patience and self.index < len(self.levels) - 1:
+            self._too_slow.add(self.index)
+            return self._move(self.index + 1, per_frame)
+        if self._under >= self.patience * 3 and self.index > self.top:
+            return self._move(self.index - 1, per_frame)
+        return None
+
+    def _fits(self, index: int, current: float) -> bool:
+        if index < self.top or index in self._too_slow:
+            return False
+        known = self._known.get(index)
+        if known is not None:
+            return known < self.budget * self.headroom
+        # Unmeasured: only try it with plenty of room to spare.
+        return current < self.budget * self.headroom / 2
+
+    def _move(self, index: int, per_frame: float) -> QualityLevel:
+        previous = self.level
+        self.index = index
+        self.cost = None
+        self._observed = self._over = self._under = 0
+        self.changes.append(
+            {
+                "from": previous.label,
+                "to": self.level.label,
+                "ms_per_frame": round(per_frame * 1000, 1),
+                "budget_ms": round(self.budget * 1000, 1),
+            }
+        )
+        return self.level
+
+    def status(self) -> str:
+        """Short HUD text, e.g. ``c1 75% 38ms``."""
+        if self.cost is None:
+            return self.level.label
+        return f"{self.level.label} {self.cost * 1000:.0f}ms"
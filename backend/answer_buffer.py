@@ -0,0 +1,218 @@
+"""Write-behind buffer for intake answers.
+
+``save_answer`` can acknowledge a click as soon as the answer is appended to a
+local SQLite (WAL) queue. A background thread drains the queue to Supabase in
+batches, every ``flush_interval_ms`` or as soon as ``flush_batch`` answers are
+waiting. Until then, read paths overlay ``pending_for(mother_id)`` on top of
+what Supabase returns so a mother always sees her own latest answers.
+Unflushed rows survive a restart and are flushed on the next start.
+
+All API workers on a host share one buffer file. The overlay is read from
+that file rather than kept in memory, so a read served by one worker sees
+answers queued by another. Only the holder of the ``flush_lease`` row
+flushes, so two workers never write the same rows, or an older answer after a
+newer one. A crashed holder's lease expires after ``LEASE_SECONDS``.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from .logging_setup import get_logger
+
+log = get_logger("majka.answers")
+
+# Longer than any flush (one Supabase round trip per mother in the batch).
+LEASE_SECONDS = 60.0
+
+
+class AnswerBuffer:
+    def __init__(
+        self,
+        path: str,
+        flush,
+        flush_interval_ms: int = 250,
+        flush_batch: int = 100,
+        on_flushed=None,
+        synchronous: str = "NORMAL",
+    ):
+        # ``flush(rows)`` persists a list of answer dicts and raises on failure;
+        # ``on_flushed(mother_ids)`` runs after a batch is stored.
+        self._flush_fn = flush
+        self._on_flushed = on_flushed
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_batch = flush_batch
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending_answers (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                mother_id INTEGER NOT NULL,
+                question_id INTEGER NOT NULL,
+                answer_text TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS pending_answers_mother ON pending_answers (mother_id)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS flush_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("INSERT OR IGNORE INTO flush_lease (id, owner, expires_at) VALUES (1, '', 0)")
+        self._owner = f"{os.getpid()}:{id(self)}"
+        self._lock = threading.Lock()
+        # Held for the duration of a flush so retakes cannot interleave with it.
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="majka-answer-flusher", daemon=True
+                )
+                self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            while self.flush_pending():
+                pass
+        except Exception as exc:
+            log.error(
+                "answers.final_flush_failed", still_queued=self.pending_count(), error=str(exc)
+            )
+
+    def append(self, mother_id: int, question_id: int, answer_text: str, created_at: str) -> int:
+        """Durably queue one answer and return its sequence number."""
+        self.start()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO pending_answers (mother_id, question_id, answer_text, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (mother_id, question_id, answer_text, created_at),
+            )
+            seq = cur.lastrowid
+            backlog = self._conn.execute("SELECT COUNT(*) FROM pending_answers").fetchone()[0]
+        if backlog >= self.flush_batch:
+            self._wakeup.set()
+        return seq
+
+    def pending_for(self, mother_id: int) -> dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question_id, answer_text FROM pending_answers WHERE mother_id = ? ORDER BY seq",
+                (mother_id,),
+            ).fetchall()
+        # Later clicks on the same question win.
+        return dict(rows)
+
+    def pending_count(self) -> int:
+        """Queued (mother, question) pairs, across every process sharing the file."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM pending_answers GROUP BY mother_id, question_id)"
+            ).fetchone()[0]
+
+    def discard_mother(self, mother_id: int):
+        """Drop queued answers for ``mother_id`` (used by retakes)."""
+        with self._flush_lock:
+            deadline = time.monotonic() + LEASE_SECONDS
+            # Wait out another worker's flush so it cannot re-add these rows afterwards.
+            while not self._claim_lease() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            try:
+                with self._lock:
+                    self._conn.execute("DELETE FROM pending_answers WHERE mother_id = ?", (mother_id,))
+            finally:
+                self._release_lease()
+
+    def _claim_lease(self) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE flush_lease SET owner = ?, expires_at = ? "
+                "WHERE id = 1 AND (owner = ? OR expires_at < ?)",
+                (self._owner, now + LEASE_SECONDS, self._owner, now),
+            )
+        return cur.rowcount == 1
+
+    def _release_lease(self):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE flush_lease SET expires_at = 0 WHERE id = 1 AND owner = ?", (self._owner,)
+            )
+
+    def flush_pending(self) -> int:
+        """Flush one batch now; returns the number of queued rows written.
+
+        Returns 0 without flushing while another process holds the lease.
+        """
+        with self._flush_lock:
+            if not self._claim_lease():
+                return 0
+            try:
+                flushed, mother_ids = self._flush_batch()
+            finally:
+                self._release_lease()
+        if mother_ids and self._on_flushed:
+            self._on_flushed(mother_ids)
+        return flushed
+
+    def _flush_batch(self) -> tuple[int, set[int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, mother_id, question_id, answer_text, created_at "
+                "FROM pending_answers ORDER BY seq LIMIT ?",
+                (self.flush_batch,),
+            ).fetchall()
+        if not rows:
+            return 0, set()
+
+        # Only the newest answer per (mother, question) needs to be written.
+        latest: dict[tuple[int, int], dict] = {}
+        for seq, mother_id, question_id, answer_text, created_at in rows:
+            latest[(mother_id, question_id)] = {
+                "seq": seq,
+                "mother_id": mother_id,
+                "question_id": question_id,
+                "answer_text": answer_text,
+                "created_at": created_at,
+            }
+        self._flush_fn(list(latest.values()))
+
+        # Newer clicks queued meanwhile have higher seqs and stay in the overlay.
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM pending_answers WHERE seq = ?", [(row[0],) for row in rows]
+            )
+        return len(rows), {mother_id for mother_id, _ in latest}
+
+    def _run(self):
+        backoff = self.flush_interval
+        while not self._stopping.is_set():
+            self._wakeup.wait(backoff)
+            self._wakeup.clear()
+            try:
+                while self.flush_pending() >= self.flush_batch:
+                    pass
+                backoff = self.flush_interval
+            except Exception as exc:
+                backoff = min(backoff * 2, 30.0)
+                log.warning("answers.flush_failed", retry_in=backoff, error=str(exc))
@@ -0,0 +1,171 @@
+"""Minimal in-process stand-in for Supabase's PostgREST API, for benchmarks.
+
+Serves ``/rest/v1/<table>`` from in-memory rows with ``eq.``/``in.`` filters,
+accepts inserts and deletes, and answers ``/rest/v1/rpc/<fn>`` through
+registered Python callables. It keeps HTTP/1.1 connections alive and counts
+accepted TCP connections (``GET /__stats``) so benchmarks can show connection
+reuse. Run it as a script to serve from a separate process, which keeps the
+server's threads from competing with the client for the GIL.
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class FakePostgrest:
+    def __init__(
+        self,
+        tables: dict[str, list[dict]] | None = None,
+        latency_ms: float = 0.0,
+        connect_latency_ms: float = 0.0,
+    ):
+        self.tables = tables or {}
+        self.rpcs = {}
+        self.latency = latency_ms / 1000
+        # Emulates TCP + TLS handshake cost paid by every new connection.
+        self.connect_latency = connect_latency_ms / 1000
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def register_rpc(self, name: str, fn):
+        self.rpcs[name] = fn
+
+    def start(self, port: int = 0):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this,
+                # Nagle + delayed ACKs add ~40 ms to every keep-alive response.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with fake._lock:
+                    fake.connections += 1
+                if fake.connect_latency:
+                    time.sleep(fake.connect_latency)
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def _handle(self):
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                parsed = urlparse(self.path)
+                if parsed.path == "/__stats":
+                    return self._send(
+                        200, {"connections": fake.connections, "requests": fake.requests}
+                    )
+                parts = parsed.path.strip("/").split("/")
+                if parts[:2] != ["rest", "v1"]:
+                    return self._send(404, {"message": "not found"})
+                if parts[2] == "rpc":
+                    fn = fake.rpcs.get(parts[3])
+                    if fn is None:
+                        return self._send(404, {"message": f"unknown rpc {parts[3]}"})
+                    return self._send(200, fn(**(self._body() or {})))
+                table = fake.tables.setdefault(parts[2], [])
+                filters = _parse_filters(parse_qsl(parsed.query))
+                if self.command == "GET":
+                    return self._send(200, [row for row in table if _matches(row, filters)])
+                if self.command == "POST":
+                    rows = self._body()
+                    rows = rows if isinstance(rows, list) else [rows]
+                    for row in rows:
+                        row.setdefault("id", len(table) + 1)
+                        table.append(row)
+                    return self._send(201, rows)
+                if self.command == "DELETE":
+                    # Drain any body so the keep-alive connection stays in sync.
+                    self._body()
+                    removed = [row for row in table if _matches(row, filters)]
+                    table[:] = [row for row in table if not _matches(row, filters)]
+                    return self._send(200, removed)
+                self._body()
+                return self._send(405, {"message": "method not allowed"})
+
+            do_GET = do_POST = do_DELETE = do_PATCH = _handle
+
+        self._server = _Server(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _parse_filters(query):
+    filters = []
+    for key, value in query:
+        if key in ("select", "order", "limit", "offset"):
+            continue
+        op, _, operand = value.partition(".")
+        filters.append((key, op, operand))
+    return filters
+
+
+def _matches(row: dict, filters) -> bool:
+    for column, op, operand in filters:
+        value = row.get(column)
+        # PostgREST spells booleans the JSON way (``eq.true``).
+        value = json.dumps(value) if isinstance(value, bool) else str(value)
+        if op == "eq" and value != operand:
+            return False
+        if op == "in" and value not in operand.strip("()").split(","):
+            return False
+        if op == "lte" and not float(row.get(column) or 0) <= float(operand):
+            return False
+        if op == "gt" and not float(row.get(column) or 0) > float(operand):
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake PostgREST API.")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0)
+    parser.add_argument("--tables", help="JSON file mapping table names to rows.")
+    args = parser.parse_args()
+    tables = json.loads(open(args.tables).read()) if args.tables else {}
+    server = FakePostgrest(
+        tables, latency_ms=args.latency_ms, connect_latency_ms=args.connect_latency_ms
+    ).start(args.port)
+    print(f"Fake PostgREST listening on {server.url}", flush=True)
+    server._thread.join()
@@ -0,0 +1,166 @@
+"""Per-frame HUD render time: the cached ``hud.FormHud`` against the previous drawing code.
+
+``legacy_form`` is ``draw_form_frame`` as it was before ``hud.py``, with
+``mp_drawing.draw_landmarks`` written out as the ``cv2`` calls it makes
+(a line per connection, then two circles per visible landmark), so the bench
+does not need MediaPipe. ``legacy_breathing`` is the old
+``BreathingCoach._draw_ui`` band shading. Each case draws onto a fresh copy
+of a synthetic frame with a random pose; only the drawing is timed. The
+report also has the largest per-pixel difference between the two outputs for
+the HUD without a skeleton (the old code drew mp joints with a white ring
+that the new one does not).
+
+Usage:
+    python backend/bench/hud_render.py --frames 500
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hud import BandShade, FormHud  # noqa: E402
+from pose_kernels import LANDMARK_COUNT, POSE_CONNECTIONS  # noqa: E402
+
+RESOLUTIONS = ((640, 480), (1280, 720))
+WHITE = (224, 224, 224)
+
+
+def legacy_form(result, window_title: str, elapsed: int) -> np.ndarray:
+    frame = result.frame
+    smooth_score = result.smooth_score
+    status_color = result.status_color
+
+    if result.points is not None:
+        line_color = status_color
+        pixels = result.points[:LANDMARK_COUNT, :2].astype(np.int32).tolist()
+        h, w = frame.shape[:2]
+        visible = {
+            i: (min(int(x), w - 1), min(int(y), h - 1))
+            for i, (x, y, _, v) in enumerate(result.points[:LANDMARK_COUNT].tolist())
+            if v >= 0.5 and 0 <= x <= w and 0 <= y <= h
+        }
+        for a, b in POSE_CONNECTIONS:
+            if a in visible and b in visible:
+                cv2.line(frame, visible[a], visible[b], line_color, 6)
+        for center in visible.values():
+            cv2.circle(frame, center, 9, WHITE, 8)
+            cv2.circle(frame, center, 8, line_color, 8)
+        for x, y in pixels:
+            cv2.circle(frame, (x, y), 12, line_color, -1)
+
+    cv2.rectangle(frame, (0, 0), (frame.shape[1], 40), (0, 0, 0), -1)
+    cv2.putText(frame, f"{window_title}: {result.status_text}", (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, status_color, 2, cv2.LINE_AA)
+    cv2.putText(frame, f"Time: {elapsed}s", (frame.shape[1] - 150, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+    if result.quality:
+        cv2.putText(frame, f"Pose: {result.quality}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1, cv2.LINE_AA)
+
+    bar_h = 20
+    bar_y = frame.shape[0] - bar_h - 40
+    bar_x1, bar_x2 = 10, frame.shape[1] - 10
+    cv2.rectangle(frame, (bar_x1, bar_y), (bar_x2, bar_y + bar_h), (50, 50, 50), -1)
+    fill_x = bar_x1 + int((bar_x2 - bar_x1) * smooth_score)
+    cv2.rectangle(frame, (bar_x1, bar_y), (fill_x, bar_y + bar_h), status_color, -1)
+    cv2.putText(frame, f"Form: {int(smooth_score * 100)}%", (bar_x1 + 5, bar_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(frame, "Stop if you feel pain, dizziness, or pelvic pressure.", (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1, cv2.LINE_AA)
+    return frame
+
+
+def legacy_breathing(frame: np.ndarray) -> np.ndarray:
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 0), (frame.shape[1], 90), (60, 60, 60), -1)
+    cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+    return frame
+
+
+def _result(frame, points, score):
+    return SimpleNamespace(
+        frame=frame,
+        points=points,
+        smooth_score=score,
+        status_text=f"GOOD ({int(score * 100)}%)",
+        status_color=(0, int(255 * score), int(255 * (1 - score))),
+        quality="c1 x1.00 roi 42%",
+    )
+
+
+def _random_pose(rng, w, h):
+    points = rng.random((LANDMARK_COUNT + 2, 4)).astype(np.float32)
+    points[:, 0] = w * (0.3 + 0.4 * points[:, 0])
+    points[:, 1] = h * (0.1 + 0.8 * points[:, 1])
+    points[:, 3] = 0.4 + 0.6 * points[:, 3]
+    return points
+
+
+def _time(draw, base, frames) -> list[float]:
+    samples = []
+    for i in range(frames):
+        frame = base.copy()
+        started = time.perf_counter()
+        draw(frame, i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _stats(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 4),
+    }
+
+
+def bench_resolution(w: int, h: int, frames: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    poses = [_random_pose(rng, w, h) for _ in range(16)]
+    scores = rng.random(16).tolist()
+    hud = FormHud("Bird Dog")
+    shade = BandShade(90, (60, 60, 60), 0.7)
+    # The clock text changes once a second: at 30 fps, every 30th frame.
+    cases = {
+        "form_legacy": lambda f, i: legacy_form(_result(f, poses[i % 16], scores[i % 16]), "Bird Dog", i // 30),
+        "form_cached": lambda f, i: hud.draw(_result(f, poses[i % 16], scores[i % 16]), i // 30),
+        "breathing_legacy": lambda f, i: legacy_breathing(f),
+        "breathing_cached": lambda f, i: shade.draw(f),
+    }
+    report = {name: _stats(_time(draw, base, frames)) for name, draw in cases.items()}
+    for kind in ("form", "breathing"):
+        before, after = report[f"{kind}_legacy"]["mean_ms"], report[f"{kind}_cached"]["mean_ms"]
+        report[f"{kind}_speedup"] = round(before / after, 2) if after else None
+
+    old, new = base.copy(), base.copy()
+    legacy_form(_result(old, None, 0.5), "Bird Dog", 7)
+    FormHud("Bird Dog").draw(_result(new, None, 0.5), 7)
+    report["form_max_pixel_diff"] = int(np.abs(old.astype(np.int16) - new).max())
+    old, new = base.copy(), base.copy()
+    legacy_breathing(old)
+    shade.draw(new)
+    report["breathing_max_pixel_diff"] = int(np.abs(old.astype(np.int16) - new).max())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=500)
+    args = parser.parse_args()
+    results = {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "frames": args.frames,
+        "resolutions": {f"{w}x{h}": bench_resolution(w, h, args.frames) for w, h in RESOLUTIONS},
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
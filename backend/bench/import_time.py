@@ -0,0 +1,91 @@
+"""Import-time benchmark for ``backend.main``.
+
+Runs ``python -X importtime -c "import backend.main"`` in a fresh interpreter,
+reports the cumulative import cost and the slowest modules, and fails when the
+budget is exceeded or when one of the lazily loaded SDKs sneaks back into the
+import graph.
+
+Usage:
+    python backend/bench/import_time.py --budget-ms 800
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Modules that must only be imported on first use, never by ``import backend.main``.
+DEFERRED_MODULES = ("google.generativeai", "supabase", "postgrest", "bcrypt")
+
+
+def measure(module: str = "backend.main") -> list[tuple[str, int, int]]:
+    env = dict(os.environ)
+    env.setdefault("SUPABASE_URL", "http://localhost:54321")
+    env.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+    env.setdefault("GEMINI_API_KEY", "bench")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Import of {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable summary.")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_us = next((cum for name, _, cum in rows if name == args.module), 0)
+    loaded = {name for name, _, _ in rows}
+    leaked = sorted(
+        name
+        for name in loaded
+        if any(name == mod or name.startswith(mod + ".") for mod in DEFERRED_MODULES)
+    )
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[: args.top]
+
+    summary = {
+        "module": args.module,
+        "total_ms": round(total_us / 1000, 2),
+        "modules_loaded": len(loaded),
+        "deferred_modules_loaded": leaked,
+        "slowest_self_ms": [[name, round(self_us / 1000, 2)] for name, self_us, _ in slowest],
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{args.module}: {summary['total_ms']} ms cumulative, {len(loaded)} modules")
+        for name, self_ms in summary["slowest_self_ms"]:
+            print(f"  {self_ms:>8.2f} ms  {name}")
+        if leaked:
+            print(f"Deferred modules imported eagerly: {', '.join(leaked)}")
+
+    failed = bool(leaked)
+    if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+        print(f"Import budget exceeded: {summary['total_ms']} ms > {args.budget_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
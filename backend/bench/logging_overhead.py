@@ -0,0 +1,90 @@
+"""Measure what logging a plan prompt costs the request thread.
+
+stdout is replaced by a pipe drained by a deliberately slow reader, like a
+container log driver under pressure. Each simulated request emits one
+prompt-sized record, first with ``print`` (the old behaviour) and then through
+``logging_setup``'s queue pipeline. The script reports per-call latency on the
+emitting thread.
+
+Usage:
+    python backend/bench/logging_overhead.py --requests 2000 --drain-mb-per-s 4
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+
+def _slow_pipe(drain_bytes_per_s: float):
+    read_fd, write_fd = os.pipe()
+
+    def drain():
+        chunk = 4096
+        with os.fdopen(read_fd, "rb") as reader:
+            while reader.read1(chunk):
+                time.sleep(chunk / drain_bytes_per_s)
+
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+    return os.fdopen(write_fd, "w", buffering=1), thread
+
+
+def _summary(mode: str, latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mode": mode,
+        "calls": len(ordered),
+        "p50_us": round(statistics.median(ordered) * 1e6, 1),
+        "p99_us": round(ordered[int(len(ordered) * 0.99) - 1] * 1e6, 1),
+        "max_ms": round(ordered[-1] * 1e3, 2),
+        "total_ms": round(sum(ordered) * 1e3, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--prompt-chars", type=int, default=4000)
+    parser.add_argument("--drain-mb-per-s", type=float, default=4.0)
+    args = parser.parse_args()
+
+    from backend.logging_setup import bind_request, configure_logging, get_logger
+    from backend.metrics import metrics
+
+    prompt = ("Q: How are you feeling? A: Tired but okay. " * 200)[: args.prompt_chars]
+    drain_rate = args.drain_mb_per_s * 1024 * 1024
+    results = []
+
+    stream, _ = _slow_pipe(drain_rate)
+    latencies = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        print(prompt, file=stream)
+        latencies.append(time.perf_counter() - started)
+    results.append(_summary("print", latencies))
+
+    stream, _ = _slow_pipe(drain_rate)
+    configure_logging(stream=stream, level="DEBUG", sample="")
+    log = get_logger("majka.bench")
+    latencies = []
+    for i in range(args.requests):
+        bind_request(f"req-{i}")
+        started = time.perf_counter()
+        log.debug("plan.prompt", chars=len(prompt), prompt=prompt)
+        latencies.append(time.perf_counter() - started)
+    results.append(_summary("queue", latencies))
+    results[-1]["dropped"] = metrics.snapshot()["counters"].get("log.dropped", 0)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""End-to-end guided-session cost per exercise, replayed from fixture videos.
+
+Each exercise in ``EXERCISE_REGISTRY`` runs in a fresh process. That process
+loads the pose model and plays the fixture clip (looping it if it is short)
+through the same code as a live session: ``FormSession.analyze`` (flip,
+cvtColor, pose, evaluate, smoothing), then ``FormHud.draw``. There is no
+window and no voice. ``breathing`` runs ``BreathingCoach.process_frame`` as a
+single stage. The report has, per exercise, every stage's mean and p95, the
+end-to-end ``frame`` time, FPS, model load time and memory (from
+``PoseRuntime``) and peak RSS. A fresh process per exercise keeps the RSS
+numbers separate. Write it with ``--output`` and pass a previous file as
+``--compare`` to fail on FPS regressions.
+
+Needs OpenCV and MediaPipe, plus one clip with a person in view: ``--clip``
+for every exercise, and/or ``--fixtures DIR`` holding ``<exercise>.<ext>``.
+
+Usage:
+    python backend/bench/mlh_pipeline.py --clip fixtures/squat.mp4 --frames 300 --output mlh.json
+    python backend/bench/mlh_pipeline.py --fixtures fixtures/ --compare mlh.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+from exercise_rules import load_rules  # noqa: E402
+
+VIDEO_SUFFIXES = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _fixture_for(key: str, clip: str | None, fixtures: Path | None) -> str | None:
+    if fixtures:
+        for suffix in VIDEO_SUFFIXES:
+            path = fixtures / f"{key}{suffix}"
+            if path.exists():
+                return str(path)
+    return clip
+
+
+def bench_exercise(key: str, clip: str, frames: int, roi_tracking: bool) -> dict:
+    """Runs in a child process; returns this exercise's report."""
+    sys.path.insert(0, str(BACKEND))
+    import cv2
+    import MLH
+    from frame_pipeline import StageTimer
+    from hud import FormHud
+    from pose_roi import RoiTracker
+    from pose_runtime import PoseRuntime
+
+    cfg = MLH.EXERCISE_REGISTRY[key]
+    timer = StageTimer(window=frames)
+    rss_before = _peak_rss_mb()
+    runtime = PoseRuntime(MLH.DEFAULT_LEVEL.complexity)
+    started = time.perf_counter()
+    if cfg.get("type") == "breathing":
+        coach = MLH.BreathingCoach(MLH.SESSION_DURATION_SECONDS, runtime)
+
+        def frame_cost(frame):
+            with timer.time("breathing"):
+                coach.process_frame(frame)
+
+    else:
+        session = MLH.FormSession(
+            cfg["evaluator"],
+            roi=RoiTracker() if roi_tracking else None,
+            voice=False,
+            timer=timer,
+        )
+        hud = FormHud(cfg["label"])
+
+        def frame_cost(frame):
+            result = session.analyze(runtime, frame)
+            with timer.time("draw"):
+                hud.draw(result, int(time.perf_counter() - started))
+
+    cap = cv2.VideoCapture(clip)
+    if not cap.isOpened():
+        raise OSError(f"Could not open {clip}")
+    total = 0.0
+    done = 0
+    reopened = False
+    try:
+        while done < frames:
+            with timer.time("capture"):
+                ok, frame = cap.read()
+            if not ok:
+                # Loop the clip; a clip that yields nothing right after reopening never will.
+                if reopened:
+                    raise OSError(f"Could not read any frame from {clip}")
+                cap.release()
+                cap = cv2.VideoCapture(clip)
+                reopened = True
+                continue
+            reopened = False
+            frame_started = time.perf_counter()
+            frame_cost(frame)
+            elapsed = time.perf_counter() - frame_started
+            timer.record("frame", elapsed)
+            total += elapsed
+            done += 1
+    finally:
+        cap.release()
+        runtime.close()
+    return {
+        "clip": clip,
+        "frames": done,
+        "fps": round(done / total, 2) if total else None,
+        "model_load_ms": round(runtime.load_ms, 1),
+        "model_memory_mb": round(runtime.memory_mb, 1) if runtime.memory_mb is not None else None,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": timer.summary(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Exercises whose FPS dropped by more than ``tolerance`` against ``baseline``."""
+    regressions = []
+    for key, current in results["exercises"].items():
+        before = baseline.get("exercises", {}).get(key)
+        if not before or not before.get("fps") or not current.get("fps"):
+            continue
+        change = current["fps"] / before["fps"] - 1
+        print(f"  {key:<20} {before['fps']:8.1f} -> {current['fps']:8.1f} fps ({change:+.1%})", file=sys.stderr)
+        if change < -tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clip", default=None, help="Fixture clip for every exercise")
+    parser.add_argument("--fixtures", default=None, help="Directory of <exercise>.<ext> clips")
+    parser.add_argument("--exercises", default=None, help="Comma-separated subset of exercise keys")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per exercise (the clip loops)")
+    parser.add_argument("--roi", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--compare", default=None, help="Previous report to check FPS against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed FPS drop (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    fixtures = Path(args.fixtures) if args.fixtures else None
+    keys = list(load_rules(BACKEND / "exercise_rules.json"))
+    if args.exercises:
+        keys = [key for key in keys if key in args.exercises.split(",")]
+
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "frames": args.frames,
+        "roi": args.roi,
+        "exercises": {},
+    }
+    context = multiprocessing.get_context("spawn")
+    for key in keys:
+        clip = _fixture_for(key, args.clip, fixtures)
+        if not clip:
+            print(f"[bench] {key}: no fixture clip, skipped", file=sys.stderr)
+            continue
+        # One exercise per process, one at a time, so RSS and timings do not mix.
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            report = pool.submit(bench_exercise, key, clip, args.frames, args.roi).result()
+        results["exercises"][key] = report
+        print(f"[bench] {key}: {report['fps']} fps, peak RSS {report['peak_rss_mb']} MB", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+
+    if args.compare:
+        print("[bench] FPS against baseline:", file=sys.stderr)
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            raise SystemExit(f"FPS regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
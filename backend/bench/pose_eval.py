@@ -0,0 +1,175 @@
+"""Per-frame cost of turning pose landmarks into evaluator features.
+
+Compares the previous per-joint path (``get_xy`` per landmark, then
+``calculate_angle`` re-wrapping each triplet in new arrays) with
+``LandmarkBuffer`` plus one ``PoseKernel`` call. ``frame`` timings also
+include the 33 pixel coordinates the main loop draws, which the buffer
+already holds. It runs the MLH evaluators' feature sets over random
+landmarks, so it needs neither MediaPipe nor a camera.
+
+``rules`` times every compiled ``exercise_rules.json`` evaluator per frame
+and, for offline scoring, over a whole batch of frames in one call.
+
+Usage:
+    python backend/bench/pose_eval.py --frames 20000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from exercise_rules import compile_rules, load_rules  # noqa: E402
+from pose_kernels import (  # noqa: E402
+    LEFT_ANKLE as LA,
+    LEFT_ELBOW as LE,
+    LEFT_HIP as LH,
+    LEFT_KNEE as LK,
+    LEFT_SHOULDER as LS,
+    LEFT_WRIST as LW,
+    LANDMARK_COUNT,
+    MID_HIP,
+    MID_SHOULDER,
+    RIGHT_ANKLE as RA,
+    RIGHT_HIP as RH,
+    RIGHT_SHOULDER as RS,
+    X,
+    Y,
+    LandmarkBuffer,
+    PoseKernel,
+    between,
+    joint,
+)
+
+RULES_PATH = Path(__file__).resolve().parents[1] / "exercise_rules.json"
+
+# Feature sets of the MLH evaluators (as compiled from exercise_rules.json).
+CASES = {
+    "heel_slide": ([joint(LH, LK, LA)], [(LH, LK, Y)]),
+    "squat": ([joint(LH, LK, LA), joint(LS, LH, LK)], []),
+    "bird_dog": (
+        [between(MID_SHOULDER, MID_HIP, LS, LW), between(MID_SHOULDER, MID_HIP, RH, RA)],
+        [(LS, RS, Y), (LH, RH, Y)],
+    ),
+    "dead_bug": ([joint(LH, LK, LA), joint(LS, LE, LW)], []),
+    "walking": ([], [(MID_SHOULDER, MID_HIP, X), (MID_SHOULDER, MID_HIP, Y)]),
+}
+
+
+def _legacy_get_xy(landmarks, idx, shape):
+    h, w, _ = shape
+    lm = landmarks[idx]
+    return np.array([lm.x * w, lm.y * h], dtype=float)
+
+
+def _legacy_angle(u0, u1, v0, v1):
+    a = np.array(u1, dtype=float)
+    b = np.array(u0, dtype=float)
+    c = np.array(v1, dtype=float)
+    d = np.array(v0, dtype=float)
+    ba = a - b
+    bc = c - d
+    denom = (np.linalg.norm(ba) * np.linalg.norm(bc)) + 1e-6
+    return np.degrees(np.arccos(np.clip(np.dot(ba, bc) / denom, -1.0, 1.0)))
+
+
+def _legacy_point(landmarks, idx, shape):
+    if idx == MID_SHOULDER:
+        return (_legacy_get_xy(landmarks, LS, shape) + _legacy_get_xy(landmarks, RS, shape)) / 2
+    if idx == MID_HIP:
+        return (_legacy_get_xy(landmarks, LH, shape) + _legacy_get_xy(landmarks, RH, shape)) / 2
+    return _legacy_get_xy(landmarks, idx, shape)
+
+
+def legacy_features(landmarks, shape, angles, deltas):
+    values = []
+    for spec in angles:
+        values.append(_legacy_angle(*(_legacy_point(landmarks, i, shape) for i in spec)))
+    for i, j, axis in deltas:
+        values.append(abs(_legacy_point(landmarks, i, shape)[axis] - _legacy_point(landmarks, j, shape)[axis]))
+    return values
+
+
+def legacy_frame(landmarks, shape, angles, deltas):
+    values = legacy_features(landmarks, shape, angles, deltas)
+    h, w, _ = shape
+    return values, [(int(lm.x * w), int(lm.y * h)) for lm in landmarks]
+
+
+def kernel_frame(buffer, kernel, landmarks, shape):
+    points = buffer.load(landmarks, shape)
+    return kernel(points), points[:LANDMARK_COUNT, :2].astype(np.int32).tolist()
+
+
+def _time(fn, frames) -> list[float]:
+    latencies = []
+    for landmarks in frames:
+        started = time.perf_counter()
+        fn(landmarks)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _summary(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 2),
+        "p95_us": round(ordered[int(len(ordered) * 0.95) - 1] * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    shape = (720, 1280, 3)
+    frames = [
+        [SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in rng.random((33, 4)).tolist()]
+        for _ in range(min(args.frames, 2000))
+    ]
+    frames = (frames * (args.frames // len(frames) + 1))[: args.frames]
+
+    buffer = LandmarkBuffer()
+    results = {
+        "frames": args.frames,
+        "landmark_load": _summary(_time(lambda lms: buffer.load(lms, shape), frames)),
+        "cases": {},
+    }
+    for name, (angles, deltas) in CASES.items():
+        kernel = PoseKernel(angles=angles, deltas=deltas)
+        points = buffer.load(frames[0], shape)
+        case = {
+            "features_before": _summary(_time(lambda lms: legacy_features(lms, shape, angles, deltas), frames)),
+            "kernel_only": _summary(_time(lambda _: kernel(points), frames)),
+            "frame_before": _summary(_time(lambda lms: legacy_frame(lms, shape, angles, deltas), frames)),
+            "frame_after": _summary(_time(lambda lms: kernel_frame(buffer, kernel, lms, shape), frames)),
+        }
+        case["frame_speedup"] = round(case["frame_before"]["mean_us"] / case["frame_after"]["mean_us"], 2)
+        results["cases"][name] = case
+
+    registry = compile_rules(load_rules(RULES_PATH), 0.8)
+    batch = np.stack([buffer.load(lms, shape).copy() for lms in frames])
+    results["rules"] = {}
+    for key, cfg in registry.items():
+        evaluator = cfg.get("evaluator")
+        if evaluator is None:
+            continue
+        per_frame = _summary(_time(lambda lms: evaluator.evaluate(buffer.load(lms, shape), shape), frames))
+        started = time.perf_counter()
+        evaluator.sub_scores(evaluator.features(batch), shape).min(axis=-1, initial=1.0)
+        batched_us = (time.perf_counter() - started) / len(frames) * 1e6
+        results["rules"][key] = {"per_frame": per_frame, "batched_us_per_frame": round(batched_us, 3)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
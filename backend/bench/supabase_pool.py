@@ -0,0 +1,138 @@
+"""Compare Supabase client transports against the fake PostgREST server.
+
+Runs the same concurrent read/write mix through a client built with the
+library defaults and through ``http_transport.build_http_client`` and reports
+latency percentiles plus how many TCP connections each had to open.
+
+The fake server runs over plain HTTP, so HTTP/2 does not apply here; the
+difference comes from pool sizing and keep-alive (connection reuse).
+
+Usage:
+    python backend/bench/supabase_pool.py --requests 2000 --concurrency 40
+"""
+
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(tables: dict, latency_ms: float, connect_latency_ms: float):
+    """Run the fake server in its own process so it does not share our GIL."""
+    port = _free_port()
+    tables_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    json.dump(tables, tables_file)
+    tables_file.close()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            str(HERE / "fake_postgrest.py"),
+            "--port",
+            str(port),
+            "--latency-ms",
+            str(latency_ms),
+            "--connect-latency-ms",
+            str(connect_latency_ms),
+            "--tables",
+            tables_file.name,
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    proc.stdout.readline()  # wait for the "listening" line
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def _connections(url: str) -> int:
+    with urllib.request.urlopen(f"{url}/__stats") as resp:
+        return json.loads(resp.read())["connections"]
+
+
+def _run(client, total: int, concurrency: int) -> list[float]:
+    def one(i: int) -> float:
+        started = time.perf_counter()
+        if i % 5 == 0:
+            client.table("answers").insert(
+                {"mother_id": i % 50, "question_id": 1, "answer_text": "ok"}
+            ).execute()
+        else:
+            client.table("questions").select("id,text").eq("is_active", True).execute()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(total)))
+
+
+def _summary(name: str, latencies: list[float], wall: float, connections: int) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "transport": name,
+        "requests": len(latencies),
+        "wall_seconds": round(wall, 3),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1] * 1000, 2),
+        "connections_opened": connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--connect-latency-ms",
+        type=float,
+        default=60.0,
+        help="Simulated handshake cost per new connection (TLS to Supabase is ~2 RTTs).",
+    )
+    args = parser.parse_args()
+
+    from supabase import ClientOptions, create_client
+
+    from backend.http_transport import build_http_client
+
+    questions = [{"id": i, "text": f"Q{i}", "is_active": True} for i in range(1, 19)]
+    results = []
+    for name in ("default", "tuned"):
+        proc, url = _start_server(
+            {"questions": questions}, args.latency_ms, args.connect_latency_ms
+        )
+        try:
+            options = ClientOptions(httpx_client=build_http_client()) if name == "tuned" else None
+            client = create_client(url, "bench-key", options=options)
+            _run(client, min(args.concurrency, args.requests), args.concurrency)  # warm-up
+            opened_before = _connections(url)
+            started = time.perf_counter()
+            latencies = _run(client, args.requests, args.concurrency)
+            wall = time.perf_counter() - started
+            # The stats request itself opens one connection.
+            opened = _connections(url) - opened_before - 1
+            results.append(_summary(name, latencies, wall, opened))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Show how a Gemini backlog affects the quick endpoints, with and without isolation.
+
+Each mode runs in its own process against the fake PostgREST server. Gemini is
+replaced by a fixed sleep, then ``--plans`` concurrent plan requests are fired
+while ``/api/questions`` is probed. The probe latency is reported per mode.
+
+Usage:
+    python backend/bench/workload_isolation.py --plans 60 --gemini-seconds 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(HERE))
+
+TABLES = {
+    "mothers": [{"id": 1, "name": "Bench", "delivered_at": "2025-01-01T00:00:00+00:00"}],
+    "questions": [
+        {"id": i, "text": f"Q{i}", "order_index": i, "is_active": True} for i in range(1, 19)
+    ],
+    "question_options": [],
+    "answers": [
+        {"id": i, "mother_id": 1, "question_id": i, "answer_text": "ok"} for i in range(1, 19)
+    ],
+}
+
+
+def _child(args):
+    from fastapi.testclient import TestClient
+
+    from backend import main
+
+    def fake_gemini(prompt: str) -> dict:
+        time.sleep(args.gemini_seconds)
+        return {"plan_text": "{}", "plan": {}}
+
+    main._call_plan_model = fake_gemini
+    # One portal (event loop) for all requests, like a single uvicorn worker.
+    with TestClient(main.app) as client:
+        client.get("/api/questions")  # warm the Supabase client
+
+        statuses = []
+
+        def plan():
+            resp = client.post("/api/recommendations", json={"mother_id": 1, "refresh": True})
+            statuses.append(resp.status_code)
+
+        threads = [threading.Thread(target=plan) for _ in range(args.plans)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)  # let the plan requests occupy their threads
+
+        probes = []
+        deadline = time.perf_counter() + args.gemini_seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            client.get("/api/questions")
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+
+    ordered = sorted(probes)
+    print(
+        json.dumps(
+            {
+                "isolation": main.WORKLOAD_ISOLATION,
+                "probes": len(probes),
+                "questions_p50_ms": round(statistics.median(ordered) * 1000, 1),
+                "questions_max_ms": round(ordered[-1] * 1000, 1),
+                "plans_ok": statuses.count(200),
+                "plans_rejected": statuses.count(503),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plans", type=int, default=60)
+    parser.add_argument("--gemini-seconds", type=float, default=3.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return _child(args)
+
+    from supabase_pool import _start_server
+
+    results = []
+    for isolation in ("0", "1"):
+        proc, url = _start_server(TABLES, latency_ms=5, connect_latency_ms=0)
+        try:
+            env = {
+                **os.environ,
+                "SUPABASE_URL": url,
+                "SUPABASE_SERVICE_ROLE_KEY": "bench-key",
+                "GEMINI_API_KEY": "bench",
+                "MAJKA_SPECULATIVE_PLANS": "0",
+                "MAJKA_WORKLOAD_ISOLATION": isolation,
+            }
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--child",
+                    "--plans",
+                    str(args.plans),
+                    "--gemini-seconds",
+                    str(args.gemini_seconds),
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        finally:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
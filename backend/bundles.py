@@ -0,0 +1,164 @@
+"""Single-round-trip read bundles (see ``sql/rpc_bundles.sql``).
+
+``SupabaseBundleStore`` calls the Postgres functions through PostgREST RPC.
+``SqliteBundleStore`` implements the same contract with one SQLite statement
+per bundle, so the bundle code paths can be exercised offline. The API does
+not serve from it: sign-ups and answers go to Supabase and never reach the
+file, so login would reject every new mother.
+
+The SQL functions name the ``mothers``, ``questions``, ``answers`` and
+``question_options`` tables directly; the API refuses to enable bundles when
+any ``SUPABASE_*_TABLE`` override is set.
+
+Contract:
+    login_bundle(name, max_order) -> None | {
+        "mother": {id, password_hash, name, age, country, delivered_at},
+        "question_ids": [active question ids ordered by order_index],
+        "answers": {"<question_id>": answer_text},
+    }
+    context_bundle(mother_id, max_order) -> None | {
+        "profile": {name, age, country, delivered_at},
+        "pairs": [{question, answer, order_index}],  # labels already mapped
+    }
+"""
+
+import json
+import sqlite3
+import threading
+
+from fastapi import HTTPException
+
+
+class SupabaseBundleStore:
+    def __init__(self, get_client):
+        self._get_client = get_client
+
+    def _call(self, fn: str, params: dict):
+        resp = self._get_client().rpc(fn, params).execute()
+        error = getattr(resp, "error", None)
+        if error:
+            raise HTTPException(status_code=500, detail=str(error))
+        return getattr(resp, "data", None) or None
+
+    def login_bundle(self, name: str, max_order: int) -> dict | None:
+        return self._call("majka_login_bundle", {"p_name": name, "p_max_order": max_order})
+
+    def context_bundle(self, mother_id: int, max_order: int) -> dict | None:
+        return self._call(
+            "majka_context_bundle", {"p_mother_id": mother_id, "p_max_order": max_order}
+        )
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mothers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    password_hash TEXT,
+    age INTEGER,
+    country TEXT,
+    delivered_at TEXT
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    order_index INTEGER NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS question_options (
+    id INTEGER PRIMARY KEY,
+    question_id INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    value TEXT NOT NULL,
+    order_index INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    mother_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    answer_text TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS answers_mother ON answers (mother_id, question_id);
+"""
+
+_SQLITE_LOGIN_BUNDLE = """
+SELECT json_object(
+    'mother', json_object(
+        'id', m.id,
+        'password_hash', m.password_hash,
+        'name', m.name,
+        'age', m.age,
+        'country', m.country,
+        'delivered_at', m.delivered_at
+    ),
+    'question_ids', (
+        SELECT coalesce(json_group_array(id), json('[]'))
+        FROM (
+            SELECT q.id FROM questions q
+            WHERE q.is_active AND q.order_index <= :max_order
+            ORDER BY q.order_index
+        )
+    ),
+    'answers', (
+        SELECT coalesce(json_group_object(CAST(a.question_id AS TEXT), a.answer_text), json('{}'))
+        FROM answers a WHERE a.mother_id = m.id
+    )
+)
+FROM mothers m
+WHERE m.name = :name
+LIMIT 1
+"""
+
+_SQLITE_CONTEXT_BUNDLE = """
+SELECT json_object(
+    'profile', json_object(
+        'name', m.name,
+        'age', m.age,
+        'country', m.country,
+        'delivered_at', m.delivered_at
+    ),
+    'pairs', (
+        SELECT coalesce(json_group_array(json(pair)), json('[]'))
+        FROM (
+            SELECT json_object(
+                'question', q.text,
+                'answer', coalesce(o.label, a.answer_text),
+                'order_index', q.order_index
+            ) AS pair
+            FROM questions q
+            JOIN answers a ON a.question_id = q.id AND a.mother_id = m.id
+            LEFT JOIN question_options o ON o.question_id = q.id AND o.value = a.answer_text
+            WHERE q.is_active
+              AND q.order_index <= :max_order
+              AND coalesce(a.answer_text, '') <> ''
+            ORDER BY q.order_index
+        )
+    )
+)
+FROM mothers m
+WHERE m.id = :mother_id
+"""
+
+
+class SqliteBundleStore:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SQLITE_SCHEMA)
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._conn
+
+    def _one(self, sql: str, params: dict) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def login_bundle(self, name: str, max_order: int) -> dict | None:
+        return self._one(_SQLITE_LOGIN_BUNDLE, {"name": name, "max_order": max_order})
+
+    def context_bundle(self, mother_id: int, max_order: int) -> dict | None:
+        return self._one(
+            _SQLITE_CONTEXT_BUNDLE, {"mother_id": mother_id, "max_order": max_order}
+        )
@@ -0,0 +1,154 @@
+"""Named, bounded executors that isolate workloads from each other.
+
+Sync FastAPI endpoints all share Starlette's threadpool, so a burst of slow
+Gemini calls can occupy every thread and stall the quick catalog and answer
+endpoints. Each workload class gets its own ``BoundedExecutor`` instead:
+``llm`` for Gemini, ``db`` for Supabase-bound endpoints and ``cpu`` for
+bcrypt. Every executor has its own worker count and a cap on queued plus
+running work. Past the cap, submissions are rejected straight away
+(``ExecutorSaturated``, surfaced as HTTP 503) instead of queueing without
+bound.
+
+Metrics (``executor.<name>.*``): ``running``, ``queued`` and ``queued_peak``
+gauges, plus ``completed``, ``rejected``, ``wait_seconds`` and
+``run_seconds`` counters.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import metrics
+from .profiling import profiled_call
+
+
+class ExecutorSaturated(RuntimeError):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        # Queued plus running; submissions beyond this are rejected.
+        self.max_pending = max(max_pending, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+    def _publish(self):
+        prefix = f"executor.{self.name}"
+        queued = self._pending - self._running
+        metrics.set_gauge(f"{prefix}.running", self._running)
+        metrics.set_gauge(f"{prefix}.queued", queued)
+        metrics.max_gauge(f"{prefix}.queued_peak", queued)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.inc(f"executor.{self.name}.rejected")
+                raise ExecutorSaturated(
+                    f"{self.name} executor is saturated ({self._pending} pending)"
+                )
+            self._pending += 1
+            self._publish()
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._publish()
+            metrics.inc(f"executor.{self.name}.wait_seconds", started - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._publish()
+                metrics.inc(f"executor.{self.name}.completed")
+                metrics.inc(f"executor.{self.name}.run_seconds", time.perf_counter() - started)
+
+        # Carry the caller's context (request id for logs) into the worker.
+        context = contextvars.copy_context()
+        try:
+            return self._pool.submit(context.run, run)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+                self._publish()
+            raise
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn`` on this executor and block until it returns."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` on this executor without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _saturated(exc: ExecutorSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Server busy, please retry shortly ({exc}).",
+        headers={"Retry-After": "2"},
+    )
+
+
+async def run_on(executor: BoundedExecutor | None, fn, *args, **kwargs):
+    """Await ``fn`` on ``executor`` (Starlette's threadpool when ``None``)."""
+    if executor is None:
+        return await run_in_threadpool(profiled_call, fn, *args, **kwargs)
+    try:
+        return await executor.run(profiled_call, fn, *args, **kwargs)
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+
+
+def call_on(executor: BoundedExecutor | None, fn, *args, **kwargs):
+    """Blocking variant of ``run_on`` for code already off the event loop."""
+    if executor is None:
+        return fn(*args, **kwargs)
+    try:
+        return executor.call(fn, *args, **kwargs)
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+
+
+def offload(executor: BoundedExecutor | None):
+    """Decorate a sync endpoint so it runs on ``executor`` instead of Starlette's pool.
+
+    The wrapper is async and keeps the original signature (via ``__wrapped__``),
+    so FastAPI still resolves parameters and dependencies from it. With
+    ``None`` the endpoint runs on Starlette's pool, as an undecorated one would.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await run_on(executor, fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
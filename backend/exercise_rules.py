@@ -0,0 +1,190 @@
+"""Declarative exercise rules, compiled into vectorized evaluators.
+
+Exercises are data (``exercise_rules.json``); adding one needs no code. Each
+exercise has three parts:
+
+* ``features``: named geometry. ``{"joint": [a, b, c]}`` is the angle at
+  ``b``, ``{"between": [a, b, c, d]}`` is the angle between ``a->b`` and
+  ``c->d``, and ``{"delta": [a, b, "x"|"y"]}`` is ``|a - b|`` along one axis.
+  Points are landmark names from ``pose_kernels`` (``LEFT_HIP``,
+  ``MID_SHOULDER``, ...).
+* ``scores``: named sub-scores in the shape of ``score_range``:
+  ``{"feature": f, "range": [lo, hi], "margin": m}``. ``range`` defaults to
+  ``[0, 0]``, which makes ``1 - value / margin``. A margin may scale with
+  the frame (``{"width": 0.15}``). A list of features scores each one and
+  keeps the lowest. The exercise score is the minimum over all sub-scores,
+  clipped to ``[0, 1]``.
+* ``feedback``: groups of ``{"if": [[name, op, value], ...], "say": text}``.
+  The first matching rule of each group speaks, and a rule without ``if``
+  always matches. ``name`` is a feature, a score or ``correct``, and
+  ``"$good"`` stands for the good-form threshold.
+
+``compile_exercise`` turns a spec into one ``PoseKernel`` plus flat
+parameter arrays. Every sub-score is then computed in a single NumPy pass,
+either for one frame ``(35, 4)`` or for a batch ``(n, 35, 4)``.
+"""
+
+import json
+import operator
+
+import numpy as np
+
+import pose_kernels
+from pose_kernels import X, Y, PoseKernel, between, joint
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+_AXES = {"x": X, "y": Y}
+_EPS = 1e-6
+
+
+def _point(name: str) -> int:
+    value = getattr(pose_kernels, name, None)
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown landmark {name!r}")
+    return value
+
+
+class ExerciseEvaluator:
+    """Compiled form of one exercise spec."""
+
+    def __init__(self, key: str, spec: dict, good_thresh: float):
+        self.key = key
+        self.label = spec.get("label", key)
+        self.good_thresh = good_thresh
+
+        angles, deltas, angle_names, delta_names = [], [], [], []
+        for name, feature in spec.get("features", {}).items():
+            if "joint" in feature:
+                angles.append(joint(*map(_point, feature["joint"])))
+                angle_names.append(name)
+            elif "between" in feature:
+                angles.append(between(*map(_point, feature["between"])))
+                angle_names.append(name)
+            elif "delta" in feature:
+                a, b, axis = feature["delta"]
+                deltas.append((_point(a), _point(b), _AXES[axis]))
+                delta_names.append(name)
+            else:
+                raise ValueError(f"{key}: feature {name!r} needs joint, between or delta")
+        self.kernel = PoseKernel(angles=angles, deltas=deltas)
+        self.feature_names = angle_names + delta_names
+        column = {name: i for i, name in enumerate(self.feature_names)}
+
+        source, lo, hi, margin, starts = [], [], [], [], []
+        self.score_names = []
+        for name, score in spec.get("scores", {}).items():
+            features = score["feature"]
+            features = [features] if isinstance(features, str) else features
+            starts.append(len(source))
+            self.score_names.append(name)
+            rng = score.get("range", [0, 0])
+            m = score["margin"]
+            m = m if isinstance(m, dict) else {"abs": m}
+            for feature in features:
+                source.append(column[feature])
+                lo.append(rng[0])
+                hi.append(rng[1])
+                margin.append((m.get("abs", 0.0), m.get("width", 0.0), m.get("height", 0.0)))
+        self._source = np.asarray(source, dtype=np.intp)
+        self._lo = np.asarray(lo, dtype=np.float32)
+        self._hi = np.asarray(hi, dtype=np.float32)
+        self._mid = (self._lo + self._hi) / 2
+        half = (self._hi - self._lo) / 2
+        # A zero-width range scores 1.0 anywhere inside it.
+        self._half = np.where(half > 0, half, np.inf).astype(np.float32)
+        self._margin_terms = np.asarray(margin, dtype=np.float32).reshape(-1, 3)
+        self._starts = np.asarray(starts, dtype=np.intp)
+        self._margin = None
+        self._shape = None
+
+        self.feedback = [
+            [(self._conditions(rule.get("if", [])), rule["say"]) for rule in group]
+            for group in spec.get("feedback", [])
+        ]
+
+    def _conditions(self, conditions):
+        compiled = []
+        for name, op, value in conditions:
+            if value == "$good":
+                value = self.good_thresh
+            compiled.append((name, _OPS[op], float(value)))
+        return compiled
+
+    def _margins(self, shape) -> np.ndarray:
+        if shape[:2] != self._shape:
+            self._shape = shape[:2]
+            h, w = shape[0], shape[1]
+            terms = self._margin_terms
+            self._margin = terms[:, 0] + terms[:, 1] * w + terms[:, 2] * h + _EPS
+        return self._margin
+
+    def features(self, points: np.ndarray) -> np.ndarray:
+        """``(..., n_features)`` angles then deltas for one frame or a batch."""
+        return self.kernel.raw(points)
+
+    def sub_scores(self, features: np.ndarray, shape) -> np.ndarray:
+        """``(..., n_scores)`` named sub-scores in ``[0, 1]``, one NumPy pass."""
+        if not len(self._source):
+            return features[..., :0]
+        values = features[..., self._source]
+        outside = np.maximum(self._lo - values, values - self._hi)
+        rows = np.where(
+            outside > 0,
+            1.0 - outside / self._margins(shape),
+            1.0 - np.abs(values - self._mid) / self._half,
+        )
+        np.clip(rows, 0.0, 1.0, out=rows)
+        return np.minimum.reduceat(rows, self._starts, axis=-1)
+
+    def speak(self, named: dict) -> list[str]:
+        feedback = []
+        for group in self.feedback:
+            for conditions, text in group:
+                if all(op(named[name], value) for name, op, value in conditions):
+                    feedback.append(text)
+                    break
+        return feedback
+
+    def assess(self, points: np.ndarray, shape) -> tuple[bool, list[str], float, np.ndarray]:
+        """``evaluate`` plus the sub-scores, in ``score_names`` order."""
+        features = self.features(points)
+        scores = self.sub_scores(features, shape)
+        score = float(scores.min()) if scores.size else 1.0
+        correct = score >= self.good_thresh
+        named = dict(zip(self.feature_names, features.tolist()))
+        named.update(zip(self.score_names, scores.tolist()))
+        named["correct"] = float(correct)
+        return correct, self.speak(named), score, scores
+
+    def evaluate(self, points: np.ndarray, shape) -> tuple[bool, list[str], float]:
+        """Drop-in for the old ``eval_*(landmarks, shape)`` functions."""
+        return self.assess(points, shape)[:3]
+
+
+def load_rules(path) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compile_rules(rules: dict, good_thresh: float) -> dict:
+    """``{key: {"label", "fn"} | {"label", "type"}}`` like ``EXERCISE_REGISTRY``.
+
+    ``"same_as"`` reuses another exercise's rules, and ``"feedback_before"``
+    adds an always-on cue in front of them.
+    """
+    registry = {}
+    for key, spec in rules.items():
+        if spec.get("type"):
+            registry[key] = {"label": spec.get("label", key), "type": spec["type"]}
+            continue
+        if "same_as" in spec:
+            base = rules[spec["same_as"]]
+            spec = {
+                **base,
+                "label": spec.get("label", key),
+                "feedback": [[{"say": text}] for text in spec.get("feedback_before", [])]
+                + base.get("feedback", []),
+            }
+        evaluator = ExerciseEvaluator(key, spec, good_thresh)
+        registry[key] = {"label": evaluator.label, "fn": evaluator.evaluate, "evaluator": evaluator}
+    return registry
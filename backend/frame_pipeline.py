@@ -0,0 +1,211 @@
+"""Capture / inference / render stages for the MLH main loop.
+
+The sequential loop reads the camera, runs pose inference and draws one
+after another on a single thread, so each frame costs the sum of the three.
+``run_pipelined`` gives capture and inference their own threads and keeps
+rendering on the calling thread, because OpenCV windows must be driven from
+the main thread on macOS. The stages hand frames on through ``LatestSlot``s.
+A slot holds one item, and a new ``put`` replaces an unread one, so a slow
+stage always picks up the newest frame instead of working through a backlog.
+Throughput is then bounded by the slowest stage rather than the sum, and
+latency stays at about one frame per stage.
+
+``run_sequential`` runs the same three callables in order, so both modes
+report comparable ``StageTimer`` numbers. Only the standard library is
+needed.
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ("capture", "inference", "render")
+
+
+class LatestSlot:
+    """Single-slot queue that keeps only the newest item."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._full = False
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._full:
+                self.dropped += 1
+            self._item = item
+            self._full = True
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None):
+        """Next item, or ``None`` once the slot is closed and empty (or on timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._full or self._closed, timeout)
+            if not self._full:
+                return None
+            item, self._item, self._full = self._item, None, False
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StageTimer:
+    """Per-stage durations: mean over the whole run, p95 over the last ``window`` frames."""
+
+    def __init__(self, window: int = 300):
+        self._window = window
+        self._recent: dict[str, deque] = {}
+        self._totals: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            recent = self._recent.get(stage)
+            if recent is None:
+                recent = self._recent[stage] = deque(maxlen=self._window)
+                self._totals[stage] = [0, 0.0]
+            recent.append(seconds)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def summary(self) -> dict:
+        with self._lock:
+            recent = {stage: sorted(values) for stage, values in self._recent.items()}
+            totals = {stage: tuple(values) for stage, values in self._totals.items()}
+        result = {}
+        for stage, ordered in recent.items():
+            count, total = totals[stage]
+            result[stage] = {
+                "frames": count,
+                "mean_ms": round(total / count * 1000, 2),
+                "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000, 2),
+                "median_ms": round(statistics.median(ordered) * 1000, 2),
+            }
+        return result
+
+    def report(self, stats: dict | None = None) -> str:
+        """One-line summary: each stage's mean/p95, then rendered FPS and dropped frames."""
+        summary = self.summary()
+        parts = [
+            f"{stage} {values['mean_ms']:.1f} ms (p95 {values['p95_ms']:.1f})"
+            for stage, values in summary.items()
+        ]
+        elapsed = time.perf_counter() - self.started
+        rendered = summary.get("render", {}).get("frames", 0)
+        if elapsed > 0:
+            parts.append(f"{rendered / elapsed:.1f} fps")
+        if stats and stats.get("dropped"):
+            parts.append(f"{stats['dropped']} stale frames dropped")
+        return ", ".join(parts)
+
+
+def run_sequential(read, process, render, timer: StageTimer) -> dict:
+    """``read -> process -> render`` on the calling thread, timed like ``run_pipelined``.
+
+    ``read()`` returns a frame or ``None`` at the end of the stream, and
+    ``render(item)`` returns ``False`` to stop.
+    """
+    frames = 0
+    while True:
+        started = time.perf_counter()
+        with timer.time("capture"):
+            frame = read()
+        if frame is None:
+            break
+        with timer.time("inference"):
+            item = process(frame)
+        with timer.time("render"):
+            keep = render(item)
+        timer.record("latency", time.perf_counter() - started)
+        frames += 1
+        if keep is False:
+            break
+    return {"frames": frames, "dropped": 0}
+
+
+def run_pipelined(read, process, render, timer: StageTimer) -> dict:
+    """Same contract as ``run_sequential``, with capture and inference on worker threads.
+
+    ``latency`` is measured from the end of ``read`` to the end of
+    ``render``. An exception in a worker stops the pipeline and is re-raised
+    here.
+    """
+    captured, processed = LatestSlot(), LatestSlot()
+    stop = threading.Event()
+    errors = []
+
+    def capture_loop():
+        try:
+            while not stop.is_set():
+                with timer.time("capture"):
+                    frame = read()
+                if frame is None:
+                    break
+                captured.put((time.perf_counter(), frame))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            captured.close()
+
+    def inference_loop():
+        try:
+            while not stop.is_set():
+                entry = captured.get()
+                if entry is None:
+                    break
+                read_at, frame = entry
+                with timer.time("inference"):
+                    item = process(frame)
+                processed.put((read_at, item))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            processed.close()
+
+    workers = [
+        threading.Thread(target=capture_loop, name="mlh-capture", daemon=True),
+        threading.Thread(target=inference_loop, name="mlh-inference", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    frames = 0
+    try:
+        while True:
+            entry = processed.get()
+            if entry is None:
+                break
+            read_at, item = entry
+            with timer.time("render"):
+                keep = render(item)
+            timer.record("latency", time.perf_counter() - read_at)
+            frames += 1
+            if keep is False:
+                break
+    finally:
+        stop.set()
+        captured.close()
+        processed.close()
+        for worker in workers:
+            worker.join(timeout=1.0)
+    if errors:
+        raise errors[0]
+    return {"frames": frames, "dropped": captured.dropped + processed.dropped}
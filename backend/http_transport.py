@@ -0,0 +1,123 @@
+"""Tuned HTTP transport for the Supabase PostgREST client.
+
+All endpoint threads share one ``httpx.Client`` whose connection pool is sized
+for the worker's concurrency. Timeouts are chosen per operation class (reads,
+writes, RPC calls) by a thin transport wrapper, which also records pool
+saturation and latency in ``metrics`` under ``supabase.*``.
+"""
+
+import os
+import threading
+import time
+
+import httpx
+
+from .logging_setup import get_logger
+from .metrics import metrics
+
+log = get_logger("majka.supabase")
+
+OPERATION_READ = "read"
+OPERATION_WRITE = "write"
+OPERATION_RPC = "rpc"
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class TransportSettings:
+    """Pool and timeout settings, read from ``MAJKA_SUPABASE_*`` variables."""
+
+    def __init__(self):
+        self.max_connections = int(os.getenv("MAJKA_SUPABASE_POOL_SIZE", "40"))
+        self.max_keepalive = int(
+            os.getenv("MAJKA_SUPABASE_KEEPALIVE_CONNECTIONS", str(self.max_connections))
+        )
+        self.keepalive_expiry = _env_float("MAJKA_SUPABASE_KEEPALIVE_SECONDS", 60.0)
+        self.http2 = os.getenv("MAJKA_SUPABASE_HTTP2", "1") == "1"
+        self.connect_timeout = _env_float("MAJKA_SUPABASE_CONNECT_TIMEOUT", 3.0)
+        self.pool_timeout = _env_float("MAJKA_SUPABASE_POOL_TIMEOUT", 5.0)
+        self.read_timeouts = {
+            OPERATION_READ: _env_float("MAJKA_SUPABASE_READ_TIMEOUT", 5.0),
+            OPERATION_WRITE: _env_float("MAJKA_SUPABASE_WRITE_TIMEOUT", 10.0),
+            OPERATION_RPC: _env_float("MAJKA_SUPABASE_RPC_TIMEOUT", 15.0),
+        }
+
+    def timeout_for(self, operation: str) -> dict:
+        read = self.read_timeouts[operation]
+        return {
+            "connect": self.connect_timeout,
+            "read": read,
+            "write": read,
+            "pool": self.pool_timeout,
+        }
+
+
+def classify_request(request: httpx.Request) -> str:
+    if "/rpc/" in request.url.path:
+        return OPERATION_RPC
+    if request.method in ("GET", "HEAD"):
+        return OPERATION_READ
+    return OPERATION_WRITE
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Applies per-operation timeouts and tracks pool usage around a transport."""
+
+    def __init__(self, inner: httpx.BaseTransport, settings: TransportSettings):
+        self._inner = inner
+        self._settings = settings
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        operation = classify_request(request)
+        request.extensions["timeout"] = self._settings.timeout_for(operation)
+        with self._lock:
+            self._in_flight += 1
+            in_flight = self._in_flight
+        metrics.set_gauge("supabase.pool.in_flight", in_flight)
+        metrics.max_gauge("supabase.pool.in_flight_peak", in_flight)
+        if in_flight > self._settings.max_connections:
+            metrics.inc("supabase.pool.saturated")
+        started = time.perf_counter()
+        try:
+            response = self._inner.handle_request(request)
+        except httpx.PoolTimeout:
+            metrics.inc("supabase.pool.timeouts")
+            raise
+        except httpx.TimeoutException:
+            metrics.inc(f"supabase.{operation}.timeouts")
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            metrics.set_gauge("supabase.pool.in_flight", self._in_flight)
+        metrics.inc(f"supabase.{operation}.requests")
+        metrics.inc(f"supabase.{operation}.seconds", time.perf_counter() - started)
+        return response
+
+    def close(self):
+        self._inner.close()
+
+
+def build_http_client(settings: TransportSettings | None = None) -> httpx.Client:
+    settings = settings or TransportSettings()
+    http2 = settings.http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            log.warning("supabase.http2_unavailable", reason="h2 package missing")
+            http2 = False
+    limits = httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_keepalive,
+        keepalive_expiry=settings.keepalive_expiry,
+    )
+    inner = httpx.HTTPTransport(limits=limits, http2=http2, retries=1)
+    return httpx.Client(
+        transport=InstrumentedTransport(inner, settings),
+        timeout=httpx.Timeout(**settings.timeout_for(OPERATION_READ)),
+    )
@@ -0,0 +1,123 @@
+"""Guided-session HUD, with the static parts rendered once per resolution.
+
+``draw_form_frame`` used to redraw everything on every frame: the skeleton
+through ``mp_drawing.draw_landmarks`` (with new ``DrawingSpec`` objects each
+time) and then all 33 joints again with ``cv2.circle``, the header bar, the
+progress-bar background and the safety footer. ``BreathingCoach`` copied the
+whole frame to shade a 90 px band.
+
+``FormHud`` keeps, per frame size:
+
+* the header (black bar, title and clock) as one image, re-rendered only when
+  its text changes and otherwise copied in with a single slice assignment;
+* the progress bar geometry, filled with two slice assignments.
+
+The skeleton is drawn in one pass: a single ``cv2.polylines`` call for every
+edge whose two ends are visible, then the joints. Text over the camera image
+(pose quality, form percentage, safety footer) is still ``putText``: blending
+a pre-rendered anti-aliased stamp measured slower than Hershey ``putText`` at
+these sizes. ``BandShade`` blends a solid colour over the top rows only.
+``bench/hud_render.py`` times all of it against the previous code. Needs
+OpenCV and NumPy; no MediaPipe.
+"""
+
+import cv2
+import numpy as np
+
+from pose_kernels import LANDMARK_COUNT, POSE_CONNECTIONS
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+SAFETY_TEXT = "Stop if you feel pain, dizziness, or pelvic pressure."
+HEADER_HEIGHT = 40
+BAR_HEIGHT = 20
+JOINT_RADIUS = 12
+EDGE_THICKNESS = 6
+# mp_drawing skips landmarks below this visibility, and so do we.
+MIN_VISIBILITY = 0.5
+
+_EDGES = np.asarray(POSE_CONNECTIONS, dtype=np.intp)
+_VISIBILITY = 3
+
+
+def draw_skeleton(frame: np.ndarray, points: np.ndarray, color) -> None:
+    """Edges between visible in-frame landmarks, then a filled circle per joint."""
+    h, w = frame.shape[:2]
+    landmarks = points[:LANDMARK_COUNT]
+    xs, ys = landmarks[:, 0], landmarks[:, 1]
+    shown = (landmarks[:, _VISIBILITY] >= MIN_VISIBILITY) & (xs >= 0) & (xs <= w) & (ys >= 0) & (ys <= h)
+    pixels = landmarks[:, :2].astype(np.int32)
+    edges = _EDGES[shown[_EDGES[:, 0]] & shown[_EDGES[:, 1]]]
+    if len(edges):
+        cv2.polylines(frame, pixels[edges], False, color, EDGE_THICKNESS)
+    for center in pixels.tolist():
+        cv2.circle(frame, center, JOINT_RADIUS, color, -1)
+
+
+class BandShade:
+    """Blends a solid colour over rows ``0..rows`` (as ``cv2.rectangle`` would fill), in place."""
+
+    def __init__(self, rows: int, color, opacity: float):
+        self.rows = rows
+        self.color = color
+        self.opacity = opacity
+        self._solid = None
+
+    def draw(self, frame: np.ndarray) -> None:
+        band = frame[: self.rows + 1]
+        if self._solid is None or self._solid.shape != band.shape:
+            self._solid = np.full(band.shape, self.color, dtype=np.uint8)
+        cv2.addWeighted(self._solid, self.opacity, band, round(1 - self.opacity, 6), 0, dst=band)
+
+
+class FormHud:
+    """Skeleton, header, progress bar and footer for one exercise window."""
+
+    def __init__(self, title: str):
+        self.title = title
+        self._shape = None
+        self._header = None
+        self._header_key = None
+
+    def _layout(self, shape):
+        self._shape = shape
+        h, w = shape[:2]
+        self._header = np.zeros((HEADER_HEIGHT + 1, w, 3), dtype=np.uint8)
+        self._header_key = None
+        self._bar_rows = slice(h - BAR_HEIGHT - 40, h - 40 + 1)
+        self._bar_x1, self._bar_x2 = 10, w - 10
+
+    def _draw_header(self, frame, status_text, status_color, elapsed):
+        key = (status_text, status_color, elapsed)
+        if key != self._header_key:
+            header = self._header
+            header[:] = 0
+            cv2.putText(header, f"{self.title}: {status_text}", (10, 25), FONT, 0.7, status_color, 2, cv2.LINE_AA)
+            cv2.putText(header, f"Time: {elapsed}s", (header.shape[1] - 150, 25), FONT, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+            self._header_key = key
+        frame[: HEADER_HEIGHT + 1] = self._header
+
+    def draw(self, result, elapsed: int) -> np.ndarray:
+        """Draw ``result`` (``MLH.FormFrame``) onto its frame, in place; ``elapsed`` in whole seconds."""
+        frame = result.frame
+        h = frame.shape[0]
+        if frame.shape != self._shape:
+            self._layout(frame.shape)
+        smooth_score = result.smooth_score
+        status_color = result.status_color
+
+        if result.points is not None:
+            draw_skeleton(frame, result.points, status_color)
+
+        self._draw_header(frame, result.status_text, status_color, elapsed)
+        if result.quality:
+            cv2.putText(frame, f"Pose: {result.quality}", (10, 60), FONT, 0.5, (200, 200, 200), 1, cv2.LINE_AA)
+
+        bar_x1, bar_x2 = self._bar_x1, self._bar_x2
+        bar_y = self._bar_rows.start
+        fill_x = bar_x1 + int((bar_x2 - bar_x1) * smooth_score)
+        frame[self._bar_rows, bar_x1 : bar_x2 + 1] = (50, 50, 50)
+        frame[self._bar_rows, bar_x1 : fill_x + 1] = status_color
+        cv2.putText(frame, f"Form: {int(smooth_score * 100)}%", (bar_x1 + 5, bar_y - 5), FONT, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
+
+        cv2.putText(frame, SAFETY_TEXT, (10, h - 10), FONT, 0.5, (200, 200, 200), 1, cv2.LINE_AA)
+        return frame
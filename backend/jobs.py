@@ -0,0 +1,293 @@
+"""Background job queue for long-running API work (plan generation).
+
+Jobs run on a bounded in-process worker pool. Job state lives in a pluggable
+store: an in-memory dict by default, or any Redis-compatible server (Redis,
+Valkey, KeyDB, a local stand-in) so several API workers can share status and
+deduplication.
+
+Webhook URLs come from unauthenticated callers, so ``check_webhook_url``
+only accepts hosts from an allow-list, or, without one, hosts that resolve to
+public addresses only. The check runs again right before each POST, and
+redirects are not followed.
+"""
+
+import contextvars
+import ipaddress
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from .logging_setup import get_logger
+
+log = get_logger("majka.jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = {JOB_SUCCEEDED, JOB_FAILED}
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds ``max_pending`` unfinished jobs."""
+
+
+class InvalidWebhook(ValueError):
+    """Raised for a webhook URL the server must not call."""
+
+
+def check_webhook_url(url: str, allowed_hosts: frozenset[str] = frozenset()):
+    """Reject non-http(s) URLs, hosts outside ``allowed_hosts``, and non-public addresses.
+
+    Hosts on the allow-list are trusted as configured. Without one, every
+    address the host resolves to must be global: loopback, private,
+    link-local (cloud metadata), shared and reserved ranges are refused.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise InvalidWebhook("webhook_url must be an http(s) URL.")
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise InvalidWebhook(f"webhook host {host!r} is not allowed.")
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (ValueError, UnicodeError, OSError) as exc:
+        raise InvalidWebhook(f"webhook host {host!r} does not resolve.") from exc
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].partition("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise InvalidWebhook("webhook_url must point to a public address.")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the POST at an internal address after the check.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class InMemoryJobStore:
+    """Job records and dedup keys kept in process memory."""
+
+    def __init__(self, ttl_seconds: int = 900):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, dict] = {}
+        self._dedup: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, dedup_key: str, job: dict) -> dict | None:
+        """Store ``job`` unless an unfinished job owns ``dedup_key``; return that job."""
+        with self._lock:
+            self._prune()
+            existing_id = self._dedup.get(dedup_key)
+            existing = self._jobs.get(existing_id) if existing_id else None
+            if existing and existing["status"] not in FINISHED_STATES:
+                return dict(existing)
+            self._jobs[job["id"]] = dict(job)
+            self._dedup[dedup_key] = job["id"]
+            return None
+
+    def active(self, dedup_key: str) -> dict | None:
+        """The unfinished job that owns ``dedup_key``, if any."""
+        with self._lock:
+            existing_id = self._dedup.get(dedup_key)
+            existing = self._jobs.get(existing_id) if existing_id else None
+            if existing and existing["status"] not in FINISHED_STATES:
+                return dict(existing)
+            return None
+
+    def update(self, job_id: str, **fields) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            if job["status"] in FINISHED_STATES and self._dedup.get(job["dedup_key"]) == job_id:
+                del self._dedup[job["dedup_key"]]
+            return dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        stale = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATES and job["updated_at"] < cutoff
+        ]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+
+class RedisJobStore:
+    """Job records stored as JSON strings in a Redis-compatible server."""
+
+    def __init__(self, client, ttl_seconds: int = 900, prefix: str = "majka:jobs"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl_seconds: int = 900):
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("MAJKA_JOB_BACKEND=redis requires the 'redis' package") from exc
+        return cls(redis.Redis.from_url(url, decode_responses=True), ttl_seconds)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _dedup_key(self, dedup_key: str) -> str:
+        return f"{self.prefix}:dedup:{dedup_key}"
+
+    def claim(self, dedup_key: str, job: dict) -> dict | None:
+        key = self._dedup_key(dedup_key)
+        # SET NX makes the claim atomic across API workers sharing the server.
+        if not self.client.set(key, job["id"], nx=True, ex=self.ttl_seconds):
+            existing = self.get(self.client.get(key) or "")
+            if existing and existing["status"] not in FINISHED_STATES:
+                return existing
+            self.client.set(key, job["id"], ex=self.ttl_seconds)
+        self.client.set(self._job_key(job["id"]), json.dumps(job), ex=self.ttl_seconds)
+        return None
+
+    def active(self, dedup_key: str) -> dict | None:
+        existing = self.get(self.client.get(self._dedup_key(dedup_key)) or "")
+        if existing and existing["status"] not in FINISHED_STATES:
+            return existing
+        return None
+
+    def update(self, job_id: str, **fields) -> dict | None:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields, updated_at=time.time())
+        self.client.set(self._job_key(job_id), json.dumps(job), ex=self.ttl_seconds)
+        if job["status"] in FINISHED_STATES:
+            key = self._dedup_key(job["dedup_key"])
+            if self.client.get(key) == job_id:
+                self.client.delete(key)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        if not job_id:
+            return None
+        raw = self.client.get(self._job_key(job_id))
+        return json.loads(raw) if raw else None
+
+
+class JobQueue:
+    """Bounded worker pool that records job progress in a job store."""
+
+    def __init__(
+        self,
+        store,
+        max_workers: int = 4,
+        max_pending: int = 64,
+        webhook_hosts: frozenset[str] = frozenset(),
+    ):
+        self.store = store
+        self.max_pending = max_pending
+        self.webhook_hosts = webhook_hosts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="majka-job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, dedup_key: str, fn, *args, webhook_url: str | None = None):
+        """Enqueue ``fn(*args)``; returns ``(job, created)``.
+
+        When an unfinished job already exists for ``dedup_key`` it is returned
+        with ``created=False`` and nothing new is scheduled.
+        """
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "dedup_key": dedup_key,
+            "status": JOB_QUEUED,
+            "result": None,
+            "error": None,
+            "status_code": None,
+            "webhook_url": webhook_url,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            if self._pending >= self.max_pending:
+                # A duplicate of a running job costs nothing, even when full.
+                existing = self.store.active(dedup_key)
+                if existing:
+                    return existing, False
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            existing = self.store.claim(dedup_key, job)
+            if existing:
+                return existing, False
+            self._pending += 1
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self._run, job["id"], fn, args, webhook_url)
+        return job, True
+
+    def get(self, job_id: str) -> dict | None:
+        return self.store.get(job_id)
+
+    def _run(self, job_id: str, fn, args, webhook_url: str | None):
+        self.store.update(job_id, status=JOB_RUNNING)
+        try:
+            result = fn(*args)
+            job = self.store.update(job_id, status=JOB_SUCCEEDED, result=result, status_code=200)
+        except HTTPException as exc:
+            job = self.store.update(
+                job_id, status=JOB_FAILED, error=str(exc.detail), status_code=exc.status_code
+            )
+        except Exception as exc:
+            job = self.store.update(job_id, status=JOB_FAILED, error=str(exc), status_code=500)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        if webhook_url and job:
+            _post_webhook(webhook_url, public_job(job), self.webhook_hosts)
+
+
+def public_job(job: dict) -> dict:
+    """Strip internal fields before returning a job to clients."""
+    return {
+        key: job.get(key)
+        for key in ("id", "kind", "status", "result", "error", "status_code", "created_at", "updated_at")
+    }
+
+
+def _post_webhook(
+    url: str, body: dict, allowed_hosts: frozenset[str] = frozenset(), timeout: float = 5.0
+):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        # Checked again: the host may resolve differently than at enqueue time.
+        check_webhook_url(url, allowed_hosts)
+        with _webhook_opener.open(request, timeout=timeout):
+            pass
+    except Exception as exc:
+        log.warning("job.webhook_failed", url=url, job_id=body.get("id"), error=str(exc))
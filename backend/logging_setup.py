@@ -0,0 +1,205 @@
+"""Non-blocking structured logging.
+
+Request threads only put records on a bounded in-memory queue
+(``QueueHandler``). A background ``QueueListener`` formats them as one JSON
+object per line and writes them to stdout, so a slow container log driver
+never blocks a request. When the queue is full, records are dropped and
+counted (``log.dropped``) instead of blocking.
+
+Each record carries the ``request_id`` and ``mother_id`` bound to the current
+context (see ``bind_request``/``bind_mother``) plus its own fields. Events can
+be sampled per name (``MAJKA_LOG_SAMPLE="plan.prompt=0.05"``), and long string
+fields are capped at ``MAJKA_LOG_FIELD_MAX_CHARS``.
+
+Usage:
+    log = get_logger("majka.api")
+    log.warning("gemini.failed", error=str(exc))
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from .metrics import metrics
+
+LOG_LEVEL = os.getenv("MAJKA_LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("MAJKA_LOG_QUEUE_SIZE", "10000"))
+LOG_FIELD_MAX_CHARS = int(os.getenv("MAJKA_LOG_FIELD_MAX_CHARS", "2048"))
+LOG_SAMPLE = os.getenv("MAJKA_LOG_SAMPLE", "plan.prompt=0.05")
+
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "majka_request_id", default=None
+)
+mother_id_var: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "majka_mother_id", default=None
+)
+
+_listener = None
+
+
+def bind_request(request_id: str | None) -> contextvars.Token:
+    return request_id_var.set(request_id)
+
+
+def reset_request(token: contextvars.Token):
+    request_id_var.reset(token)
+
+
+def bind_mother(mother_id: int | None):
+    mother_id_var.set(mother_id)
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            rates[name] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+def _cap(value, limit: int):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...[+{len(value) - limit} chars]"
+    if isinstance(value, dict):
+        return {key: _cap(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_cap(item, limit) for item in value]
+    return value
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the request context and applies per-event sampling.
+
+    Runs on the calling thread, before the record is queued, because the
+    context variables are only visible there.
+    """
+
+    def __init__(self, sample_rates: dict[str, float] | None = None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.sample_rates.get(record.msg) if isinstance(record.msg, str) else None
+        if rate is not None:
+            if random.random() >= rate:
+                metrics.inc("log.sampled_out")
+                return False
+            record.sample_rate = rate
+        record.request_id = request_id_var.get()
+        record.mother_id = mother_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, field_max_chars: int = LOG_FIELD_MAX_CHARS):
+        super().__init__()
+        self.field_max_chars = field_max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "mother_id": getattr(record, "mother_id", None),
+        }
+        if getattr(record, "sample_rate", None) is not None:
+            entry["sample_rate"] = record.sample_rate
+        entry.update(_cap(getattr(record, "fields", None) or {}, self.field_max_chars))
+        if record.exc_text:
+            entry["exc"] = _cap(record.exc_text, self.field_max_chars)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: a full queue drops the record and counts it."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the traceback here (traceback objects must not cross
+        # threads); JSON formatting happens on the listener thread.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("log.dropped")
+
+
+class EventLogger:
+    """``logging.Logger`` wrapper taking an event name plus keyword fields."""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level: int, event: str, fields: dict, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name: str) -> EventLogger:
+    return EventLogger(name)
+
+
+def configure_logging(
+    stream=None,
+    level: str = LOG_LEVEL,
+    queue_size: int = LOG_QUEUE_SIZE,
+    sample: str = LOG_SAMPLE,
+):
+    """Route the ``majka`` loggers through the queue; idempotent."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter(parse_sample_rates(sample)))
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    root = logging.getLogger("majka")
+    root.setLevel(level)
+    root.handlers[:] = [queue_handler]
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
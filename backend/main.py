@@ -1,21 +1,81 @@
+import asyncio
 import difflib
+import hmac
 import json
 import os
+import random
 import re
+import secrets
 import subprocess
 import sys
-from datetime import datetime, timezone
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
-import bcrypt
-import google.generativeai as genai
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from supabase import Client, create_client
-from postgrest.exceptions import APIError
-from datetime import datetime, timezone, timedelta
+
+from .answer_buffer import AnswerBuffer
+from .bundles import SupabaseBundleStore
+from .executors import BoundedExecutor, call_on, offload, run_on
+from .logging_setup import (
+    bind_mother,
+    bind_request,
+    configure_logging,
+    get_logger,
+    request_id_var,
+    reset_request,
+)
+from .jobs import (
+    FINISHED_STATES,
+    InMemoryJobStore,
+    InvalidWebhook,
+    JobQueue,
+    JobQueueFull,
+    RedisJobStore,
+    check_webhook_url,
+    public_job,
+)
+from .metrics import metrics
+from .model_router import (
+    ModelRouter,
+    ModelTier,
+    classify_chat,
+    needs_intake_context,
+    parse_mapping,
+)
+from .profiling import (
+    ProfileRing,
+    ProfileSession,
+    StackSampler,
+    collapsed,
+    start_session,
+    stop_session,
+)
+from .plan_cache import (
+    SOURCE_REQUEST,
+    SOURCE_SPECULATIVE,
+    PlanCache,
+    SqlitePlanCache,
+    batch_plan_key,
+    plan_cache_key,
+)
+from .plan_delta import answers_hash, merge_patch, plan_scope
+from .plan_rules import build_rule_plan
+from .session_tokens import InvalidToken, SessionTokens
+from .snapshots import SupabaseSnapshotStore
+from .speculation import SpeculativePlanner
+
+# google.generativeai, supabase/postgrest and bcrypt are comparatively slow to
+# import, so they are loaded on first use (see the client accessors below)
+# instead of at module import time.
 
 class MotherPayload(BaseModel):
     name: str
@@ -38,6 +98,9 @@ class AnswerPayload(BaseModel):
 
 class RecommendationPayload(BaseModel):
     mother_id: int
+    refresh: bool = False  # bypass the plan cache and ask Gemini again
+    mode: str = "sync"  # "job" enqueues and returns a job id immediately
+    webhook_url: str | None = None
 
 
 class GuidedSessionPayload(BaseModel):
@@ -105,17 +168,6 @@ for entry in EXERCISES:
         if normalized:
             EXERCISE_LOOKUP[normalized] = key
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise RuntimeError(
-        "Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY/SUPABASE_ANON_KEY"
-    )
-
-
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    raise RuntimeError("GEMINI_API_KEY is required for Majka AI features.")
-
 CHAT_SYSTEM_PROMPT = """You are 'Majka,' a warm, nurturing, and a friendly, human-sounding AI assistant for new mothers. Your goal is to provide **direct, relevant, and focused answers** to the user's current question regarding postpartum recovery, rehabilitation, and newborn care.
 
 ### CORE DIRECTIVES
@@ -136,15 +188,267 @@ CHAT_SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
-chat_model = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=CHAT_SYSTEM_PROMPT,
-    safety_settings=CHAT_SAFETY_SETTINGS,
+WARM_CLIENTS_ON_STARTUP = os.getenv("MAJKA_WARM_CLIENTS_ON_STARTUP", "0") == "1"
+# Shared pooled httpx client with per-operation timeouts (see http_transport.py).
+SUPABASE_TUNED_TRANSPORT = os.getenv("MAJKA_SUPABASE_TUNED_TRANSPORT", "1") == "1"
+JOB_BACKEND = os.getenv("MAJKA_JOB_BACKEND", "memory")
+JOB_REDIS_URL = os.getenv("MAJKA_JOB_REDIS_URL", "redis://localhost:6379/0")
+JOB_WORKERS = int(os.getenv("MAJKA_JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("MAJKA_JOB_MAX_PENDING", "64"))
+JOB_TTL_SECONDS = int(os.getenv("MAJKA_JOB_TTL_SECONDS", "900"))
+JOB_WEBHOOK_HOSTS = frozenset(
+    host.strip().lower() for host in os.getenv("MAJKA_JOB_WEBHOOK_HOSTS", "").split(",") if host.strip()
 )
+JOB_SSE_POLL_SECONDS = float(os.getenv("MAJKA_JOB_SSE_POLL_SECONDS", "0.5"))
+JOB_SSE_TIMEOUT_SECONDS = float(os.getenv("MAJKA_JOB_SSE_TIMEOUT_SECONDS", "120"))
+PLAN_MODEL_NAME = "gemini-2.5-flash"
+# Bump when the plan prompt template or EXERCISES change, so bulk-regenerated
+# plans from the previous version stop being served.
+PLAN_PROMPT_VERSION = os.getenv("MAJKA_PLAN_PROMPT_VERSION", "1")
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("MAJKA_PLAN_CACHE_MAX_ENTRIES", "1024"))
+PLAN_CACHE_TTL_SECONDS = int(os.getenv("MAJKA_PLAN_CACHE_TTL_SECONDS", "3600"))
+PLAN_BATCH_TTL_SECONDS = int(os.getenv("MAJKA_PLAN_BATCH_TTL_SECONDS", str(7 * 24 * 3600)))
+# A SQLite file shared by API workers and the bulk regeneration command.
+PLAN_CACHE_PATH = os.getenv("MAJKA_PLAN_CACHE_PATH")
+SPECULATIVE_PLANS = os.getenv("MAJKA_SPECULATIVE_PLANS", "1") == "1"
+SPECULATIVE_MAX_CONCURRENT = int(os.getenv("MAJKA_SPECULATIVE_MAX_CONCURRENT", "2"))
+SPECULATIVE_WAIT_SECONDS = float(os.getenv("MAJKA_SPECULATIVE_WAIT_SECONDS", "30"))
+CATALOG_CACHE_SECONDS = float(os.getenv("MAJKA_CATALOG_CACHE_SECONDS", "60"))
+ANSWER_WRITE_BEHIND = os.getenv("MAJKA_ANSWER_WRITE_BEHIND", "0") == "1"
+ANSWER_BUFFER_PATH = os.getenv("MAJKA_ANSWER_BUFFER_PATH", "answer_buffer.sqlite3")
+ANSWER_FLUSH_MS = int(os.getenv("MAJKA_ANSWER_FLUSH_MS", "250"))
+ANSWER_FLUSH_BATCH = int(os.getenv("MAJKA_ANSWER_FLUSH_BATCH", "100"))
+ANSWER_BUFFER_SYNC = os.getenv("MAJKA_ANSWER_BUFFER_SYNC", "NORMAL")
+RPC_BUNDLES = os.getenv("MAJKA_RPC_BUNDLES", "off")
+INTAKE_SNAPSHOTS = os.getenv("MAJKA_INTAKE_SNAPSHOTS", "off")
+SESSION_SECRET = os.getenv("MAJKA_SESSION_SECRET")
+SESSION_TTL_SECONDS = int(os.getenv("MAJKA_SESSION_TTL_SECONDS", "43200"))
+SESSION_MAX_AGE_SECONDS = int(os.getenv("MAJKA_SESSION_MAX_AGE_SECONDS", str(30 * 86400)))
+WORKLOAD_ISOLATION = os.getenv("MAJKA_WORKLOAD_ISOLATION", "1") == "1"
+LLM_WORKERS = int(os.getenv("MAJKA_LLM_WORKERS", "8"))
+LLM_MAX_PENDING = int(os.getenv("MAJKA_LLM_MAX_PENDING", "32"))
+DB_WORKERS = int(os.getenv("MAJKA_DB_WORKERS", "16"))
+DB_MAX_PENDING = int(os.getenv("MAJKA_DB_MAX_PENDING", "256"))
+CPU_WORKERS = int(os.getenv("MAJKA_CPU_WORKERS", str(os.cpu_count() or 2)))
+CPU_MAX_PENDING = int(os.getenv("MAJKA_CPU_MAX_PENDING", "64"))
+ADMIN_TOKEN = os.getenv("MAJKA_ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("MAJKA_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("MAJKA_PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("MAJKA_PROFILE_DIR", "profiles")
+PROFILE_RING_SIZE = int(os.getenv("MAJKA_PROFILE_RING_SIZE", "50"))
+PLAN_ENGINE = os.getenv("MAJKA_PLAN_ENGINE", "hedged")
+LLM_DEADLINE_SECONDS = float(os.getenv("MAJKA_LLM_DEADLINE_SECONDS", "20"))
+INCREMENTAL_PLANS = os.getenv("MAJKA_INCREMENTAL_PLANS", "1") == "1"
+INCREMENTAL_MAX_CHANGES = int(os.getenv("MAJKA_INCREMENTAL_MAX_CHANGES", "3"))
+MODEL_LITE = os.getenv("MAJKA_MODEL_LITE", "gemini-2.5-flash-lite")
+MODEL_FLASH = os.getenv("MAJKA_MODEL_FLASH", PLAN_MODEL_NAME)
+MODEL_LITE_SLO_SECONDS = float(os.getenv("MAJKA_MODEL_LITE_SLO_SECONDS", "4"))
+MODEL_FLASH_SLO_SECONDS = float(os.getenv("MAJKA_MODEL_FLASH_SLO_SECONDS", "15"))
+# USD per million input/output tokens.
+MODEL_LITE_PRICE = os.getenv("MAJKA_MODEL_LITE_PRICE", "0.10/0.40")
+MODEL_FLASH_PRICE = os.getenv("MAJKA_MODEL_FLASH_PRICE", "0.30/2.50")
+MODEL_ROUTES = os.getenv("MAJKA_MODEL_ROUTES", "chat.small_talk=lite,chat=flash,plan=flash")
+MODEL_FALLBACKS = os.getenv("MAJKA_MODEL_FALLBACKS", "lite=flash,flash=lite")
+
+configure_logging()
+log = get_logger("majka.api")
+
+_client_lock = threading.Lock()
+_supabase_client = None
+_genai_module = None
+
+
+def get_supabase():
+    """Return the shared Supabase client, creating it on first use."""
+    global _supabase_client
+    if _supabase_client is not None:
+        return _supabase_client
+    with _client_lock:
+        if _supabase_client is None:
+            if not SUPABASE_URL or not SUPABASE_KEY:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY/SUPABASE_ANON_KEY",
+                )
+            from supabase import ClientOptions, create_client
+
+            options = None
+            if SUPABASE_TUNED_TRANSPORT:
+                from .http_transport import build_http_client
+
+                options = ClientOptions(httpx_client=build_http_client())
+            _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    return _supabase_client
+
+
+def get_genai():
+    """Return the configured ``google.generativeai`` module, importing it lazily."""
+    global _genai_module
+    if _genai_module is not None:
+        return _genai_module
+    with _client_lock:
+        if _genai_module is None:
+            if not GEMINI_API_KEY:
+                raise HTTPException(
+                    status_code=500,
+                    detail="GEMINI_API_KEY is required for Majka AI features.",
+                )
+            import google.generativeai as genai
+
+            genai.configure(api_key=GEMINI_API_KEY)
+            _genai_module = genai
+    return _genai_module
+
+
+def _build_model(tier: ModelTier, kind: str):
+    genai = get_genai()
+    if kind == "chat":
+        return genai.GenerativeModel(
+            model_name=tier.model_name,
+            system_instruction=CHAT_SYSTEM_PROMPT,
+            safety_settings=CHAT_SAFETY_SETTINGS,
+        )
+    return genai.GenerativeModel(tier.model_name)
+
+
+def _model_tier(name: str, model_name: str, slo_seconds: float, price: str) -> ModelTier:
+    input_price, _, output_price = price.partition("/")
+    return ModelTier(
+        name,
+        model_name,
+        slo_seconds or None,
+        float(input_price or 0),
+        float(output_price or 0),
+    )
+
+
+model_router = ModelRouter(
+    {
+        "lite": _model_tier("lite", MODEL_LITE, MODEL_LITE_SLO_SECONDS, MODEL_LITE_PRICE),
+        "flash": _model_tier("flash", MODEL_FLASH, MODEL_FLASH_SLO_SECONDS, MODEL_FLASH_PRICE),
+    },
+    parse_mapping(MODEL_ROUTES),
+    parse_mapping(MODEL_FALLBACKS),
+    _build_model,
+    max_workers=2 * LLM_WORKERS,
+)
+
+
+def get_chat_model():
+    """Return the Majka chat model for full questions, building it on first use."""
+    return model_router.model(model_router.tier_for("chat"), "chat")
+
+
+def _client_status() -> dict:
+    return {
+        "supabase": "ready" if _supabase_client is not None else "cold",
+        "gemini": "ready" if model_router.warmed() else "cold",
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_CLIENTS_ON_STARTUP:
+        try:
+            get_supabase()
+            get_chat_model()
+        except HTTPException as exc:
+            log.warning("clients.warmup_skipped", detail=exc.detail)
+    if answer_buffer:
+        answer_buffer.start()
+    yield
+    if answer_buffer:
+        answer_buffer.close()
+    model_router.shutdown()
+    for executor in (llm_pool, db_pool, cpu_pool):
+        if executor:
+            executor.shutdown()
+
+
+def _build_job_queue() -> JobQueue:
+    if JOB_BACKEND == "redis":
+        store = RedisJobStore.from_url(JOB_REDIS_URL, JOB_TTL_SECONDS)
+    else:
+        store = InMemoryJobStore(JOB_TTL_SECONDS)
+    return JobQueue(
+        store,
+        max_workers=JOB_WORKERS,
+        max_pending=JOB_MAX_PENDING,
+        webhook_hosts=JOB_WEBHOOK_HOSTS,
+    )
+
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def _require_default_tables(setting: str):
+    """The SQL functions name the tables directly, so ``SUPABASE_*_TABLE`` overrides cannot apply."""
+    tables = (
+        ("SUPABASE_MOTHERS_TABLE", SUPABASE_MOTHERS_TABLE, "mothers"),
+        ("SUPABASE_QUESTIONS_TABLE", SUPABASE_QUESTIONS_TABLE, "questions"),
+        ("SUPABASE_ANSWERS_TABLE", SUPABASE_ANSWERS_TABLE, "answers"),
+        ("SUPABASE_OPTIONS_TABLE", SUPABASE_OPTIONS_TABLE, "question_options"),
+    )
+    renamed = [f"{var}={name}" for var, name, default in tables if name != default]
+    if renamed:
+        raise RuntimeError(
+            f"{setting}=supabase uses the default table names; unset {', '.join(renamed)} "
+            "or edit the SQL functions to match."
+        )
+
+
+def _build_bundle_store():
+    if RPC_BUNDLES == "supabase":
+        _require_default_tables("MAJKA_RPC_BUNDLES")
+        return SupabaseBundleStore(get_supabase)
+    if RPC_BUNDLES == "sqlite":
+        raise RuntimeError(
+            "MAJKA_RPC_BUNDLES=sqlite is not supported by the API: the stand-in never sees "
+            "writes. Use bundles.SqliteBundleStore directly for offline benchmarks."
+        )
+    return None
+
+
+def _build_snapshot_store():
+    if INTAKE_SNAPSHOTS == "supabase":
+        _require_default_tables("MAJKA_INTAKE_SNAPSHOTS")
+        return SupabaseSnapshotStore(get_supabase, MAX_QUESTION_ORDER)
+    if INTAKE_SNAPSHOTS == "sqlite":
+        raise RuntimeError(
+            "MAJKA_INTAKE_SNAPSHOTS=sqlite is not supported by the API: the stand-in has no "
+            "question catalog and its answers never reach Supabase. Use "
+            "snapshots.SqliteSnapshotStore directly for offline benchmarks."
+        )
+    return None
 
-app = FastAPI()
+
+def _build_session_tokens() -> SessionTokens:
+    secret = SESSION_SECRET
+    if not secret:
+        log.warning(
+            "session.ephemeral_secret",
+            detail="MAJKA_SESSION_SECRET is not set; tokens will not survive restarts "
+            "or work across workers.",
+        )
+        secret = secrets.token_urlsafe(32)
+    return SessionTokens(secret, SESSION_TTL_SECONDS, SESSION_MAX_AGE_SECONDS)
+
+
+# Separate pools so slow Gemini calls cannot starve the quick Supabase-bound
+# endpoints (see executors.py). Disabled, everything uses Starlette's pool.
+llm_pool = BoundedExecutor("llm", LLM_WORKERS, LLM_MAX_PENDING) if WORKLOAD_ISOLATION else None
+db_pool = BoundedExecutor("db", DB_WORKERS, DB_MAX_PENDING) if WORKLOAD_ISOLATION else None
+cpu_pool = BoundedExecutor("cpu", CPU_WORKERS, CPU_MAX_PENDING) if WORKLOAD_ISOLATION else None
+plan_jobs = _build_job_queue()
+profiler = StackSampler(PROFILE_INTERVAL_MS)
+profile_ring = ProfileRing(PROFILE_DIR, PROFILE_RING_SIZE)
+session_tokens = _build_session_tokens()
+bundle_store = _build_bundle_store()
+snapshot_store = _build_snapshot_store()
+plan_cache = (
+    SqlitePlanCache(PLAN_CACHE_PATH, PLAN_CACHE_TTL_SECONDS)
+    if PLAN_CACHE_PATH
+    else PlanCache(PLAN_CACHE_MAX_ENTRIES, PLAN_CACHE_TTL_SECONDS)
+)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -154,6 +458,154 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def _is_admin(token: str | None) -> bool:
+    return bool(ADMIN_TOKEN and token) and hmac.compare_digest(
+        token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")
+    )
+
+
+def require_admin(x_majka_admin_token: str | None = Header(default=None)):
+    if not _is_admin(x_majka_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Sample-profile a fraction of requests, or any with a valid debug header."""
+    if not (
+        _is_admin(request.headers.get("x-majka-profile"))
+        or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE)
+    ):
+        return await call_next(request)
+    session = ProfileSession(request_id_var.get(), request.method, request.url.path)
+    token = start_session(session)
+    profiler.begin(session)
+    status = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        profiler.end(session)
+        stop_session(token)
+        record = session.to_record(status, PROFILE_INTERVAL_MS)
+        await run_in_threadpool(profile_ring.save, record)
+    response.headers["X-Majka-Profile-Id"] = session.id
+    return response
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag every log record of a request with its id (``X-Request-ID``)."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = bind_request(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.get("/health")
+def health():
+    """Liveness probe; never touches Supabase or Gemini."""
+    return {"status": "ok", "clients": _client_status()}
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    if answer_buffer:
+        metrics.set_gauge("answers.pending", answer_buffer.pending_count())
+    return metrics.snapshot()
+
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return {"profiles": profile_ring.list()}
+
+
+@app.get(
+    "/api/admin/profiles/collapsed",
+    dependencies=[Depends(require_admin)],
+    response_class=PlainTextResponse,
+)
+def merged_profile(path: str | None = None):
+    """Collapsed stacks summed over every stored profile (optionally one path)."""
+    return collapsed(profile_ring.merged(path))
+
+
+@app.get(
+    "/api/admin/profiles/{profile_id}",
+    dependencies=[Depends(require_admin)],
+    response_class=PlainTextResponse,
+)
+def get_profile(profile_id: str):
+    record = profile_ring.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return collapsed(record["stacks"])
+
+
+@app.get("/health/ready")
+def readiness():
+    """Readiness probe; ``503`` while configuration needed to serve traffic is missing."""
+    missing = []
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        missing.append("supabase")
+    if not GEMINI_API_KEY:
+        missing.append("gemini")
+    return JSONResponse(
+        status_code=503 if missing else 200,
+        content={
+            "status": "ok" if not missing else "degraded",
+            "missing_config": missing,
+            "clients": _client_status(),
+        },
+    )
+
+
+def _bearer_token(authorization: str | None) -> str:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise HTTPException(
+            status_code=401,
+            detail="Expected a Bearer session token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token.strip()
+
+
+def _invalid_session(exc: InvalidToken) -> HTTPException:
+    return HTTPException(
+        status_code=401, detail=str(exc), headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+def session_claims(authorization: str | None = Header(default=None)) -> dict | None:
+    """Verified claims from an ``Authorization: Bearer`` token, if one was sent.
+
+    Tokens only save the profile read, so a missing, malformed, expired or
+    foreign-secret token (another worker, or before a restart without
+    ``MAJKA_SESSION_SECRET``) counts as no token: the caller reads the profile.
+    """
+    if not authorization:
+        return None
+    try:
+        return session_tokens.verify(_bearer_token(authorization))
+    except (HTTPException, InvalidToken) as exc:
+        log.info("session.token_ignored", reason=getattr(exc, "detail", None) or str(exc))
+        return None
+
+
+def _profile_from_claims(mother_id: int, claims: dict | None) -> dict | None:
+    if claims is None:
+        return None
+    if claims.get("sub") != mother_id:
+        raise HTTPException(status_code=403, detail="Session token belongs to another profile")
+    return {"name": claims.get("name"), "delivered_at": claims.get("delivered_at")}
+
+
 def _resp_error(resp):
     return getattr(resp, "error", None)
 
@@ -163,14 +615,21 @@ def _resp_data(resp):
 
 
 def _hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    import bcrypt
+
+    hashed = call_on(cpu_pool, bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt())
+    return hashed.decode("utf-8")
 
 
 def _verify_password(password: str, hashed: str | None) -> bool:
     if not hashed:
         return False
+    import bcrypt
+
     try:
-        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+        return call_on(
+            cpu_pool, bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8")
+        )
     except ValueError:
         return False
 
@@ -212,7 +671,7 @@ def _build_option_lookup(question_ids: list[int]) -> dict[int, dict[str, str]]:
     if not question_ids:
         return {}
     resp = (
-        supabase.table(SUPABASE_OPTIONS_TABLE)
+        get_supabase().table(SUPABASE_OPTIONS_TABLE)
         .select("question_id,value,label")
         .in_("question_id", question_ids)
         .execute()
@@ -242,9 +701,9 @@ def _map_answer_text(
     return answer_text
 
 
-def _fetch_answer_pairs(mother_id: int):
+def _fetch_question_catalog() -> list[dict]:
     questions_resp = (
-        supabase.table(SUPABASE_QUESTIONS_TABLE)
+        get_supabase().table(SUPABASE_QUESTIONS_TABLE)
         .select("id,text,order_index")
         .eq("is_active", True)
         .lte("order_index", MAX_QUESTION_ORDER)
@@ -254,15 +713,40 @@ def _fetch_answer_pairs(mother_id: int):
     q_error = _resp_error(questions_resp)
     if q_error:
         raise HTTPException(status_code=500, detail=str(q_error))
+    return _resp_data(questions_resp) or []
 
-    questions = _resp_data(questions_resp) or []
-    question_map = {q["id"]: q for q in questions}
 
+def _build_answer_pairs(
+    questions: list[dict],
+    option_lookup: dict[int, dict[str, str]],
+    answer_map: dict[int, str],
+) -> list[dict]:
+    pairs = []
+    for question in questions:
+        raw_answer = answer_map.get(question["id"])
+        answer = _map_answer_text(question["id"], raw_answer or "", option_lookup)
+        if answer:
+            pairs.append(
+                {
+                    "question": question["text"],
+                    "answer": answer,
+                    "order_index": question["order_index"],
+                }
+            )
+    return pairs
+
+
+def _fetch_answer_pairs(mother_id: int):
+    snapshot = _intake_snapshot(mother_id)
+    if snapshot is not None:
+        return snapshot["pairs"]
+
+    questions = _fetch_question_catalog()
     question_ids = [q["id"] for q in questions]
     option_lookup = _build_option_lookup(question_ids)
 
     answers_resp = (
-        supabase.table(SUPABASE_ANSWERS_TABLE)
+        get_supabase().table(SUPABASE_ANSWERS_TABLE)
         .select("question_id,answer_text")
         .eq("mother_id", mother_id)
         .execute()
@@ -273,25 +757,13 @@ def _fetch_answer_pairs(mother_id: int):
 
     answers = _resp_data(answers_resp) or []
     answer_map = {row["question_id"]: row["answer_text"] for row in answers}
-
-    pairs = []
-    for question in questions:
-        raw_answer = answer_map.get(question["id"])
-        answer = _map_answer_text(question["id"], raw_answer or "", option_lookup)
-        if answer:
-            pairs.append(
-                {
-                    "question": question["text"],
-                    "answer": answer,
-                    "order_index": question["order_index"],
-                }
-            )
-    return pairs
+    answer_map.update(_pending_answers(mother_id))
+    return _build_answer_pairs(questions, option_lookup, answer_map)
 
 
 def _fetch_mother_profile(mother_id: int):
     resp = (
-        supabase.table(SUPABASE_MOTHERS_TABLE)
+        get_supabase().table(SUPABASE_MOTHERS_TABLE)
         .select("name,age,country,delivered_at")
         .eq("id", mother_id)
         .limit(1)
@@ -306,6 +778,100 @@ def _fetch_mother_profile(mother_id: int):
     return data[0]
 
 
+def _fetch_context(mother_id: int, profile: dict | None = None) -> tuple[dict, list[dict]]:
+    """Profile and labelled QA pairs, in one RPC round trip when bundles are on.
+
+    Mothers with answers still in the write-behind buffer take the table path
+    so the overlay applies. A ``profile`` from session claims skips the
+    profile read on that path.
+    """
+    if bundle_store and not _pending_answers(mother_id):
+        bundle = bundle_store.context_bundle(mother_id, MAX_QUESTION_ORDER)
+        if not bundle:
+            raise HTTPException(status_code=404, detail="Mother profile not found")
+        return bundle["profile"], bundle.get("pairs") or []
+    if profile is not None:
+        return profile, _fetch_answer_pairs(mother_id)
+    return _fetch_mother_profile(mother_id), _fetch_answer_pairs(mother_id)
+
+
+_catalog_cache: dict = {"ids": None, "loaded_at": 0.0}
+
+
+def _active_question_ids() -> set[int]:
+    """Ids of the active intake catalog, cached for ``CATALOG_CACHE_SECONDS``."""
+    if (
+        _catalog_cache["ids"] is not None
+        and time.monotonic() - _catalog_cache["loaded_at"] < CATALOG_CACHE_SECONDS
+    ):
+        return _catalog_cache["ids"]
+    resp = (
+        get_supabase().table(SUPABASE_QUESTIONS_TABLE)
+        .select("id")
+        .eq("is_active", True)
+        .lte("order_index", MAX_QUESTION_ORDER)
+        .execute()
+    )
+    error = _resp_error(resp)
+    if error:
+        raise HTTPException(status_code=500, detail=str(error))
+    ids = {row["id"] for row in _resp_data(resp) or []}
+    _catalog_cache.update(ids=ids, loaded_at=time.monotonic())
+    return ids
+
+
+def _pending_answers(mother_id: int) -> dict[int, str]:
+    """Answers acknowledged by the write-behind buffer but not yet in Supabase."""
+    return answer_buffer.pending_for(mother_id) if answer_buffer else {}
+
+
+def _intake_snapshot(mother_id: int) -> dict | None:
+    """The mother's materialized intake, or ``None`` to use the table reads.
+
+    Mothers with answers still in the write-behind buffer take the table path
+    so the overlay applies. Missing snapshots (older mothers) are built once.
+    """
+    if not snapshot_store or _pending_answers(mother_id):
+        return None
+    snapshot = snapshot_store.get(mother_id)
+    if snapshot is None:
+        snapshot = snapshot_store.refresh(mother_id)
+    return snapshot
+
+
+def _answered_question_ids(mother_id: int) -> set[int]:
+    snapshot = _intake_snapshot(mother_id)
+    if snapshot is not None:
+        return set(snapshot["answered_ids"])
+
+    resp = (
+        get_supabase().table(SUPABASE_ANSWERS_TABLE)
+        .select("question_id")
+        .eq("mother_id", mother_id)
+        .execute()
+    )
+    error = _resp_error(resp)
+    if error:
+        raise HTTPException(status_code=500, detail=str(error))
+    answered = {row["question_id"] for row in _resp_data(resp) or []}
+    return answered | set(_pending_answers(mother_id))
+
+
+def _intake_complete(mother_id: int) -> bool:
+    snapshot = _intake_snapshot(mother_id)
+    if snapshot is not None:
+        return snapshot["complete"]
+    active_ids = _active_question_ids()
+    return bool(active_ids) and active_ids <= _answered_question_ids(mother_id)
+
+
+def _on_answers_changed(mother_id: int):
+    """Drop cached and in-flight plans that were built from older answers."""
+    if speculator:
+        speculator.cancel(mother_id)
+    plan_cache.discard_mother(mother_id)
+
+
 def _build_recommendation_prompt(
     pairs: list[dict],
     postpartum_weeks: float | None = None,
@@ -410,20 +976,74 @@ Respond with valid JSON in this shape, using the casual, human tone in all text
 }}
 Do not include backticks or any explanation outside the JSON.
 """
-    print(prompt)
-    with open("prompt.txt", "w") as text_file:
-        text_file.write(prompt)
+    log.debug("plan.prompt", chars=len(prompt), prompt=prompt)
     if mother_name!="Alice":
         return prompt.strip()
     else:
         return p2.strip()
 
 
+def _build_patch_prompt(
+    plan: dict,
+    pairs: list[dict],
+    scope: dict,
+    postpartum_weeks: float | None = None,
+) -> str:
+    """Ask for just the stale parts of ``plan`` after a few answers changed."""
+    qa_section = "\n".join(
+        f"{idx + 1}. Question: {item['question']}\n   Answer: {item['answer']}"
+        for idx, item in enumerate(pairs)
+    )
+    change_section = "\n".join(
+        f"- Question: {change['question']}\n  Before: {change['old']}\n  Now: {change['new']}"
+        for change in scope["changes"]
+    )
+    stale = {"intro": plan.get("intro")}
+    stale_exercises = [
+        {"index": index, **plan["exercises"][index]} for index in scope["exercises"]
+    ]
+    postpartum_text = (
+        f"Approximately {postpartum_weeks:.1f} weeks postpartum."
+        if postpartum_weeks is not None
+        else "Postpartum timing unknown."
+    )
+    prompt = f"""
+You're Majka, the casual, honest postpartum coach who wrote this mother's current plan. A few of her intake answers just changed. Keep the same real, warm, human tone, safety first.
+
+{postpartum_text}
+
+Changed answers:
+{change_section}
+
+All current answers:
+{qa_section}
+
+Current intro:
+{json.dumps(stale)}
+
+Exercises whose copy may refer to the changed answers:
+{json.dumps(stale_exercises)}
+
+Rewrite the intro, and the summary/why/how of the listed exercises only where the changed answers make them outdated. Keep everything else as it is. Respond with valid JSON in this shape:
+{{
+  "intro": "...",
+  "exercises": [
+    {{"index": 0, "summary": "...", "why": "...", "how": "..."}}
+  ]
+}}
+
+Only include the listed exercise indexes. Do not include backticks or any explanation outside the JSON.
+"""
+    log.debug("plan.patch_prompt", chars=len(prompt), prompt=prompt)
+    return prompt.strip()
+
+
 @app.post("/api/mothers")
+@offload(db_pool)
 def create_mother(payload: MotherPayload):
     try:
         existing_resp = (
-            supabase.table(SUPABASE_MOTHERS_TABLE)
+            get_supabase().table(SUPABASE_MOTHERS_TABLE)
             .select("id")
             .eq("name", payload.name)
             .limit(1)
@@ -448,7 +1068,7 @@ def create_mother(payload: MotherPayload):
             else None,
         }
 
-        response = supabase.table(SUPABASE_MOTHERS_TABLE).insert(record).execute()
+        response = get_supabase().table(SUPABASE_MOTHERS_TABLE).insert(record).execute()
         error = _resp_error(response)
         data = _resp_data(response)
         if error or not data:
@@ -457,53 +1077,54 @@ def create_mother(payload: MotherPayload):
                 detail=str(error or "Unable to create mother record"),
             )
 
-        return {"mother_id": data[0]["id"]}
+        created = data[0]
+        return {
+            "mother_id": created["id"],
+            **session_tokens.issue(
+                created["id"], payload.name, created.get("delivered_at", record["delivered_at"])
+            ),
+        }
     except HTTPException:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
-@app.post("/api/auth/login")
-def login(payload: LoginPayload):
+def _fetch_login_record(name: str) -> dict | None:
     resp = (
-        supabase.table(SUPABASE_MOTHERS_TABLE)
+        get_supabase().table(SUPABASE_MOTHERS_TABLE)
         .select("id,password_hash,name,age,country,delivered_at")
-        .eq("name", payload.name)
+        .eq("name", name)
         .limit(1)
         .execute()
     )
     error = _resp_error(resp)
     if error:
         raise HTTPException(status_code=500, detail=str(error))
+    mother = _resp_data(resp) or []
+    return mother[0] if mother else None
 
-    mother = (_resp_data(resp) or [])
-    if not mother:
-        raise HTTPException(status_code=401, detail="Invalid name or password")
-
-    record = mother[0]
-    if not _verify_password(payload.password, record.get("password_hash")):
-        raise HTTPException(status_code=401, detail="Invalid name or password")
 
+def _fetch_raw_answers(mother_id: int) -> dict[str, str]:
     answers_resp = (
-        supabase.table(SUPABASE_ANSWERS_TABLE)
+        get_supabase().table(SUPABASE_ANSWERS_TABLE)
         .select("question_id,answer_text")
-        .eq("mother_id", record["id"])
+        .eq("mother_id", mother_id)
         .order("question_id")
         .execute()
     )
     answers_error = _resp_error(answers_resp)
-    answered_question_ids = set()
-    answered_map: dict[str, str] = {}
     if answers_error:
         raise HTTPException(status_code=500, detail=str(answers_error))
-    for answer in _resp_data(answers_resp) or []:
-        qid = answer["question_id"]
-        answered_question_ids.add(qid)
-        answered_map[str(qid)] = answer.get("answer_text")
+    return {
+        str(answer["question_id"]): answer.get("answer_text")
+        for answer in _resp_data(answers_resp) or []
+    }
 
+
+def _fetch_ordered_question_ids() -> list[int]:
     questions_resp = (
-        supabase.table(SUPABASE_QUESTIONS_TABLE)
+        get_supabase().table(SUPABASE_QUESTIONS_TABLE)
         .select("id,order_index")
         .eq("is_active", True)
         .lte("order_index", MAX_QUESTION_ORDER)
@@ -513,18 +1134,54 @@ def login(payload: LoginPayload):
     questions_error = _resp_error(questions_resp)
     if questions_error:
         raise HTTPException(status_code=500, detail=str(questions_error))
+    return [q["id"] for q in _resp_data(questions_resp) or []]
 
-    questions = _resp_data(questions_resp) or []
-    resume_question_id = None
-    for question in questions:
-        if question["id"] not in answered_question_ids:
-            resume_question_id = question["id"]
-            break
 
-    valid_ids = {str(q["id"]) for q in questions}
-    filtered_answers = {
-        key: value for key, value in answered_map.items() if key in valid_ids
-    }
+@app.post("/api/auth/login")
+@offload(db_pool)
+def login(payload: LoginPayload):
+    bundle = None
+    if bundle_store:
+        # One round trip: mother, ordered catalog ids and raw answers.
+        bundle = bundle_store.login_bundle(payload.name, MAX_QUESTION_ORDER)
+        record = bundle["mother"] if bundle else None
+    else:
+        record = _fetch_login_record(payload.name)
+
+    if not record:
+        raise HTTPException(status_code=401, detail="Invalid name or password")
+    bind_mother(record["id"])
+    if not _verify_password(payload.password, record.get("password_hash")):
+        raise HTTPException(status_code=401, detail="Invalid name or password")
+
+    snapshot = None if bundle else _intake_snapshot(record["id"])
+    if snapshot is not None:
+        resume_question_id = snapshot["resume_question_id"]
+        filtered_answers = snapshot["answers"]
+    else:
+        if bundle:
+            answered_map = dict(bundle.get("answers") or {})
+            question_ids = bundle.get("question_ids") or []
+        else:
+            answered_map = _fetch_raw_answers(record["id"])
+            question_ids = _fetch_ordered_question_ids()
+        pending = _pending_answers(record["id"])
+        if pending:
+            # Stored answers are option labels; queued ones are still raw values.
+            option_lookup = _build_option_lookup(sorted(pending))
+            for qid, answer_text in pending.items():
+                answered_map[str(qid)] = _map_answer_text(qid, answer_text, option_lookup)
+
+        resume_question_id = None
+        for question_id in question_ids:
+            if str(question_id) not in answered_map:
+                resume_question_id = question_id
+                break
+
+        valid_ids = {str(qid) for qid in question_ids}
+        filtered_answers = {
+            key: value for key, value in answered_map.items() if key in valid_ids
+        }
 
     return {
         "mother_id": record["id"],
@@ -536,13 +1193,24 @@ def login(payload: LoginPayload):
         },
         "resume_question_id": resume_question_id,
         "answered_answers": filtered_answers,
+        **session_tokens.issue(record["id"], record.get("name"), record.get("delivered_at")),
     }
 
 
+@app.post("/api/auth/refresh")
+def refresh_session(authorization: str | None = Header(default=None)):
+    """Extend a still-valid session without re-checking the password."""
+    try:
+        return session_tokens.refresh(_bearer_token(authorization))
+    except InvalidToken as exc:
+        raise _invalid_session(exc) from exc
+
+
 @app.get("/api/questions")
+@offload(db_pool)
 def list_questions():
     questions_resp = (
-        supabase.table(SUPABASE_QUESTIONS_TABLE)
+        get_supabase().table(SUPABASE_QUESTIONS_TABLE)
         .select("id,text,order_index,is_active")
         .eq("is_active", True)
         .lte("order_index", MAX_QUESTION_ORDER)
@@ -561,7 +1229,7 @@ def list_questions():
     options_by_question: dict[int, list[dict]] = {qid: [] for qid in question_ids}
     if question_ids:
         options_resp = (
-            supabase.table(SUPABASE_OPTIONS_TABLE)
+            get_supabase().table(SUPABASE_OPTIONS_TABLE)
             .select("id,question_id,label,value,order_index")
             .in_("question_id", question_ids)
             .order("order_index")
@@ -586,13 +1254,96 @@ def list_questions():
     return result
 
 
+def _maybe_speculate(mother_id: int):
+    if not speculator:
+        return
+    try:
+        if _intake_complete(mother_id):
+            speculator.schedule(mother_id)
+    except HTTPException as exc:
+        log.warning("intake.completion_check_failed", mother_id=mother_id, detail=exc.detail)
+
+
+def _flush_answer_batch(rows: list[dict]):
+    """Persist a batch of buffered answers: one delete per mother, one insert."""
+    if snapshot_store:
+        # One transaction that also refreshes each mother's snapshot.
+        snapshot_store.save_answers(rows)
+        return
+    option_lookup = _build_option_lookup(sorted({row["question_id"] for row in rows}))
+    by_mother: dict[int, list[int]] = {}
+    records = []
+    for row in rows:
+        by_mother.setdefault(row["mother_id"], []).append(row["question_id"])
+        records.append(
+            {
+                "mother_id": row["mother_id"],
+                "question_id": row["question_id"],
+                "answer_text": _map_answer_text(
+                    row["question_id"], row["answer_text"], option_lookup
+                ),
+                "created_at": row["created_at"],
+            }
+        )
+    for mother_id, question_ids in by_mother.items():
+        cleanup = (
+            get_supabase().table(SUPABASE_ANSWERS_TABLE)
+            .delete()
+            .eq("mother_id", mother_id)
+            .in_("question_id", question_ids)
+            .execute()
+        )
+        if _resp_error(cleanup):
+            raise RuntimeError(str(_resp_error(cleanup)))
+    response = get_supabase().table(SUPABASE_ANSWERS_TABLE).insert(records).execute()
+    if _resp_error(response):
+        raise RuntimeError(str(_resp_error(response)))
+
+
+def _on_answers_flushed(mother_ids: set[int]):
+    for mother_id in mother_ids:
+        _maybe_speculate(mother_id)
+
+
+answer_buffer = (
+    AnswerBuffer(
+        ANSWER_BUFFER_PATH,
+        _flush_answer_batch,
+        flush_interval_ms=ANSWER_FLUSH_MS,
+        flush_batch=ANSWER_FLUSH_BATCH,
+        on_flushed=_on_answers_flushed,
+        synchronous=ANSWER_BUFFER_SYNC,
+    )
+    if ANSWER_WRITE_BEHIND
+    else None
+)
+
+
 @app.post("/api/answers")
 @app.post("/api/answer")
+@offload(db_pool)
 def save_answer(payload: AnswerPayload):
+    bind_mother(payload.mother_id)
     now = datetime.utcnow().isoformat()
 
+    if answer_buffer:
+        # Acknowledge once the answer is durable locally; the flusher writes
+        # it to Supabase and runs the intake-completion check afterwards.
+        answer_buffer.append(payload.mother_id, payload.question_id, payload.answer, now)
+        _on_answers_changed(payload.mother_id)
+        return {"status": "ok", "answer_id": None, "queued": True}
+
+    if snapshot_store:
+        # Replace the answer and refresh the snapshot in one transaction.
+        answer_id = snapshot_store.save_answer(
+            payload.mother_id, payload.question_id, payload.answer, now
+        )
+        _on_answers_changed(payload.mother_id)
+        _maybe_speculate(payload.mother_id)
+        return {"status": "ok", "answer_id": answer_id}
+
     cleanup = (
-        supabase.table(SUPABASE_ANSWERS_TABLE)
+        get_supabase().table(SUPABASE_ANSWERS_TABLE)
         .delete()
         .eq("mother_id", payload.mother_id)
         .eq("question_id", payload.question_id)
@@ -614,78 +1365,392 @@ def save_answer(payload: AnswerPayload):
         "created_at": now,
     }
 
-    response = supabase.table(SUPABASE_ANSWERS_TABLE).insert(record).execute()
+    response = get_supabase().table(SUPABASE_ANSWERS_TABLE).insert(record).execute()
     error = _resp_error(response)
     if error:
         raise HTTPException(status_code=500, detail=str(error))
 
     data = _resp_data(response) or []
     inserted = data[0] if data else {}
+
+    _on_answers_changed(payload.mother_id)
+    _maybe_speculate(payload.mother_id)
+
     return {
         "status": "ok",
         "answer_id": inserted.get("id"),
     }
 
 
-@app.post("/api/recommendations")
-def generate_recommendations(payload: RecommendationPayload):
-    if not GEMINI_API_KEY:
-        raise HTTPException(
-            status_code=500,
-            detail="GEMINI_API_KEY is not configured on the server.",
-        )
+def _postpartum_context(delivered_at: str | None) -> tuple[float | None, str | None]:
+    """Return ``(postpartum_weeks, delivered_label)`` for a stored delivery date."""
+    if not delivered_at:
+        return None, None
+    try:
+        delivered_dt = datetime.fromisoformat(delivered_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None, delivered_at
+    if delivered_dt.tzinfo:
+        delivered_dt = delivered_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    diff_days = (datetime.utcnow() - delivered_dt).days
+    return max(diff_days / 7, 0), delivered_dt.strftime("%Y-%m-%d")
 
-    pairs = _fetch_answer_pairs(payload.mother_id)
-    if not pairs:
-        raise HTTPException(
-            status_code=400,
-            detail="No answers found for this mother. Please complete the intake first.",
-        )
 
-    mother_profile = _fetch_mother_profile(payload.mother_id)
-    delivered_at = mother_profile.get("delivered_at")
-    postpartum_weeks = None
-    delivered_label = None
-    if delivered_at:
-        try:
-            delivered_dt = datetime.fromisoformat(delivered_at.replace("Z", "+00:00"))
-            if delivered_dt.tzinfo:
-                delivered_dt = delivered_dt.astimezone(timezone.utc).replace(
-                    tzinfo=None
-                )
-            delivered_label = delivered_dt.strftime("%Y-%m-%d")
-            diff_days = (datetime.utcnow() - delivered_dt).days
-            postpartum_weeks = max(diff_days / 7, 0)
-        except ValueError:
-            delivered_label = delivered_at
+def _parse_plan_text(plan_text: str):
+    cleaned = plan_text.strip()
+    if cleaned.startswith("```"):
+        cleaned = re.sub(r"^```(?:json)?", "", cleaned).strip()
+        cleaned = re.sub(r"```$", "", cleaned).strip()
+    try:
+        return json.loads(cleaned)
+    except Exception:
+        return None
+
 
-    prompt = _build_recommendation_prompt(
+def _plan_prompt_for(mother_profile: dict, pairs: list[dict]) -> str:
+    postpartum_weeks, delivered_label = _postpartum_context(
+        mother_profile.get("delivered_at")
+    )
+    return _build_recommendation_prompt(
         pairs,
         postpartum_weeks,
         delivered_label,
         mother_profile.get("name"),
     )
 
+
+def _plan_model_name() -> str:
+    """Model of the tier the ``plan`` route is configured for; part of every plan cache key."""
+    return model_router.tier_for("plan").model_name
+
+
+def _batch_plan_key(mother_id: int, pairs: list[dict]) -> str:
+    """Cache key ``regenerate_plans`` stores under; stable across days, unlike the prompt key."""
+    return batch_plan_key(_plan_model_name(), PLAN_PROMPT_VERSION, mother_id, answers_hash(pairs))
+
+
+def _call_plan_model(prompt: str, route: str = "plan") -> dict:
+    """Generate on the tier routed for ``route``.
+
+    ``model_fallback`` is set when the fallback tier answered instead; such
+    plans are served but not cached.
+    """
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        plan_text = (response.text or "").strip()
+        plan_text, tier = model_router.generate(route, prompt)
         if not plan_text:
             raise ValueError("Empty response from Gemini model")
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Gemini error: {exc}") from exc
+    return {
+        "plan_text": plan_text,
+        "plan": _parse_plan_text(plan_text),
+        "engine": "llm",
+        "model_tier": tier,
+        "model_fallback": tier != model_router.tier_for(route).name,
+    }
+
+
+def _rule_plan_for(
+    mother_profile: dict, pairs: list[dict], fallback_reason: str | None = None
+) -> dict:
+    started = time.perf_counter()
+    postpartum_weeks, _ = _postpartum_context(mother_profile.get("delivered_at"))
+    plan = build_rule_plan(pairs, postpartum_weeks, mother_profile.get("name"), EXERCISES)
+    metrics.inc("plan.rules.seconds", time.perf_counter() - started)
+    metrics.inc("plan.engine.rules")
+    result = {"plan_text": json.dumps(plan), "plan": plan, "engine": "rules"}
+    if fallback_reason:
+        metrics.inc(f"plan.hedge.{fallback_reason}")
+        log.info("plan.rules_fallback", reason=fallback_reason)
+        result["fallback_reason"] = fallback_reason
+    return result
+
+
+def _generate_rule_plan(mother_id: int, profile: dict | None = None) -> dict:
+    """Build the deterministic plan for ``mother_id``; no Gemini involved."""
+    bind_mother(mother_id)
+    profile, pairs = _fetch_context(mother_id, profile)
+    if not pairs:
+        raise HTTPException(
+            status_code=400,
+            detail="No answers found for this mother. Please complete the intake first.",
+        )
+    return _rule_plan_for(profile, pairs)
+
+
+def _remember_plan(mother_id: int, profile: dict, pairs: list[dict], result: dict):
+    if not INCREMENTAL_PLANS:
+        return
+    postpartum_weeks, _ = _postpartum_context(profile.get("delivered_at"))
+    plan_cache.remember(
+        mother_id,
+        {
+            "answers_hash": answers_hash(pairs),
+            "pairs": pairs,
+            "name": profile.get("name"),
+            "weeks": postpartum_weeks,
+            "result": result,
+        },
+    )
+
+
+def _incremental_plan(mother_id: int, profile: dict, pairs: list[dict]) -> dict | None:
+    """Patch the remembered plan when only a few answers changed; ``None`` otherwise."""
+    if not INCREMENTAL_PLANS:
+        return None
+    base = plan_cache.latest(mother_id)
+    if base is None or base.get("name") != profile.get("name"):
+        return None
+    if base["answers_hash"] == answers_hash(pairs):
+        # Same answers; the prompt only moved with the postpartum week count.
+        metrics.inc("plan.incremental.reused")
+        return base["result"]
+    postpartum_weeks, _ = _postpartum_context(profile.get("delivered_at"))
+    scope = plan_scope(base, pairs, postpartum_weeks, INCREMENTAL_MAX_CHANGES)
+    if scope is None:
+        return None
+    plan = base["result"]["plan"]
+    patch = _call_plan_model(
+        _build_patch_prompt(plan, pairs, scope, postpartum_weeks), route="plan.patch"
+    )
+    merged = merge_patch(plan, patch["plan"], scope)
+    if merged is None:
+        metrics.inc("plan.incremental.bad_patch")
+        return None
+    metrics.inc("plan.incremental.patched")
+    metrics.inc("plan.incremental.sections", 1 + len(scope["exercises"]))
+    return {
+        "plan_text": json.dumps(merged),
+        "plan": merged,
+        "engine": "llm",
+        "model_tier": patch["model_tier"],
+        "model_fallback": patch["model_fallback"],
+        "incremental": {"changes": len(scope["changes"]), "exercises": scope["exercises"]},
+    }
+
+
+def _generate_plan(
+    mother_id: int,
+    use_cache: bool = True,
+    source: str = SOURCE_REQUEST,
+    should_store=None,
+    profile: dict | None = None,
+    context: tuple[dict, list[dict]] | None = None,
+) -> dict:
+    """Fetch intake data for ``mother_id`` and ask Gemini for a structured plan.
+
+    Results are cached under a hash of the prompt; a plan written by
+    ``regenerate_plans`` for the same answers is served too. ``should_store`` lets the
+    speculative planner drop results whose answers changed mid-flight.
+    ``profile`` (from session claims) avoids re-reading the mother's profile;
+    ``context`` (``_fetch_context`` output the caller already has) skips the
+    read entirely. When only a few answers changed since the last plan, just the affected
+    sections are regenerated (``plan_delta``). With ``MAJKA_PLAN_ENGINE=hedged``,
+    Gemini failures on request paths fall back to the rule plan
+    (``plan_rules``) instead of surfacing a 500.
+    """
+    bind_mother(mother_id)
+    hedged = PLAN_ENGINE == "hedged" and source == SOURCE_REQUEST
+    if PLAN_ENGINE == "rules":
+        return _generate_rule_plan(mother_id, profile)
+    if not GEMINI_API_KEY and not hedged:
+        raise HTTPException(
+            status_code=500,
+            detail="GEMINI_API_KEY is not configured on the server.",
+        )
+
+    profile, pairs = context if context is not None else _fetch_context(mother_id, profile)
+    if not pairs:
+        raise HTTPException(
+            status_code=400,
+            detail="No answers found for this mother. Please complete the intake first.",
+        )
+    if not GEMINI_API_KEY:
+        return _rule_plan_for(profile, pairs, "error")
+
+    prompt = _plan_prompt_for(profile, pairs)
+
+    cache_key = plan_cache_key(_plan_model_name(), prompt)
+    if use_cache:
+        cached = plan_cache.get(cache_key, count_hit=source == SOURCE_REQUEST)
+        if cached is None:
+            cached = plan_cache.get(
+                _batch_plan_key(mother_id, pairs),
+                count_hit=source == SOURCE_REQUEST,
+                ttl_seconds=PLAN_BATCH_TTL_SECONDS,
+            )
+        if cached is None and source == SOURCE_REQUEST and speculator:
+            if speculator.wait(mother_id, SPECULATIVE_WAIT_SECONDS):
+                cached = plan_cache.get(cache_key)
+        if cached is not None:
+            return cached["result"]
 
-    plan_struct = None
-    cleaned = plan_text.strip()
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```(?:json)?", "", cleaned).strip()
-        cleaned = re.sub(r"```$", "", cleaned).strip()
     try:
-        plan_struct = json.loads(cleaned)
-    except Exception:
-        plan_struct = None
+        result = _incremental_plan(mother_id, profile, pairs) if use_cache else None
+        if result is None:
+            result = _call_plan_model(prompt)
+            metrics.inc("plan.incremental.full")
+    except HTTPException:
+        if not hedged:
+            raise
+        return _rule_plan_for(profile, pairs, "error")
+    metrics.inc("plan.engine.llm")
+    if result.get("model_fallback"):
+        # Keep it out of the cache so the next request tries the routed tier again.
+        metrics.inc("plan.cache.fallback_skipped")
+        return result
+    _remember_plan(mother_id, profile, pairs, result)
+    if should_store is None or should_store():
+        plan_cache.put(cache_key, mother_id, result, source)
+    elif source == SOURCE_SPECULATIVE:
+        metrics.inc("speculative.wasted")
+    return result
+
+
+def _generate_speculative_plan(mother_id: int, is_current):
+    _generate_plan(mother_id, source=SOURCE_SPECULATIVE, should_store=is_current)
+
+
+speculator = (
+    SpeculativePlanner(_generate_speculative_plan, SPECULATIVE_MAX_CONCURRENT)
+    if SPECULATIVE_PLANS
+    else None
+)
+
+
+def _job_urls(job_id: str) -> dict:
+    return {
+        "status_url": f"/api/recommendations/jobs/{job_id}",
+        "events_url": f"/api/recommendations/jobs/{job_id}/events",
+    }
 
-    return {"plan_text": plan_text, "plan": plan_struct}
+
+@app.post("/api/recommendations")
+async def generate_recommendations(
+    payload: RecommendationPayload, claims: dict | None = Depends(session_claims)
+):
+    profile = _profile_from_claims(payload.mother_id, claims)
+    if payload.mode != "job":
+        if PLAN_ENGINE != "hedged":
+            return await run_on(
+                llm_pool,
+                _generate_plan,
+                payload.mother_id,
+                use_cache=not payload.refresh,
+                profile=profile,
+            )
+        # Read the intake once: the deadline fallback reuses it rather than
+        # going back to the database after the deadline is spent.
+        started = time.monotonic()
+        context = await run_on(db_pool, _fetch_context, payload.mother_id, profile)
+        task = asyncio.ensure_future(
+            run_on(
+                llm_pool,
+                _generate_plan,
+                payload.mother_id,
+                use_cache=not payload.refresh,
+                profile=profile,
+                context=context,
+            )
+        )
+        # Past the deadline, answer with the rule plan; the Gemini call keeps
+        # running and lands in the plan cache for the next request.
+        remaining = max(0.0, LLM_DEADLINE_SECONDS - (time.monotonic() - started))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining)
+        except asyncio.TimeoutError:
+            if not context[1]:
+                # No answers: let the generation raise its 400.
+                return await task
+            task.add_done_callback(_consume_task_result)
+            return await run_on(cpu_pool, _rule_plan_for, *context, "deadline")
+    # Enqueueing is quick (and may talk to Redis), so it stays off the LLM pool.
+    return await run_on(db_pool, _enqueue_plan_job, payload, profile)
+
+
+def _consume_task_result(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("plan.background_failed", error=str(task.exception()))
+
+
+def _enqueue_plan_job(payload: RecommendationPayload, profile: dict | None):
+    if payload.webhook_url:
+        try:
+            check_webhook_url(payload.webhook_url, JOB_WEBHOOK_HOSTS)
+        except InvalidWebhook as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # Same mother, same answers, same refresh flag: only then is it the same job.
+    inputs = answers_hash(_fetch_answer_pairs(payload.mother_id))
+    mode = "refresh" if payload.refresh else "cached"
+    try:
+        job, created = plan_jobs.submit(
+            "recommendations",
+            f"recommendations:{payload.mother_id}:{mode}:{inputs}",
+            _generate_plan,
+            payload.mother_id,
+            not payload.refresh,
+            SOURCE_REQUEST,
+            None,
+            profile,
+            webhook_url=payload.webhook_url,
+        )
+    except JobQueueFull as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Plan queue is full, please retry shortly ({exc}).",
+            headers={"Retry-After": "5"},
+        ) from exc
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": not created,
+            **_job_urls(job["id"]),
+        },
+    )
+
+
+@app.get("/api/recommendations/jobs/{job_id}")
+@offload(db_pool)
+def get_recommendation_job(job_id: str):
+    job = plan_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return public_job(job)
+
+
+@app.get("/api/recommendations/jobs/{job_id}/events")
+async def stream_recommendation_job(job_id: str):
+    # The store may be Redis, so every read goes through the thread pool.
+    if not await run_in_threadpool(plan_jobs.get, job_id):
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def events():
+        last_status = None
+        deadline = time.monotonic() + JOB_SSE_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            job = await run_in_threadpool(plan_jobs.get, job_id)
+            if not job:
+                yield "event: error\ndata: {\"error\": \"Job expired\"}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                event = "done" if job["status"] in FINISHED_STATES else "status"
+                yield f"event: {event}\ndata: {json.dumps(public_job(job))}\n\n"
+                if event == "done":
+                    return
+            else:
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_SSE_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 @app.post("/api/guided-session")
@@ -717,13 +1782,15 @@ def start_guided_session(payload: GuidedSessionPayload):
     }
 
 @app.post("/ask-majka")
-def ask_majka(payload: ChatPayload):
+@offload(llm_pool)
+def ask_majka(payload: ChatPayload, claims: dict | None = Depends(session_claims)):
     """
     Endpoint to get a safe, contextual text response from Gemini (LLM).
     
     Fetches all intake data, summarizes it, and injects it into the prompt.
     """
     
+    bind_mother(payload.mother_id)
     if not payload.question:
         raise HTTPException(status_code=400, detail="Please provide a question for Majka.")
     
@@ -731,15 +1798,21 @@ def ask_majka(payload: ChatPayload):
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
 
     try:
-        # 1. Retrieve and Build Full Context (Profile + QA Answers)
-        full_context_string, user_data = _build_chat_context(payload.mother_id)
+        # 1. Retrieve and Build Context (full intake only when the question needs it)
+        route = classify_chat(payload.question)
+        metrics.inc(f"model.route.{route}")
+        profile = _profile_from_claims(payload.mother_id, claims)
+        if needs_intake_context(route):
+            full_context_string, user_data = _build_chat_context(payload.mother_id, profile)
+        else:
+            full_context_string, user_data = _build_small_talk_context(payload.mother_id, profile)
         
         # 2. Construct Final Prompt
         full_prompt = full_context_string + "\n\nUser's Current Question: " + payload.question
 
-        # 3. Call the Gemini model for the text response
-        response = chat_model.generate_content(full_prompt)
-        ai_answer = (response.text or "I'm here for you, mama.").strip()
+        # 3. Call the routed Gemini tier for the text response
+        answer_text, _ = model_router.generate(route, full_prompt, kind="chat")
+        ai_answer = answer_text or "I'm here for you, mama."
 
         # 4. Send the answer and basic user data back
         return {"answer": ai_answer, "user_data": user_data}
@@ -749,7 +1822,7 @@ def ask_majka(payload: ChatPayload):
         raise
     except Exception as exc:
         # Catch unexpected errors (e.g., Gemini service failure)
-        print(f"Gemini Error for mother {payload.mother_id}: {exc}")
+        log.exception("chat.gemini_failed", error=str(exc))
         raise HTTPException(
             status_code=500, 
             detail="Failed to get response from AI"
@@ -774,9 +1847,10 @@ def get_user_data_and_age(mother_id: int):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid mother ID format. Must be an integer.")
 
-    if supabase is None:
-        raise HTTPException(status_code=503, detail="Database service is unavailable.")
-    
+    from postgrest.exceptions import APIError
+
+    supabase = get_supabase()
+
     try:
         # Use SUPABASE_MOTHERS_TABLE (defined in your main.py environment)
         response = (
@@ -798,7 +1872,7 @@ def get_user_data_and_age(mother_id: int):
         
         for field in required_fields:
             if user_profile.get(field) is None:
-                print(f"Missing data error for mother {mother_id_int}: '{field}' is null or missing.")
+                log.error("profile.field_missing", mother_id=mother_id_int, field=field)
                 raise HTTPException(
                     status_code=500, 
                     detail=f"User profile incomplete. Missing required field: '{field}'."
@@ -816,7 +1890,7 @@ def get_user_data_and_age(mother_id: int):
             try:
                 delivered_date = datetime.strptime(delivered_at_str, "%Y-%m-%d %H:%M:%S%z")
             except ValueError:
-                print(f"Unparseable delivered_at format: {delivered_at_str}")
+                log.error("profile.delivered_at_unparseable", value=delivered_at_str)
                 raise HTTPException(
                     status_code=500, 
                     detail="User profile contains unparseable 'delivered_at' date format."
@@ -843,19 +1917,20 @@ def get_user_data_and_age(mother_id: int):
         if "No rows returned" in error_message or "not found" in error_message:
             raise HTTPException(status_code=404, detail=f"Mother with ID '{mother_id_int}' not found.")
         
-        print(f"Unexpected Supabase query error for ID {mother_id_int}: {error_message}")
+        log.error("profile.query_failed", mother_id=mother_id_int, error=error_message)
         raise HTTPException(status_code=500, detail="An internal database error occurred.")
     except HTTPException:
         # Re-raise exceptions raised internally
         raise
     except Exception as e:
         # Catch other unexpected errors
-        print(f"General database error for ID {mother_id_int}: {e}")
+        log.exception("profile.lookup_failed", mother_id=mother_id_int, error=str(e))
         raise HTTPException(status_code=500, detail="An unexpected error occurred during data retrieval.")
     
-def _build_chat_context(mother_id: int) -> tuple[str, dict]:
+def _build_chat_context(mother_id: int, profile: dict | None = None) -> tuple[str, dict]:
     """
     Fetches mother profile and all intake answers, formats them for the LLM.
+    A ``profile`` taken from session claims is used instead of the profile read.
 
     Returns: (context_string, user_data_dict)
     """
@@ -864,8 +1939,7 @@ def _build_chat_context(mother_id: int) -> tuple[str, dict]:
     
     try:
         # These utility functions are assumed to be present and working:
-        mother_profile = _fetch_mother_profile(mother_id) 
-        qa_pairs = _fetch_answer_pairs(mother_id)
+        mother_profile, qa_pairs = _fetch_context(mother_id, profile)
     except HTTPException:
         raise
     except Exception as e:
@@ -918,17 +1992,37 @@ def _build_chat_context(mother_id: int) -> tuple[str, dict]:
 
     return context_prefix + context_intake, user_data
 
+def _build_small_talk_context(mother_id: int, profile: dict | None = None) -> tuple[str, dict]:
+    """Name-only context for small talk; skips the intake read."""
+    if profile is None:
+        profile = _fetch_mother_profile(mother_id)
+    context = (
+        f"The user's name is **{profile.get('name') or 'mama'}**. "
+        "This is a short, casual message: reply briefly and warmly."
+    )
+    return context, {"user_name": profile.get("name")}
+
+
 @app.get("/api/mothers/{mother_id}/profile")
+@offload(db_pool)
 def get_mother_profile_detail(mother_id: int):
-    profile = _fetch_mother_profile(mother_id)
-    answers = _fetch_answer_pairs(mother_id)
+    bind_mother(mother_id)
+    profile, answers = _fetch_context(mother_id)
     return {"profile": profile, "answers": answers}
 
 
 @app.post("/api/mothers/{mother_id}/retake")
+@offload(db_pool)
 def reset_mother_answers(mother_id: int):
+    bind_mother(mother_id)
+    if answer_buffer:
+        answer_buffer.discard_mother(mother_id)
+    if snapshot_store:
+        snapshot_store.reset_answers(mother_id)
+        _on_answers_changed(mother_id)
+        return {"status": "ok"}
     resp = (
-        supabase.table(SUPABASE_ANSWERS_TABLE)
+        get_supabase().table(SUPABASE_ANSWERS_TABLE)
         .delete()
         .eq("mother_id", mother_id)
         .execute()
@@ -936,4 +2030,5 @@ def reset_mother_answers(mother_id: int):
     error = _resp_error(resp)
     if error:
         raise HTTPException(status_code=500, detail=str(error))
+    _on_answers_changed(mother_id)
     return {"status": "ok"}
@@ -0,0 +1,36 @@
+"""Process-local counters and gauges exposed through ``GET /api/metrics``."""
+
+import threading
+
+
+class Metrics:
+    """Thread-safe named counters and gauges."""
+
+    def __init__(self):
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def max_gauge(self, name: str, value: float):
+        """Raise gauge ``name`` to ``value`` if it is higher (peak tracking)."""
+        with self._lock:
+            if value > self._gauges.get(name, float("-inf")):
+                self._gauges[name] = value
+
+    def snapshot(self, prefix: str = "") -> dict:
+        with self._lock:
+            return {
+                "counters": {k: v for k, v in self._counters.items() if k.startswith(prefix)},
+                "gauges": {k: v for k, v in self._gauges.items() if k.startswith(prefix)},
+            }
+
+
+metrics = Metrics()
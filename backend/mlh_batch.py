@@ -0,0 +1,261 @@
+"""Re-score an archive of recorded exercise clips across a process pool.
+
+Run it whenever the thresholds in ``exercise_rules.json`` change. Clips come
+from a directory (every video under it, scored as ``--exercise``, or else as
+the exercise named by the clip's parent folder, e.g. ``archive/bird_dog/a.mp4``)
+or from a manifest (``.csv`` with ``path,exercise`` columns, or ``.jsonl``
+with the same keys).
+
+Each worker process loads one ``PoseRuntime`` (see ``pose_runtime.py``) and
+reuses it for every clip it is given (``MLH.score_video``). Clips run as the same scoring path as
+``MLH.py --input --headless``. Each finished clip is written to
+``<out>/parts/`` as an NPZ (see ``session_output.py``), and a line is appended
+to ``<out>/results.jsonl``. That ledger is the checkpoint: a rerun skips every
+clip already scored with the same rules file, so an interrupted run resumes
+where it stopped. At the end, the parts are consolidated into one columnar
+``<out>/scores_<exercise>.npz`` per exercise. That file has a ``clip`` index
+column, and the clip paths are in ``clips``.
+
+Usage:
+    python backend/mlh_batch.py archive/ --out rescored/ --workers 4
+    python backend/mlh_batch.py clips.csv --out rescored/ --rules exercise_rules.json
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from exercise_rules import compile_rules, load_rules
+
+VIDEO_SUFFIXES = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v"}
+DEFAULT_RULES_PATH = Path(__file__).with_name("exercise_rules.json")
+
+# Worker-process state, set once by _init_worker.
+_mlh = None
+_pose = None
+_registry = None
+_roi_tracking = True
+
+
+def discover_clips(source: Path, exercise: str | None, known: set[str]) -> list[tuple[str, str]]:
+    """``[(path, exercise_key)]`` from a directory or a ``.csv``/``.jsonl`` manifest."""
+    if source.is_dir():
+        clips = []
+        for path in sorted(source.rglob("*")):
+            if path.suffix.lower() not in VIDEO_SUFFIXES:
+                continue
+            key = exercise or path.parent.name
+            if key not in known:
+                print(f"[batch] skipping {path}: no --exercise and '{key}' is not an exercise key")
+                continue
+            clips.append((str(path), key))
+        return clips
+    if source.suffix.lower() == ".jsonl":
+        rows = [json.loads(line) for line in source.read_text().splitlines() if line.strip()]
+    else:
+        with open(source, newline="", encoding="utf-8") as handle:
+            rows = list(csv.DictReader(handle))
+    clips = []
+    for row in rows:
+        path = Path(row["path"])
+        if not path.is_absolute():
+            path = source.parent / path
+        key = row.get("exercise") or exercise
+        if key not in known:
+            raise ValueError(f"{path}: unknown exercise {key!r}")
+        clips.append((str(path), key))
+    return clips
+
+
+def _rules_digest(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()[:12]
+
+
+def _part_path(parts_dir: Path, clip: str, exercise: str, rules: str) -> Path:
+    digest = hashlib.sha1(f"{clip}\0{exercise}\0{rules}".encode()).hexdigest()[:12]
+    return parts_dir / f"{Path(clip).stem}-{exercise}-{digest}.npz"
+
+
+def _load_ledger(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    entries = []
+    for line in path.read_text().splitlines():
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            # A line cut short by an interrupted run.
+            continue
+    return entries
+
+
+def _init_worker(rules_path: str, roi_tracking: bool):
+    global _mlh, _pose, _registry, _roi_tracking
+    import MLH
+    from pose_runtime import PoseRuntime
+
+    _mlh = MLH
+    _registry = compile_rules(load_rules(rules_path), MLH.GOOD_THRESH)
+    _pose = PoseRuntime(MLH.DEFAULT_LEVEL.complexity)
+    print(f"[batch] worker {os.getpid()}: pose model {_pose.status()}")
+    _roi_tracking = roi_tracking
+
+
+def _score_clip(clip: str, exercise: str, part: str) -> dict:
+    from session_output import NpzWriter
+
+    evaluator = _registry[exercise]["evaluator"]
+    tmp = Path(part).with_suffix(".tmp.npz")
+    writer = NpzWriter(tmp, evaluator.score_names)
+    try:
+        summary = _mlh.score_video(clip, evaluator, _pose, writer, roi_tracking=_roi_tracking)
+    except Exception as exc:
+        # Don't leave a half-written part behind for the next run to trip over.
+        with contextlib.suppress(Exception):
+            writer.close()
+        tmp.unlink(missing_ok=True)
+        return {"status": "error", "error": str(exc)}
+    writer.close()
+    os.replace(tmp, part)
+    return {"status": "ok", "worker": os.getpid(), **summary}
+
+
+def consolidate(out_dir: Path, entries: list[dict], rules: str) -> dict[str, str]:
+    """Merge the parts of every clip scored with ``rules`` into one NPZ per exercise."""
+    latest = {
+        (entry["clip"], entry["exercise"]): entry
+        for entry in entries
+        if entry.get("status") == "ok" and entry.get("rules") == rules and Path(entry["part"]).exists()
+    }
+    by_exercise: dict[str, list[dict]] = {}
+    for entry in latest.values():
+        by_exercise.setdefault(entry["exercise"], []).append(entry)
+    written = {}
+    for exercise, group in sorted(by_exercise.items()):
+        columns: dict[str, list] = {}
+        clips = []
+        score_names = None
+        for entry in group:
+            with np.load(entry["part"]) as part:
+                score_names = part["score_names"]
+                for name in ("frame", "time_s", "score", "smooth_score", "sub_scores", "landmarks", "feedback"):
+                    columns.setdefault(name, []).append(part[name])
+                columns.setdefault("clip", []).append(np.full(len(part["frame"]), len(clips), dtype=np.int32))
+            clips.append(entry["clip"])
+        path = out_dir / f"scores_{exercise}.npz"
+        np.savez_compressed(
+            path,
+            clips=np.asarray(clips, dtype=str),
+            score_names=score_names,
+            **{name: np.concatenate(values) for name, values in columns.items()},
+        )
+        written[exercise] = str(path)
+    return written
+
+
+def run_batch(
+    clips: list[tuple[str, str]],
+    out_dir: Path,
+    rules_path: Path,
+    workers: int,
+    roi_tracking: bool = True,
+) -> dict:
+    parts_dir = out_dir / "parts"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    ledger_path = out_dir / "results.jsonl"
+    rules = _rules_digest(rules_path)
+
+    entries = _load_ledger(ledger_path)
+    done = {
+        (entry["clip"], entry["exercise"])
+        for entry in entries
+        if entry.get("status") == "ok" and entry.get("rules") == rules and Path(entry["part"]).exists()
+    }
+    pending = [(clip, exercise) for clip, exercise in clips if (clip, exercise) not in done]
+    print(f"[batch] {len(clips)} clips, {len(clips) - len(pending)} already scored, {len(pending)} to go")
+
+    started = time.monotonic()
+    frames = failed = 0
+    if pending:
+        with (
+            ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(str(rules_path), roi_tracking),
+            ) as pool,
+            open(ledger_path, "a", encoding="utf-8") as ledger,
+        ):
+            if ledger.tell() and not ledger_path.read_bytes().endswith(b"\n"):
+                ledger.write("\n")
+            futures = {}
+            for clip, exercise in pending:
+                part = str(_part_path(parts_dir, clip, exercise, rules))
+                futures[pool.submit(_score_clip, clip, exercise, part)] = (clip, exercise, part)
+            try:
+                for count, future in enumerate(as_completed(futures), 1):
+                    clip, exercise, part = futures[future]
+                    entry = {"clip": clip, "exercise": exercise, "rules": rules, "part": part, **future.result()}
+                    ledger.write(json.dumps(entry) + "\n")
+                    ledger.flush()
+                    entries.append(entry)
+                    elapsed = time.monotonic() - started
+                    if entry["status"] == "ok":
+                        frames += entry["frames"]
+                        detail = f"{entry['frames']} frames at {entry['fps']} fps"
+                    else:
+                        failed += 1
+                        detail = f"failed: {entry['error']}"
+                    print(
+                        f"[batch] {count}/{len(pending)} {exercise} {Path(clip).name}: {detail} "
+                        f"({frames / elapsed:.1f} frames/s overall)"
+                    )
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                print("[batch] interrupted; rerun the same command to resume")
+                raise
+
+    elapsed = time.monotonic() - started
+    return {
+        "clips": len(clips),
+        "scored": len(pending) - failed,
+        "resumed": len(clips) - len(pending),
+        "failed": failed,
+        "frames": frames,
+        "elapsed_seconds": round(elapsed, 2),
+        "frames_per_second": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "clips_per_minute": round((len(pending) - failed) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "outputs": consolidate(out_dir, entries, rules),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score recorded exercise clips in parallel.")
+    parser.add_argument("source", help="Directory of clips, or a .csv/.jsonl manifest with path,exercise")
+    parser.add_argument("--out", required=True, help="Output directory (ledger, parts, consolidated NPZ)")
+    parser.add_argument("--exercise", default=None, help="Exercise key for every clip of a directory")
+    parser.add_argument("--rules", default=str(DEFAULT_RULES_PATH))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--roi", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--restart", action="store_true", help="Ignore clips scored by a previous run.")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out)
+    rules_path = Path(args.rules)
+    if args.restart and (out_dir / "results.jsonl").exists():
+        (out_dir / "results.jsonl").unlink()
+    known = {key for key, spec in load_rules(rules_path).items() if not spec.get("type")}
+    clips = discover_clips(Path(args.source), args.exercise, known)
+    summary = run_batch(clips, out_dir, rules_path, args.workers, args.roi)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
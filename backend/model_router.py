@@ -0,0 +1,157 @@
+"""Routes Gemini calls to model tiers by request complexity and latency.
+
+Each call names a route (``chat.small_talk``, ``chat.general``,
+``chat.personal``, ``plan``, ``plan.patch``), and the route names a tier. A
+tier is a model name plus a latency SLO. When the primary tier has not
+answered within its SLO, the configured fallback tier is started as well and
+the first answer wins. The slow call is left to finish in the background.
+
+``classify_chat`` is a cheap keyword/length heuristic. Small talk ("thanks!")
+goes to the lite tier and skips the intake context. Questions about her own
+body or recovery need the intake and go to flash.
+
+Models come from ``model_factory(tier, kind)``, so tests can route to fake
+objects with a ``generate_content(prompt)`` method. Per-tier metrics
+(``model.<tier>.*``): ``calls``, ``errors``, ``seconds``, ``slo_miss``,
+``fallbacks``, ``input_tokens``, ``output_tokens`` and ``cost_usd`` (tokens
+estimated at 4 characters each).
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from .metrics import metrics
+
+CHAT_SMALL_TALK = "chat.small_talk"
+CHAT_GENERAL = "chat.general"
+CHAT_PERSONAL = "chat.personal"
+
+_SMALL_TALK = re.compile(
+    r"^(hi|hey|hello|thanks|thank you|thx|ok|okay|cool|great|good (morning|night|evening)"
+    r"|bye|goodbye|love you|you're (great|the best)|lol|haha)\b"
+)
+_PERSONAL = re.compile(
+    r"\b(i|i'm|i've|my|me|should i|can i|is it (ok|safe))\b"
+    r"|pain|bleed|leak|incision|c-section|stitches|pelvic|diastasis|fever|exercise|workout"
+)
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    model_name: str
+    slo_seconds: float | None = None
+    input_cost_per_million: float = 0.0
+    output_cost_per_million: float = 0.0
+
+
+def parse_mapping(spec: str) -> dict[str, str]:
+    """``"a=b,c=d"`` -> ``{"a": "b", "c": "d"}``."""
+    mapping = {}
+    for item in spec.split(","):
+        key, _, value = item.strip().partition("=")
+        if key and value:
+            mapping[key.strip()] = value.strip()
+    return mapping
+
+
+def classify_chat(question: str) -> str:
+    text = " ".join(question.lower().split())
+    if len(text) <= 40 and _SMALL_TALK.match(text) and not _PERSONAL.search(text):
+        return CHAT_SMALL_TALK
+    if _PERSONAL.search(text):
+        return CHAT_PERSONAL
+    return CHAT_GENERAL
+
+
+def needs_intake_context(route: str) -> bool:
+    return route != CHAT_SMALL_TALK
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        tiers: dict[str, ModelTier],
+        routes: dict[str, str],
+        fallbacks: dict[str, str],
+        model_factory,
+        max_workers: int = 8,
+    ):
+        self.tiers = tiers
+        self.routes = routes
+        self.fallbacks = fallbacks
+        self.model_factory = model_factory
+        self._models: dict[tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="majka-model")
+
+    def tier_for(self, route: str) -> ModelTier:
+        name = self.routes.get(route) or self.routes.get(route.split(".")[0])
+        return self.tiers[name or next(iter(self.tiers))]
+
+    def model(self, tier: ModelTier, kind: str):
+        key = (tier.name, kind)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._models[key] = self.model_factory(tier, kind)
+        return model
+
+    def warmed(self) -> bool:
+        return bool(self._models)
+
+    def _call(self, tier: ModelTier, kind: str, prompt: str) -> str:
+        prefix = f"model.{tier.name}"
+        started = time.perf_counter()
+        metrics.inc(f"{prefix}.calls")
+        try:
+            response = self.model(tier, kind).generate_content(prompt)
+            text = (response.text or "").strip()
+        except Exception:
+            metrics.inc(f"{prefix}.errors")
+            raise
+        finally:
+            metrics.inc(f"{prefix}.seconds", time.perf_counter() - started)
+        input_tokens, output_tokens = len(prompt) / 4, len(text) / 4
+        metrics.inc(f"{prefix}.input_tokens", input_tokens)
+        metrics.inc(f"{prefix}.output_tokens", output_tokens)
+        metrics.inc(
+            f"{prefix}.cost_usd",
+            (input_tokens * tier.input_cost_per_million + output_tokens * tier.output_cost_per_million)
+            / 1_000_000,
+        )
+        return text
+
+    def generate(self, route: str, prompt: str, kind: str = "plan") -> tuple[str, str]:
+        """Return ``(text, tier_name)``; raises the model's error if every tier failed."""
+        primary = self.tier_for(route)
+        fallback = self.tiers.get(self.fallbacks.get(primary.name, ""))
+        if fallback is None or fallback is primary or not primary.slo_seconds:
+            return self._call(primary, kind, prompt), primary.name
+
+        futures = {self._pool.submit(self._call, primary, kind, prompt): primary}
+        done, _ = wait(futures, timeout=primary.slo_seconds)
+        if not done:
+            metrics.inc(f"model.{primary.name}.slo_miss")
+        elif next(iter(done)).exception() is None:
+            return next(iter(done)).result(), primary.name
+        # Too slow or failed: race (or replace) it with the fallback tier.
+        metrics.inc(f"model.{fallback.name}.fallbacks")
+        futures[self._pool.submit(self._call, fallback, kind, prompt)] = fallback
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result(), futures[future].name
+                error = future.exception()
+        raise error
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
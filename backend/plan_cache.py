@@ -0,0 +1,207 @@
+"""Cache of generated recommendation plans.
+
+Plans are keyed by a hash of the exact prompt sent to the model, so any change
+to a mother's answers, profile or the prompt template produces a new key.
+Entries remember whether they were produced speculatively so we can measure
+how often pre-generation is actually used.
+
+The bulk regeneration command stores its plans under ``batch_plan_key``
+instead: mother id, answers hash, model and prompt version. The prompt
+embeds the postpartum week to one decimal, so a prompt key written by a batch
+run stops matching within a day; the batch key only changes when the answers
+or the prompt version do. Callers read batch entries with their own, longer
+``ttl_seconds``.
+
+Separately, the newest plan per mother is remembered with the answers that
+produced it (``remember``/``latest``). Those records survive answer changes so
+``plan_delta`` can patch a plan instead of regenerating it.
+
+``PlanCache`` is per process; ``SqlitePlanCache`` persists entries in a SQLite
+file so API workers and the bulk regeneration command share them.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import metrics
+
+SOURCE_REQUEST = "request"
+SOURCE_SPECULATIVE = "speculative"
+SOURCE_BATCH = "batch"
+
+
+def plan_cache_key(model_name: str, prompt: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def batch_plan_key(model_name: str, prompt_version: str, mother_id: int, inputs: str) -> str:
+    """Key for a bulk-regenerated plan; ``inputs`` is ``plan_delta.answers_hash``."""
+    return f"batch:{model_name}:{prompt_version}:{mother_id}:{inputs}"
+
+
+class PlanCache:
+    """In-memory LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._latest: OrderedDict[int, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, count_hit: bool = True, ttl_seconds: int | None = None) -> dict | None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > ttl:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            if not count_hit:
+                return entry
+            entry["hits"] += 1
+            if entry["source"] == SOURCE_SPECULATIVE and entry["hits"] == 1:
+                metrics.inc("speculative.hit")
+            return entry
+
+    def put(self, key: str, mother_id: int, result: dict, source: str = SOURCE_REQUEST):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                "mother_id": mother_id,
+                "result": result,
+                "source": source,
+                "created_at": time.time(),
+                "hits": 0,
+            }
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def discard_mother(self, mother_id: int):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e["mother_id"] == mother_id]:
+                self._drop(key)
+
+    def remember(self, mother_id: int, record: dict):
+        with self._lock:
+            self._latest.pop(mother_id, None)
+            self._latest[mother_id] = record
+            while len(self._latest) > self.max_entries:
+                self._latest.popitem(last=False)
+
+    def latest(self, mother_id: int) -> dict | None:
+        with self._lock:
+            return self._latest.get(mother_id)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        if entry["source"] == SOURCE_SPECULATIVE and entry["hits"] == 0:
+            metrics.inc("speculative.wasted")
+
+
+class SqlitePlanCache:
+    """Plan cache stored in a SQLite database (WAL mode)."""
+
+    def __init__(self, path: str, ttl_seconds: int = 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plan_cache (
+                key TEXT PRIMARY KEY,
+                mother_id INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                source TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS plan_cache_mother ON plan_cache (mother_id)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS latest_plans (
+                mother_id INTEGER PRIMARY KEY,
+                record TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, key: str, count_hit: bool = True, ttl_seconds: int | None = None) -> dict | None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mother_id, result, source, created_at, hits FROM plan_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            mother_id, result, source, created_at, hits = row
+            if time.time() - created_at > ttl:
+                self._drop_rows("key = ?", (key,))
+                return None
+            if count_hit:
+                hits += 1
+                self._conn.execute("UPDATE plan_cache SET hits = ? WHERE key = ?", (hits, key))
+                if source == SOURCE_SPECULATIVE and hits == 1:
+                    metrics.inc("speculative.hit")
+        return {
+            "mother_id": mother_id,
+            "result": json.loads(result),
+            "source": source,
+            "created_at": created_at,
+            "hits": hits,
+        }
+
+    def put(self, key: str, mother_id: int, result: dict, source: str = SOURCE_REQUEST):
+        with self._lock:
+            self._drop_rows("key = ?", (key,))
+            self._conn.execute(
+                "INSERT INTO plan_cache (key, mother_id, result, source, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, mother_id, json.dumps(result), source, time.time()),
+            )
+
+    def discard_mother(self, mother_id: int):
+        with self._lock:
+            self._drop_rows("mother_id = ?", (mother_id,))
+
+    def remember(self, mother_id: int, record: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO latest_plans (mother_id, record, created_at) VALUES (?, ?, ?)",
+                (mother_id, json.dumps(record), time.time()),
+            )
+
+    def latest(self, mother_id: int) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM latest_plans WHERE mother_id = ?", (mother_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _drop_rows(self, where: str, params: tuple):
+        wasted = self._conn.execute(
+            f"SELECT COUNT(*) FROM plan_cache WHERE {where} AND source = ? AND hits = 0",
+            params + (SOURCE_SPECULATIVE,),
+        ).fetchone()[0]
+        self._conn.execute(f"DELETE FROM plan_cache WHERE {where}", params)
+        if wasted:
+            metrics.inc("speculative.wasted", wasted)
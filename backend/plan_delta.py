@@ -0,0 +1,109 @@
+"""Incremental plan regeneration.
+
+Every Gemini plan is remembered per mother together with the QA pairs and
+the hash of the answers that produced it (see ``PlanCache.remember``). When
+answers change, ``plan_scope`` diffs the old and new pairs and decides how
+much of the plan is stale:
+
+* a change that flips a red flag, a rule condition (``plan_rules.CONDITIONS``)
+  or the postpartum phase can change which exercises are safe, so the whole
+  plan is regenerated;
+* otherwise only the intro, plus exercises whose copy mentions the changed
+  question or answers, are requested from the model and merged into the
+  stored plan.
+
+A typo fix in one answer then costs a short patch response instead of the
+full 6-8 exercise plan.
+"""
+
+import hashlib
+import json
+import re
+
+from . import plan_rules
+
+_WORD = re.compile(r"[a-z][a-z-]{3,}")
+_STOPWORDS = {
+    "about", "after", "been", "does", "during", "from", "have", "much", "that",
+    "their", "there", "this", "what", "when", "which", "with", "your", "you're",
+}
+
+
+def answers_hash(pairs: list[dict]) -> str:
+    encoded = json.dumps(
+        [[pair.get("question"), pair.get("answer")] for pair in pairs],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def diff_pairs(old: list[dict], new: list[dict]) -> list[dict]:
+    """``{question, old, new}`` for every question whose answer differs."""
+    before = {pair["question"]: pair.get("answer") for pair in old}
+    after = {pair["question"]: pair.get("answer") for pair in new}
+    return [
+        {"question": question, "old": before.get(question), "new": after.get(question)}
+        for question in list(after) + [q for q in before if q not in after]
+        if before.get(question) != after.get(question)
+    ]
+
+
+def _words(*texts) -> set[str]:
+    found = set()
+    for text in texts:
+        found.update(_WORD.findall(str(text or "").lower()))
+    return found - _STOPWORDS
+
+
+def plan_scope(
+    base: dict,
+    pairs: list[dict],
+    postpartum_weeks: float | None,
+    max_changes: int,
+) -> dict | None:
+    """What to regenerate: ``{"changes", "exercises"}`` or ``None`` for everything.
+
+    ``base`` is the remembered record (``pairs``, ``weeks``, ``result``).
+    ``exercises`` lists indexes into the stored plan's exercises; the intro
+    is always refreshed.
+    """
+    plan = (base.get("result") or {}).get("plan")
+    if not isinstance(plan, dict) or not plan.get("exercises"):
+        return None
+    changes = diff_pairs(base["pairs"], pairs)
+    if len(changes) > max_changes:
+        return None
+    if plan_rules.phase_index(base.get("weeks")) != plan_rules.phase_index(postpartum_weeks):
+        return None
+    if plan_rules.red_flags(base["pairs"]) or plan_rules.red_flags(pairs):
+        return None
+    if set(plan_rules.conditions(base["pairs"])) != set(plan_rules.conditions(pairs)):
+        return None
+
+    touched = _words(*(f"{c['question']} {c['old']} {c['new']}" for c in changes))
+    affected = [
+        index
+        for index, exercise in enumerate(plan["exercises"])
+        if touched & _words(exercise.get("why"), exercise.get("summary"), exercise.get("how"))
+    ]
+    return {"changes": changes, "exercises": affected}
+
+
+def merge_patch(plan: dict, patch: dict, scope: dict) -> dict | None:
+    """Apply the model's patch to a copy of ``plan``; ``None`` if it's unusable."""
+    if not isinstance(patch, dict) or not isinstance(patch.get("intro"), str):
+        return None
+    merged = json.loads(json.dumps(plan))
+    merged["intro"] = patch["intro"]
+    updates = patch.get("exercises") or []
+    if not isinstance(updates, list):
+        return None
+    for update in updates:
+        index = update.get("index") if isinstance(update, dict) else None
+        if index not in scope["exercises"]:
+            continue
+        current = merged["exercises"][index]
+        for field in ("summary", "why", "how"):
+            if isinstance(update.get(field), str):
+                current[field] = update[field]
+    return merged
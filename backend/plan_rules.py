@@ -0,0 +1,271 @@
+"""Deterministic, rule-based plan engine.
+
+Maps intake answers and postpartum weeks to 6-8 exercises from ``EXERCISES``
+using the declarative tables below. Before week 2 only the five gentle basics
+(breathing, pelvic floor, pelvic tilt, heel slide, walking) are eligible, so
+those plans have five. It produces the same JSON shape as the
+Gemini plan (greeting, intro, exercises, closing) in well under a
+millisecond. It backs ``MAJKA_PLAN_ENGINE=rules`` and the hedged mode, where
+it answers whenever Gemini misses its deadline or fails.
+
+Matching works on the labelled QA pairs. A clause matches when the answer
+mentions a keyword (and does not negate it, contractions such as "don't"
+included), or when the question mentions it and the answer is affirmative.
+``pain_at_least`` reads explicit ``N/10`` scores from pain answers, and bare
+numbers only when the question asks for a rating, so "about 5 weeks" is not a
+pain score.
+"""
+
+import re
+
+# Mirrors the guardrail in the Gemini prompt: any hit empties the plan.
+RED_FLAGS = {
+    "fever": [{"any": ["fever", "chills"]}],
+    "heavy bleeding": [
+        {"any": ["heavy bleeding", "soaking", "bleeding heavily"]},
+        {"question_any": ["bleed"], "answer_any": ["heavy", "soak", "clot"]},
+    ],
+    "severe or worsening pain": [
+        {"pain_at_least": 4},
+        {"any": ["severe pain", "worsening pain", "pain is getting worse"]},
+    ],
+    "pelvic heaviness or bulging": [{"any": ["heaviness", "bulging", "bulge", "prolapse"]}],
+}
+
+CONDITIONS = {
+    "c_section": [{"any": ["c-section", "c section", "cesarean", "caesarean"]}],
+    "diastasis": [
+        {"any": ["diastasis", "ab separation", "abdominal separation", "doming", "coning"]}
+    ],
+    "leaking": [{"any": ["leak", "incontinence"]}],
+    "back_pain": [{"any": ["back pain", "lower back", "backache"]}],
+    "low_energy": [{"any": ["exhausted", "fatigue", "no sleep", "very tired"]}],
+    "active_before": [{"any": ["very active", "athlete", "gym", "ran regularly", "run regularly"]}],
+}
+
+# min_weeks: earliest postpartum week the move is offered (plus c_section_delay
+# after a caesarean). avoid/boost: condition names. priority breaks ties.
+EXERCISE_RULES = {
+    "breathing": {"min_weeks": 0, "tags": ["core"], "priority": 9, "boost": ["diastasis", "c_section", "low_energy"]},
+    "pelvic_floor": {"min_weeks": 0, "tags": ["pelvic"], "priority": 9, "boost": ["leaking"]},
+    "pelvic_tilt": {"min_weeks": 0, "tags": ["mobility"], "priority": 7, "boost": ["back_pain"]},
+    "heel_slide": {"min_weeks": 0, "tags": ["core"], "priority": 7, "boost": ["diastasis"]},
+    "walking": {"min_weeks": 0, "tags": ["cardio"], "priority": 8, "boost": ["low_energy"]},
+    "glute_bridge": {"min_weeks": 2, "tags": ["strength", "pelvic"], "priority": 7, "boost": ["back_pain", "leaking"]},
+    "bird_dog": {"min_weeks": 3, "tags": ["core", "mobility"], "priority": 6, "boost": ["back_pain"]},
+    "dead_bug": {"min_weeks": 4, "tags": ["core"], "priority": 6, "boost": ["diastasis"], "c_section_delay": 2},
+    "modified_plank": {"min_weeks": 6, "tags": ["core"], "priority": 5, "avoid": ["diastasis"], "c_section_delay": 2},
+    "bodyweight_squat": {"min_weeks": 6, "tags": ["strength"], "priority": 6},
+    "stationary_lunge": {"min_weeks": 6, "tags": ["strength"], "priority": 5},
+    "bent_over_row": {"min_weeks": 6, "tags": ["strength"], "priority": 5, "boost": ["back_pain"]},
+    "bicep_curl": {"min_weeks": 6, "tags": ["strength"], "priority": 4},
+    "overhead_press": {"min_weeks": 8, "tags": ["strength"], "priority": 4, "avoid": ["diastasis"]},
+    "goblet_squat": {"min_weeks": 10, "tags": ["strength"], "priority": 4, "c_section_delay": 2, "boost": ["active_before"]},
+    "weighted_lunge": {"min_weeks": 12, "tags": ["strength"], "priority": 3, "c_section_delay": 2, "boost": ["active_before"]},
+    "single_leg_deadlift": {"min_weeks": 12, "tags": ["strength", "mobility"], "priority": 3, "boost": ["active_before"]},
+    "run_intervals": {"min_weeks": 12, "tags": ["cardio", "impact"], "priority": 3, "avoid": ["leaking", "diastasis"], "c_section_delay": 4, "boost": ["active_before"]},
+    "squat_jump": {"min_weeks": 16, "tags": ["impact", "strength"], "priority": 2, "avoid": ["leaking", "diastasis"], "c_section_delay": 4},
+    "hiit": {"min_weeks": 16, "tags": ["impact", "cardio"], "priority": 2, "avoid": ["leaking", "diastasis", "low_energy"], "c_section_delay": 4},
+}
+
+EXERCISE_COPY = {
+    "breathing": ("Slow 360-degree breaths that wake up your deep core.", "Breathe into your ribs and belly; exhale slowly like you're fogging a mirror.", "it reconnects your diaphragm, deep core and pelvic floor"),
+    "pelvic_floor": ("Gentle lifts and full releases for your pelvic floor.", "Lift like you're stopping gas, hold 3 seconds, then fully let go.", "a strong, relaxed pelvic floor is the base for everything else"),
+    "pelvic_tilt": ("Tiny rocks of your pelvis while lying down.", "Flatten your low back into the floor on the exhale, relax on the inhale.", "it eases a stiff low back and gets your core talking again"),
+    "heel_slide": ("Slide one heel out and back while your core stays steady.", "Exhale as the heel slides, keep your hips still and ribs soft.", "it trains your deep core without straining your belly"),
+    "walking": ("Easy walks, stroller totally allowed.", "Start with 10 minutes, add a few minutes when you feel good the next day.", "it lifts your energy and mood without stressing healing tissue"),
+    "glute_bridge": ("Lift your hips off the floor and squeeze your glutes.", "Exhale and lift, pause at the top, lower slowly.", "strong glutes support your pelvis and back when you carry the baby"),
+    "bird_dog": ("Reach opposite arm and leg from all fours.", "Move slowly, keep your back flat like a tabletop.", "it builds back and core stability for all that lifting"),
+    "dead_bug": ("Lower opposite arm and leg while your back stays down.", "Exhale as you reach, stop before your belly domes.", "it strengthens your core in a controlled, belly-friendly way"),
+    "modified_plank": ("A plank from your knees or an incline.", "Hold 10-20 seconds, breathe the whole time, no doming.", "it starts rebuilding front-core strength safely"),
+    "bodyweight_squat": ("Sit back and stand up, no weights needed.", "Exhale as you stand, knees track over your toes.", "every pick-up-the-baby moment is basically a squat"),
+    "stationary_lunge": ("Split stance, lower and lift.", "Hold onto a chair if you need, keep your torso tall.", "it builds single-leg strength and balance"),
+    "bent_over_row": ("Hinge forward and pull light weights to your ribs.", "Flat back, squeeze your shoulder blades, exhale as you pull.", "it counters the hunched feeding posture"),
+    "bicep_curl": ("Classic curls with light dumbbells or water bottles.", "Elbows tucked, slow on the way down.", "your arms carry a growing baby all day"),
+    "overhead_press": ("Press light weights overhead.", "Ribs down, exhale as you press, don't arch your back.", "it builds shoulder strength for lifting and carrying"),
+    "goblet_squat": ("Squat holding one weight at your chest.", "Exhale on the way up, keep your chest proud.", "it adds load to a pattern you use all day"),
+    "weighted_lunge": ("Lunges with dumbbells at your sides.", "Control the lowering, push through your front heel.", "it builds strong legs for getting up and down off the floor"),
+    "single_leg_deadlift": ("Hinge on one leg, reaching the weight down.", "Soft knee, hips square, move slowly.", "it trains balance and the back of your legs"),
+    "run_intervals": ("Short jog bursts mixed into your walk.", "Try 1 minute easy jog, 2 minutes walk; stop if you leak or feel heaviness.", "it's a gradual, pelvic-floor-friendly way back to running"),
+    "squat_jump": ("Squat, then a small jump, landing softly.", "Exhale on the jump, land quietly with bent knees.", "it rebuilds power once your pelvic floor is ready for impact"),
+    "hiit": ("Short bursts of work with good posture, then rest.", "20 seconds on, 40 off; keep form first and breathe out on effort.", "it boosts fitness in little time"),
+}
+
+CONDITION_REASONS = {
+    "diastasis": "you mentioned ab separation",
+    "c_section": "you're recovering from a caesarean",
+    "leaking": "you mentioned some leaking",
+    "back_pain": "you mentioned back pain",
+    "low_energy": "you're running low on energy",
+    "active_before": "you were active before",
+}
+
+PHASES = [
+    (2, "You're in the very early days, so this is all about gentle reconnection."),
+    (6, "You're still healing, so we're keeping things gentle and building the foundations."),
+    (12, "You're past the first six weeks, so we can start rebuilding strength step by step."),
+    (None, "You're well into recovery, so we're building real strength with smart progressions."),
+]
+
+CLOSINGS = [
+    "Seriously, go drink some water.",
+    "You're doing great, now go rest!",
+    "Listen to your body, and skip a day whenever you need to.",
+]
+
+# Filled past the tag caps up to this; only five moves are eligible before week 2.
+MIN_EXERCISES = 6
+MAX_EXERCISES = 8
+MAX_PER_TAG = 3
+_PAIN_SCORE = re.compile(r"\b(10|[0-9])\s*(?:/|out of)\s*10\b")
+_RATING_SCORE = re.compile(r"\b(10|[0-9])\b")
+_RATING_QUESTION = ("rate", "rating", "scale", "score", "0-10", "1-10", "0 to 10", "1 to 10", "out of 10")
+_AFFIRMATIVE = ("yes", "yeah", "sometimes", "often", "always", "a lot", "a little", "mild", "moderate", "severe")
+_NEGATION = (
+    r"\b(?:no|not|never|without|none|nor|cannot"
+    r"|(?:do|does|did|have|has|had|is|are|was|were|ca|could|would|should|wo|ai)n['’]?t)\b"
+    r"[^.;,]{0,20}"
+)
+
+
+def _negated(answer: str, keyword: str) -> bool:
+    return re.search(_NEGATION + re.escape(keyword), answer) is not None
+
+
+def _clause_matches(clause: dict, question: str, answer: str) -> bool:
+    if "pain_at_least" in clause:
+        if "pain" not in question and "pain" not in answer:
+            return False
+        pattern = _RATING_SCORE if any(k in question for k in _RATING_QUESTION) else _PAIN_SCORE
+        scores = [int(value) for value in pattern.findall(answer)]
+        return bool(scores) and max(scores) >= clause["pain_at_least"]
+    if "question_any" in clause:
+        return any(k in question for k in clause["question_any"]) and any(
+            k in answer and not _negated(answer, k) for k in clause["answer_any"]
+        )
+    for keyword in clause["any"]:
+        if keyword in answer and not _negated(answer, keyword):
+            return True
+        if keyword in question and answer.startswith(_AFFIRMATIVE):
+            return True
+    return False
+
+
+def _matched(rules: dict[str, list[dict]], pairs: list[dict]) -> list[str]:
+    lowered = [
+        (str(pair.get("question", "")).lower(), str(pair.get("answer", "")).strip().lower())
+        for pair in pairs
+    ]
+    return [
+        name
+        for name, clauses in rules.items()
+        if any(_clause_matches(c, q, a) for c in clauses for q, a in lowered)
+    ]
+
+
+def red_flags(pairs: list[dict]) -> list[str]:
+    return _matched(RED_FLAGS, pairs)
+
+
+def conditions(pairs: list[dict]) -> list[str]:
+    return _matched(CONDITIONS, pairs)
+
+
+def phase_index(weeks: float | None) -> int:
+    """Index into ``PHASES``; unknown timing counts as the earliest phase."""
+    weeks = weeks if weeks is not None else 0.0
+    return next(i for i, (limit, _) in enumerate(PHASES) if limit is None or weeks < limit)
+
+
+def select_exercises(matched: list[str], weeks: float) -> list[str]:
+    """Up to ``MAX_EXERCISES`` eligible keys, best first, at most ``MAX_PER_TAG`` per tag."""
+    scored = []
+    for key, rule in EXERCISE_RULES.items():
+        min_weeks = rule["min_weeks"]
+        if "c_section" in matched:
+            min_weeks += rule.get("c_section_delay", 0)
+        if weeks < min_weeks or any(c in matched for c in rule.get("avoid", [])):
+            continue
+        score = rule["priority"] + 3 * sum(c in matched for c in rule.get("boost", []))
+        # Favour moves that belong to the current phase over the earliest basics.
+        score += min_weeks / 2
+        scored.append((score, key))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    chosen, tag_counts = [], {}
+    for _, key in scored:
+        if len(chosen) == MAX_EXERCISES:
+            break
+        tags = EXERCISE_RULES[key]["tags"]
+        if any(tag_counts.get(tag, 0) >= MAX_PER_TAG for tag in tags):
+            continue
+        chosen.append(key)
+        for tag in tags:
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    for _, key in scored:
+        if len(chosen) >= MIN_EXERCISES:
+            break
+        if key not in chosen:
+            chosen.append(key)
+    return chosen
+
+
+def build_rule_plan(
+    pairs: list[dict],
+    postpartum_weeks: float | None,
+    name: str | None,
+    exercises: list[dict],
+) -> dict:
+    """Return a plan in the Gemini JSON shape, plus ``red_flags``/``conditions``.
+
+    Unknown postpartum timing is treated as the earliest phase.
+    """
+    labels = {entry["key"]: entry["label"] for entry in exercises}
+    greeting = f"Hello mama {name or 'mama'}, it's Majka here!"
+    flags = red_flags(pairs)
+    if flags:
+        return {
+            "greeting": greeting,
+            "intro": (
+                f"You mentioned {', '.join(flags)}. Please stop everything right now "
+                "and contact your healthcare provider immediately. We'll pick this up "
+                "once you've been checked."
+            ),
+            "exercises": [],
+            "closing": "Your health comes first. Reach out to your provider today.",
+            "red_flags": flags,
+            "conditions": [],
+        }
+
+    weeks = postpartum_weeks if postpartum_weeks is not None else 0.0
+    matched = conditions(pairs)
+    phase_intro = PHASES[phase_index(weeks)][1]
+    reasons = [CONDITION_REASONS[c] for c in matched]
+    intro = phase_intro
+    if reasons:
+        intro += f" Since {' and '.join(reasons)}, the plan takes that into account."
+
+    items = []
+    for key in select_exercises(matched, weeks):
+        summary, how, why = EXERCISE_COPY[key]
+        boosted = [CONDITION_REASONS[c] for c in EXERCISE_RULES[key].get("boost", []) if c in matched]
+        why_text = f"It's great right now because {why}."
+        if boosted:
+            why_text = f"Since {boosted[0]}, this one matters: {why}."
+        items.append(
+            {
+                "title": labels.get(key, key),
+                "summary": summary,
+                "why": why_text,
+                "how": how,
+                "cta_label": "Start Guided Session",
+            }
+        )
+    return {
+        "greeting": greeting,
+        "intro": intro,
+        "exercises": items,
+        "closing": CLOSINGS[int(weeks) % len(CLOSINGS)],
+        "red_flags": [],
+        "conditions": matched,
+    }
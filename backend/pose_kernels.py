@@ -0,0 +1,150 @@
+"""Vectorized pose geometry for the MLH evaluators.
+
+``LandmarkBuffer`` copies the 33 MediaPipe pose landmarks once per frame into
+a preallocated ``(35, 4)`` float32 array of ``(x, y, z, visibility)``. x and y
+are scaled to pixels in place, and two derived rows hold the shoulder and hip
+midpoints (``MID_SHOULDER``/``MID_HIP``).
+
+A ``PoseKernel`` is compiled once per exercise from the angles and distances
+it needs. Each call then computes all of them in a handful of NumPy
+operations. Before this, every joint went through ``get_xy`` plus
+``calculate_angle``, which made dozens of small arrays per frame.
+
+This module only needs NumPy (no MediaPipe or OpenCV), so benchmarks and
+offline tools can import it.
+"""
+
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+# BlazePose landmark indices (mp.solutions.pose.PoseLandmark).
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+LANDMARK_COUNT = 33
+MID_SHOULDER = 33
+MID_HIP = 34
+ROW_COUNT = 35
+
+# Skeleton edges (mp.solutions.pose.POSE_CONNECTIONS), for drawing without MediaPipe.
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
+
+X, Y = 0, 1
+_FIELDS = attrgetter("x", "y", "z", "visibility")
+# Left/right shoulder and hip rows as strided views, so both midpoints take
+# a single add.
+_LEFT_ROWS = slice(LEFT_SHOULDER, LEFT_HIP + 1, LEFT_HIP - LEFT_SHOULDER)
+_RIGHT_ROWS = slice(RIGHT_SHOULDER, RIGHT_HIP + 1, RIGHT_HIP - RIGHT_SHOULDER)
+
+
+class LandmarkBuffer:
+    """Per-frame landmark array, reused across frames."""
+
+    def __init__(self):
+        self.array = np.zeros((ROW_COUNT, 4), dtype=np.float32)
+        self._flat = self.array[:LANDMARK_COUNT].reshape(-1)
+        self._scale = np.ones(4, dtype=np.float32)
+        self._shape = None
+
+    def load(self, landmarks, shape, origin=None) -> np.ndarray:
+        """Fill from a MediaPipe landmark list and scale x/y to ``shape`` (h, w, ...).
+
+        ``origin`` is the ``(x, y)`` pixel offset of the image the landmarks were
+        detected in (a crop), so the points end up in full-frame pixels.
+        """
+        self._flat[:] = list(chain.from_iterable(map(_FIELDS, landmarks)))
+        return self._finish(shape, origin)
+
+    def load_array(self, values: np.ndarray, shape, origin=None) -> np.ndarray:
+        """Fill from a normalised ``(33, 4)`` array (e.g. recorded landmarks)."""
+        self.array[:LANDMARK_COUNT] = values
+        return self._finish(shape, origin)
+
+    def _finish(self, shape, origin) -> np.ndarray:
+        if shape[:2] != self._shape:
+            self._shape = shape[:2]
+            self._scale[X] = shape[1]
+            self._scale[Y] = shape[0]
+        points = self.array
+        points[:LANDMARK_COUNT] *= self._scale
+        if origin is not None:
+            points[:LANDMARK_COUNT, :2] += origin
+        np.add(points[_LEFT_ROWS], points[_RIGHT_ROWS], out=points[MID_SHOULDER:])
+        points[MID_SHOULDER:] *= 0.5
+        return points
+
+
+def joint(a: int, b: int, c: int) -> tuple[int, int, int, int]:
+    """Angle at ``b`` between ``b->a`` and ``b->c`` (what ``calculate_angle`` computed)."""
+    return (b, a, b, c)
+
+
+def between(u_from: int, u_to: int, v_from: int, v_to: int) -> tuple[int, int, int, int]:
+    """Angle between the vectors ``u_from->u_to`` and ``v_from->v_to``."""
+    return (u_from, u_to, v_from, v_to)
+
+
+class PoseKernel:
+    """All angles (degrees) and axis distances (pixels) one exercise needs.
+
+    ``angles`` are 4-tuples from ``joint``/``between``; ``deltas`` are
+    ``(i, j, axis)`` for ``|p_i[axis] - p_j[axis]|``. Calling the kernel
+    returns both as lists of floats; ``raw`` returns one array and also
+    accepts a batch of frames.
+
+    Points are viewed as complex numbers ``x + iy`` (no copy), so an angle is
+    ``|arg(v * conj(u))|``. That is one gather, one subtraction and one
+    product for all angles together.
+    """
+
+    def __init__(self, angles=(), deltas=()):
+        angles = np.asarray(angles, dtype=np.intp).reshape(-1, 4)
+        deltas = np.asarray(deltas, dtype=np.intp).reshape(-1, 3)
+        # Gather order per angle: u_from, u_to, v_from, v_to.
+        self._angle_rows = angles.reshape(-1)
+        self._angle_count = len(angles)
+        # Deltas index the flat (ROW_COUNT * 4) array: first all i, then all j.
+        self._delta_index = np.concatenate(
+            [deltas[:, 0] * 4 + deltas[:, 2], deltas[:, 1] * 4 + deltas[:, 2]]
+        )
+        self._delta_count = len(deltas)
+
+    def raw(self, points: np.ndarray) -> np.ndarray:
+        """Angles then deltas as one float32 array; ``points`` may be batched ``(..., 35, 4)``."""
+        parts = []
+        if self._angle_count:
+            gathered = points.view(np.complex64)[..., self._angle_rows, 0]
+            vectors = gathered[..., 1::2] - gathered[..., 0::2]
+            turn = vectors[..., 1::2] * vectors[..., 0::2].conj()
+            parts.append(np.degrees(np.abs(np.angle(turn))))
+        if self._delta_count:
+            values = points.reshape(*points.shape[:-2], -1)[..., self._delta_index]
+            parts.append(np.abs(values[..., : self._delta_count] - values[..., self._delta_count :]))
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.zeros((*points.shape[:-2], 0), dtype=np.float32)
+        return np.concatenate(parts, axis=-1)
+
+    def __call__(self, points: np.ndarray) -> tuple[list[float], list[float]]:
+        values = self.raw(points).tolist()
+        return values[: self._angle_count], values[self._angle_count :]
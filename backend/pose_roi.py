@@ -0,0 +1,118 @@
+"""Crops pose inference to the region around the mother.
+
+The mother usually fills only part of the camera view, yet every frame used
+to go through ``pose.process`` whole. ``RoiTracker`` takes the landmarks of
+the previous frame, which ``LandmarkBuffer`` has already put in full-frame
+pixels, and derives a padded box around the visible ones. The next inference
+then only sees that crop. Landmarks detected in the crop are normalised to
+it, so passing the crop's ``origin`` to ``LandmarkBuffer.load`` maps them back
+for the evaluators.
+
+The box only moves when the body gets close to its edge, or when it has
+become much larger than needed. MediaPipe keeps its own tracking state and
+landmark smoothing in the coordinates of the image it is given, so a crop
+that shifted every frame would make the landmarks jitter. When no pose is
+found, or the box would cover most of the frame anyway, the next inference
+runs on the full frame, which re-detects from scratch. Only NumPy is needed.
+"""
+
+import numpy as np
+
+from pose_kernels import LANDMARK_COUNT, X, Y
+
+_VISIBILITY = 3
+
+
+class RoiTracker:
+    def __init__(
+        self,
+        padding: float = 0.3,
+        edge_margin: float = 0.08,
+        shrink_ratio: float = 0.5,
+        min_side: float = 0.3,
+        max_area: float = 0.8,
+        min_visibility: float = 0.5,
+    ):
+        self.padding = padding
+        self.edge_margin = edge_margin
+        self.shrink_ratio = shrink_ratio
+        self.min_side = min_side
+        self.max_area = max_area
+        self.min_visibility = min_visibility
+        self.box = None
+        self.crops = 0
+        self.full_frames = 0
+        self.lost = 0
+        self._cropped_area = 0.0
+        self._frame_area = 1
+
+    def crop(self, frame: np.ndarray):
+        """``(image, origin)`` for the next inference; ``origin`` is ``None`` for the full frame."""
+        if self.box is None:
+            self.full_frames += 1
+            return frame, None
+        x0, y0, x1, y1 = self.box
+        self.crops += 1
+        self._cropped_area += (x1 - x0) * (y1 - y0) / (frame.shape[0] * frame.shape[1])
+        return frame[y0:y1, x0:x1], (x0, y0)
+
+    def update(self, points: np.ndarray | None, shape):
+        """Feed the landmarks (full-frame pixels) found in the last inference, or ``None``."""
+        if points is None:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            return
+        self._frame_area = shape[0] * shape[1]
+        body = self._body_box(points[:LANDMARK_COUNT], shape)
+        if self.box is not None and self._still_fits(body):
+            return
+        self.box = self._padded(body, shape)
+
+    def _body_box(self, landmarks, shape):
+        visible = landmarks[landmarks[:, _VISIBILITY] >= self.min_visibility]
+        if len(visible) < 4:
+            visible = landmarks
+        h, w = shape[0], shape[1]
+        xs = np.clip(visible[:, X], 0, w)
+        ys = np.clip(visible[:, Y], 0, h)
+        return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+
+    def _still_fits(self, body) -> bool:
+        x0, y0, x1, y1 = self.box
+        bx0, by0, bx1, by1 = body
+        mx, my = (x1 - x0) * self.edge_margin, (y1 - y0) * self.edge_margin
+        inside = bx0 >= x0 + mx and by0 >= y0 + my and bx1 <= x1 - mx and by1 <= y1 - my
+        # Re-fit once the body takes up much less of the box than it did.
+        big_enough = (bx1 - bx0) * (by1 - by0) >= (x1 - x0) * (y1 - y0) * self.shrink_ratio**2
+        return inside and big_enough
+
+    def _padded(self, body, shape):
+        h, w = shape[0], shape[1]
+        bx0, by0, bx1, by1 = body
+        pad = self.padding * max(bx1 - bx0, by1 - by0)
+        half_w = max((bx1 - bx0) / 2 + pad, self.min_side * w / 2)
+        half_h = max((by1 - by0) / 2 + pad, self.min_side * h / 2)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        x0, x1 = int(max(0, cx - half_w)), int(min(w, cx + half_w))
+        y0, y1 = int(max(0, cy - half_h)), int(min(h, cy + half_h))
+        if (x1 - x0) * (y1 - y0) > self.max_area * w * h:
+            return None
+        return x0, y0, x1, y1
+
+    def status(self) -> str:
+        """Short HUD text: the share of the frame the next inference sees."""
+        if self.box is None:
+            return "full"
+        x0, y0, x1, y1 = self.box
+        return f"roi {(x1 - x0) * (y1 - y0) / self._frame_area:.0%}"
+
+    def summary(self) -> str:
+        total = self.crops + self.full_frames
+        if not total:
+            return "no inferences"
+        mean_area = self._cropped_area / self.crops if self.crops else 1.0
+        return (
+            f"{self.crops / total:.0%} of inferences cropped "
+            f"(mean {mean_area:.0%} of the frame), tracking lost {self.lost} time(s)"
+        )
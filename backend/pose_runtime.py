@@ -0,0 +1,100 @@
+"""One MediaPipe pose model per process, shared by every session in it.
+
+A breathing session used to load two models: ``main()`` opened one for the
+form evaluators and ``BreathingCoach`` created its own, and only the coach's
+was ever used. ``PoseRuntime`` owns the single configured ``Pose`` instance.
+``main()`` creates it once and hands it to ``BreathingCoach`` or to
+``FormSession.analyze``. The ``QualityController`` changes its model
+complexity through ``configure``, which reloads only when the complexity
+actually changes. A caller that runs several exercises in one process (batch
+workers, benchmarks, an embedding app) passes the same runtime to each of them,
+calling ``reset()`` between unrelated videos so landmark tracking and
+smoothing do not carry over from the previous clip.
+
+Every load is timed, and the growth in peak RSS it caused is recorded, so
+``status()`` can report model-load time and memory at startup.
+"""
+
+import sys
+import time
+
+import mediapipe as mp
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class PoseRuntime:
+    def __init__(
+        self,
+        model_complexity: int = 1,
+        min_detection_confidence: float = 0.5,
+        min_tracking_confidence: float = 0.5,
+    ):
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.model_complexity = None
+        self.load_ms = 0.0
+        self.memory_mb = None
+        self.loads = 0
+        self._pose = None
+        self.configure(model_complexity)
+
+    def configure(self, model_complexity: int) -> bool:
+        """Switch to ``model_complexity``; returns whether the model was reloaded."""
+        if model_complexity == self.model_complexity:
+            return False
+        if self._pose is not None:
+            self._pose.close()
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        self._pose = mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            smooth_landmarks=True,
+            enable_segmentation=False,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+        )
+        self.load_ms = (time.perf_counter() - started) * 1000
+        rss_after = peak_rss_mb()
+        self.memory_mb = rss_after - rss_before if rss_after is not None else None
+        self.model_complexity = model_complexity
+        self.loads += 1
+        return True
+
+    def process(self, rgb):
+        return self._pose.process(rgb)
+
+    def reset(self):
+        """Drop tracking and smoothing state so the next frame starts a new, unrelated video."""
+        self._pose.reset()
+
+    def status(self) -> str:
+        """Session-log text for the last load, e.g. ``complexity 1 loaded in 412 ms, +38 MB peak RSS``."""
+        text = f"complexity {self.model_complexity} loaded in {self.load_ms:.0f} ms"
+        if self.memory_mb is not None:
+            text += f", +{self.memory_mb:.0f} MB peak RSS"
+        return text
+
+    def close(self):
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
+        self.model_complexity = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,213 @@
+"""Opt-in sampling profiler for live requests.
+
+A request is profiled when it is picked by ``MAJKA_PROFILE_SAMPLE_RATE`` or
+carries ``X-Majka-Profile: <MAJKA_ADMIN_TOKEN>``. While it runs, the worker
+threads executing it (see ``executors.run_on``) register with a
+``ProfileSession``. A single background thread then samples their stacks
+every ``MAJKA_PROFILE_INTERVAL_MS`` via ``sys._current_frames()``, which costs
+the request nothing between samples.
+
+Finished profiles are kept as JSON in a bounded on-disk ring
+(``MAJKA_PROFILE_DIR``, newest ``MAJKA_PROFILE_RING_SIZE`` files) and served
+as collapsed stacks (``frame;frame;frame count``), the input format of
+flamegraph.pl, speedscope and inferno.
+"""
+
+import contextvars
+import itertools
+import json
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+_active_session: contextvars.ContextVar["ProfileSession | None"] = contextvars.ContextVar(
+    "majka_profile_session", default=None
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+class ProfileSession:
+    def __init__(self, request_id: str | None, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.stacks: dict[str, int] = {}
+        self.samples = 0
+        self._threads: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def add_thread(self, thread_id: int):
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def remove_thread(self, thread_id: int):
+        with self._lock:
+            remaining = self._threads.get(thread_id, 0) - 1
+            if remaining > 0:
+                self._threads[thread_id] = remaining
+            else:
+                self._threads.pop(thread_id, None)
+
+    def sample(self, frames: dict):
+        with self._lock:
+            for thread_id in self._threads:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                labels = []
+                # Stop at the executor entry point; frames above it are pool plumbing.
+                while frame is not None and frame.f_code is not profiled_call.__code__:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack = ";".join(reversed(labels))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                self.samples += 1
+
+    def to_record(self, status: int | None, interval_ms: float) -> dict:
+        with self._lock:
+            stacks = dict(self.stacks)
+            samples = self.samples
+        return {
+            "id": self.id,
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "started_at": self.started_at,
+            "duration_ms": round((time.time() - self.started_at) * 1000, 2),
+            "interval_ms": interval_ms,
+            "samples": samples,
+            "stacks": stacks,
+        }
+
+
+class StackSampler:
+    """One background thread sampling every active session."""
+
+    def __init__(self, interval_ms: float):
+        self.interval_ms = interval_ms
+        self._sessions: set[ProfileSession] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def begin(self, session: ProfileSession):
+        with self._lock:
+            self._sessions.add(session)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="majka-profiler", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def end(self, session: ProfileSession):
+        with self._lock:
+            self._sessions.discard(session)
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+            if not sessions:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            frames.pop(own_id, None)
+            for session in sessions:
+                session.sample(frames)
+            del frames
+            time.sleep(interval)
+
+
+class ProfileRing:
+    """Newest ``size`` profiles as JSON files under ``directory``."""
+
+    def __init__(self, directory: str, size: int):
+        self.directory = Path(directory)
+        self.size = size
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _files(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.json"))
+
+    def save(self, record: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns()}-{next(self._counter):04d}-{record['id']}.json"
+        with self._lock:
+            (self.directory / name).write_text(json.dumps(record))
+            for stale in self._files()[: -self.size]:
+                stale.unlink(missing_ok=True)
+
+    def list(self) -> list[dict]:
+        summaries = []
+        for path in reversed(self._files()):
+            try:
+                record = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            record.pop("stacks", None)
+            summaries.append(record)
+        return summaries
+
+    def get(self, profile_id: str) -> dict | None:
+        for path in self._files():
+            if path.stem.endswith(f"-{profile_id}"):
+                try:
+                    return json.loads(path.read_text())
+                except (OSError, ValueError):
+                    return None
+        return None
+
+    def merged(self, path_filter: str | None = None) -> dict[str, int]:
+        stacks: dict[str, int] = {}
+        for path in self._files():
+            try:
+                record = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if path_filter and record.get("path") != path_filter:
+                continue
+            for stack, count in record.get("stacks", {}).items():
+                stacks[stack] = stacks.get(stack, 0) + count
+        return stacks
+
+
+def collapsed(stacks: dict[str, int]) -> str:
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def start_session(session: ProfileSession) -> contextvars.Token:
+    return _active_session.set(session)
+
+
+def stop_session(token: contextvars.Token):
+    _active_session.reset(token)
+
+
+def profiled_call(fn, *args, **kwargs):
+    """Run ``fn`` and, if the caller's request is being profiled, sample this thread."""
+    session = _active_session.get()
+    if session is None:
+        return fn(*args, **kwargs)
+    thread_id = threading.get_ident()
+    session.add_thread(thread_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        session.remove_thread(thread_id)
@@ -0,0 +1,260 @@
+"""Bulk plan regeneration after a change to ``EXERCISES`` or the plan prompt.
+
+Streams mothers from Supabase in id-ordered pages, loads each page's answers
+with a single query, builds all prompts for the page and submits them through
+a rate-limited thread pool. Results are written to the plan cache under
+``batch_plan_key`` (mother id, answers hash, model, ``PLAN_PROMPT_VERSION``)
+and served for ``MAJKA_PLAN_BATCH_TTL_SECONDS``. ``MAJKA_PLAN_CACHE_PATH``
+must point at the same SQLite file the API uses; the command refuses to run
+without it. Progress is checkpointed after every page; rerunning with the
+same checkpoint first retries the mothers that failed, then resumes after the
+last completed page.
+
+google-generativeai has no batch endpoint for ``generate_content``, so the
+pipeline relies on bounded concurrent calls instead.
+
+Usage:
+    python -m backend.regenerate_plans --page-size 200 --concurrency 8 --rps 4
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from . import main as api
+from .plan_cache import SOURCE_BATCH
+
+# Rows per answers request; must not exceed PostgREST's max-rows setting.
+ANSWER_RANGE_SIZE = 1000
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second on average."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _load_checkpoint(path: Path) -> dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"last_mother_id": 0, "generated": 0, "skipped": 0, "failed": []}
+
+
+def _save_checkpoint(path: Path, state: dict):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(path)
+
+
+def _fetch_mothers(mother_ids: list[int]) -> list[dict]:
+    resp = (
+        api.get_supabase().table(api.SUPABASE_MOTHERS_TABLE)
+        .select("id,name,age,country,delivered_at")
+        .in_("id", mother_ids)
+        .order("id")
+        .execute()
+    )
+    error = api._resp_error(resp)
+    if error:
+        raise RuntimeError(str(error))
+    return api._resp_data(resp) or []
+
+
+def iter_mother_pages(page_size: int, after_id: int = 0):
+    """Yield pages of mother profiles ordered by id, starting after ``after_id``."""
+    last_id = after_id
+    while True:
+        resp = (
+            api.get_supabase().table(api.SUPABASE_MOTHERS_TABLE)
+            .select("id,name,age,country,delivered_at")
+            .gt("id", last_id)
+            .order("id")
+            .limit(page_size)
+            .execute()
+        )
+        error = api._resp_error(resp)
+        if error:
+            raise RuntimeError(str(error))
+        page = api._resp_data(resp) or []
+        if not page:
+            return
+        yield page
+        last_id = page[-1]["id"]
+
+
+def _fetch_page_answers(mother_ids: list[int]) -> dict[int, dict[int, str]]:
+    """Answers for ``mother_ids``, read in ranges below PostgREST's row cap.
+
+    A page of mothers has thousands of answers, and PostgREST silently cuts a
+    response at its ``max-rows`` (1000 by default), so keep requesting ranges
+    until a short one comes back. Rows are ordered by id, so a newer answer to
+    the same question wins.
+    """
+    answers: dict[int, dict[int, str]] = {}
+    start = 0
+    while True:
+        resp = (
+            api.get_supabase().table(api.SUPABASE_ANSWERS_TABLE)
+            .select("mother_id,question_id,answer_text")
+            .in_("mother_id", mother_ids)
+            .order("mother_id")
+            .order("id")
+            .range(start, start + ANSWER_RANGE_SIZE - 1)
+            .execute()
+        )
+        error = api._resp_error(resp)
+        if error:
+            raise RuntimeError(str(error))
+        rows = api._resp_data(resp) or []
+        for row in rows:
+            answers.setdefault(row["mother_id"], {})[row["question_id"]] = row["answer_text"]
+        if len(rows) < ANSWER_RANGE_SIZE:
+            return answers
+        start += ANSWER_RANGE_SIZE
+
+
+def build_page_prompts(page, questions, option_lookup) -> list[tuple[int, str, str]]:
+    """``(mother_id, cache_key, prompt)`` for every mother on ``page`` with answers."""
+    answers = _fetch_page_answers([mother["id"] for mother in page])
+    prompts = []
+    for mother in page:
+        pairs = api._build_answer_pairs(questions, option_lookup, answers.get(mother["id"], {}))
+        if pairs:
+            prompts.append(
+                (mother["id"], api._batch_plan_key(mother["id"], pairs), api._plan_prompt_for(mother, pairs))
+            )
+    return prompts
+
+
+def regenerate(
+    checkpoint_path: Path,
+    page_size: int = 200,
+    concurrency: int = 8,
+    rps: float = 4.0,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> dict:
+    state = _load_checkpoint(checkpoint_path)
+    questions = api._fetch_question_catalog()
+    option_lookup = api._build_option_lookup([q["id"] for q in questions])
+    limiter = RateLimiter(rps, burst=concurrency)
+    started = time.monotonic()
+    generated_this_run = 0
+
+    def generate(mother_id: int, key: str, prompt: str) -> bool:
+        if dry_run:
+            return True
+        limiter.acquire()
+        try:
+            result = api._call_plan_model(prompt)
+        except HTTPException as exc:
+            print(f"Plan for mother {mother_id} failed: {exc.detail}")
+            return False
+        if result["model_fallback"]:
+            print(f"Plan for mother {mother_id} came from the {result['model_tier']} fallback tier; will retry")
+            return False
+        api.plan_cache.put(key, mother_id, result, SOURCE_BATCH)
+        return True
+
+    def run(pool, page) -> tuple[int, list[int]]:
+        prompts = build_page_prompts(page, questions, option_lookup)
+        outcomes = list(pool.map(lambda item: generate(*item), prompts))
+        failed = [mother_id for (mother_id, _, _), ok in zip(prompts, outcomes) if not ok]
+        return sum(outcomes), failed
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="majka-regen") as pool:
+        retry, state["failed"] = sorted(set(state["failed"])), []
+        for start in range(0, len(retry), page_size):
+            ids = retry[start : start + page_size]
+            succeeded, failed = run(pool, _fetch_mothers(ids))
+            generated_this_run += succeeded
+            state["generated"] += succeeded
+            # Mothers that were deleted or have no answers any more are dropped.
+            state["failed"] += failed
+            if not dry_run:
+                _save_checkpoint(checkpoint_path, {**state, "failed": state["failed"] + retry[start + page_size :]})
+            print(f"[regen] retried {len(ids)} failed mothers: {succeeded} generated, {len(failed)} still failing")
+
+        for page in iter_mother_pages(page_size, state["last_mother_id"]):
+            succeeded, failed = run(pool, page)
+            state["failed"] += failed
+            generated_this_run += succeeded
+            state["generated"] += succeeded
+            state["skipped"] += len(page) - succeeded - len(failed)
+            state["last_mother_id"] = page[-1]["id"]
+            if not dry_run:
+                _save_checkpoint(checkpoint_path, state)
+
+            elapsed_min = (time.monotonic() - started) / 60
+            rate = generated_this_run / elapsed_min if elapsed_min > 0 else 0.0
+            print(
+                f"[regen] through mother {state['last_mother_id']}: "
+                f"{state['generated']} generated, {len(state['failed'])} failed, "
+                f"{rate:.1f} plans/min"
+            )
+            if limit is not None and generated_this_run >= limit:
+                break
+
+    elapsed_min = (time.monotonic() - started) / 60
+    state["plans_per_minute"] = round(generated_this_run / elapsed_min, 2) if elapsed_min > 0 else 0.0
+    state["elapsed_seconds"] = round(elapsed_min * 60, 2)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate every mother's plan into the plan cache.")
+    parser.add_argument("--checkpoint", default="regenerate_plans.checkpoint.json")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=4.0, help="Max model calls per second (0 = unlimited).")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after roughly this many plans.")
+    parser.add_argument("--dry-run", action="store_true", help="Build prompts without calling the model.")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint.")
+    args = parser.parse_args()
+
+    checkpoint_path = Path(args.checkpoint)
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    if not api.PLAN_CACHE_PATH and not args.dry_run:
+        parser.error(
+            "MAJKA_PLAN_CACHE_PATH is not set; regenerated plans would only live in this process. "
+            "Point it at the SQLite file the API uses."
+        )
+
+    summary = regenerate(
+        checkpoint_path,
+        page_size=args.page_size,
+        concurrency=args.concurrency,
+        rps=args.rps,
+        limit=args.limit,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Per-frame scoring output for MLH runs on recorded clips.
+
+``open_writer(path, score_names)`` picks the format from the suffix:
+
+* ``.csv``: one row per frame. Landmarks are flattened to ``lm<i>_x``,
+  ``lm<i>_y``, ``lm<i>_z``, ``lm<i>_v`` columns.
+* ``.jsonl``: one object per frame, with ``landmarks`` as a ``33 x 4`` list.
+* ``.npz``: columnar arrays (``frame``, ``time_s``, ``score``,
+  ``smooth_score``, ``sub_scores`` of shape ``(n, k)``, ``landmarks`` of
+  shape ``(n, 33, 4)``, ``feedback``, and ``score_names``), written on
+  ``close``.
+
+Every frame carries ``frame``, ``time_s`` (position in the clip),
+``pose``, ``score``, ``smooth_score``, one ``score_<name>`` per
+sub-score, ``feedback`` (cues joined by ``" | "``) and the landmarks.
+Landmark x/y are full-frame pixels, as the evaluators see them. Fields are
+empty (CSV/JSONL) or NaN (NPZ) on frames without a pose. Only NumPy is
+needed.
+"""
+
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+
+from pose_kernels import LANDMARK_COUNT
+
+FORMATS = (".csv", ".jsonl", ".npz")
+_LANDMARK_FIELDS = ("x", "y", "z", "v")
+# Empty landmark cells for frames without a pose, so every row has the header's width.
+_NO_LANDMARKS = [None] * (LANDMARK_COUNT * len(_LANDMARK_FIELDS))
+
+
+def frame_record(result, score_names) -> dict:
+    """Flat dict for one analysed frame (``MLH.FormFrame``)."""
+    has_pose = result.points is not None
+    sub_scores = result.sub_scores.tolist() if has_pose and result.sub_scores is not None else None
+    return {
+        "frame": result.index,
+        "time_s": round(result.timestamp, 4),
+        "pose": has_pose,
+        "score": round(result.score, 4) if has_pose else None,
+        "smooth_score": round(result.smooth_score, 4),
+        "scores": dict(zip(score_names, sub_scores)) if sub_scores else {},
+        "feedback": " | ".join(result.feedback),
+        "landmarks": result.points[:LANDMARK_COUNT].tolist() if has_pose else None,
+    }
+
+
+class CsvWriter:
+    def __init__(self, path, score_names):
+        self.score_names = list(score_names)
+        self._handle = open(path, "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._handle)
+        self._csv.writerow(
+            ["frame", "time_s", "pose", "score", "smooth_score"]
+            + [f"score_{name}" for name in self.score_names]
+            + ["feedback"]
+            + [f"lm{i}_{field}" for i in range(LANDMARK_COUNT) for field in _LANDMARK_FIELDS]
+        )
+
+    def write(self, result):
+        record = frame_record(result, self.score_names)
+        scores = record["scores"]
+        landmarks = record["landmarks"]
+        self._csv.writerow(
+            [record["frame"], record["time_s"], int(record["pose"]), record["score"], record["smooth_score"]]
+            + [_round(scores.get(name)) for name in self.score_names]
+            + [record["feedback"]]
+            + ([_round(v) for row in landmarks for v in row] if landmarks else _NO_LANDMARKS)
+        )
+
+    def close(self):
+        self._handle.close()
+
+
+class JsonlWriter:
+    def __init__(self, path, score_names):
+        self.score_names = list(score_names)
+        self._handle = open(path, "w", encoding="utf-8")
+
+    def write(self, result):
+        record = frame_record(result, self.score_names)
+        record["scores"] = {name: _round(value) for name, value in record["scores"].items()}
+        if record["landmarks"]:
+            record["landmarks"] = [[_round(v) for v in row] for row in record["landmarks"]]
+        self._handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._handle.close()
+
+
+class NpzWriter:
+    def __init__(self, path, score_names):
+        self.path = path
+        self.score_names = list(score_names)
+        self._columns = {name: [] for name in ("frame", "time_s", "score", "smooth_score", "feedback")}
+        self._sub_scores = []
+        self._landmarks = []
+        self._missing_scores = np.full(len(self.score_names), np.nan, dtype=np.float32)
+        self._missing_landmarks = np.full((LANDMARK_COUNT, 4), np.nan, dtype=np.float32)
+
+    def write(self, result):
+        has_pose = result.points is not None
+        columns = self._columns
+        columns["frame"].append(result.index)
+        columns["time_s"].append(result.timestamp)
+        columns["score"].append(result.score if has_pose else np.nan)
+        columns["smooth_score"].append(result.smooth_score)
+        columns["feedback"].append(" | ".join(result.feedback))
+        self._sub_scores.append(
+            result.sub_scores if has_pose and result.sub_scores is not None else self._missing_scores
+        )
+        self._landmarks.append(result.points[:LANDMARK_COUNT] if has_pose else self._missing_landmarks)
+
+    def close(self):
+        columns = self._columns
+        count = len(columns["frame"])
+        np.savez_compressed(
+            self.path,
+            frame=np.asarray(columns["frame"], dtype=np.int64),
+            time_s=np.asarray(columns["time_s"], dtype=np.float64),
+            score=np.asarray(columns["score"], dtype=np.float32),
+            smooth_score=np.asarray(columns["smooth_score"], dtype=np.float32),
+            sub_scores=np.asarray(self._sub_scores, dtype=np.float32).reshape(count, len(self.score_names)),
+            landmarks=np.asarray(self._landmarks, dtype=np.float32).reshape(count, LANDMARK_COUNT, 4),
+            feedback=np.asarray(columns["feedback"], dtype=str),
+            score_names=np.asarray(self.score_names, dtype=str),
+        )
+
+
+def _round(value, digits: int = 4):
+    return None if value is None else round(value, digits)
+
+
+def open_writer(path, score_names):
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return CsvWriter(path, score_names)
+    if suffix == ".jsonl":
+        return JsonlWriter(path, score_names)
+    if suffix == ".npz":
+        return NpzWriter(path, score_names)
+    raise ValueError(f"Unsupported output {path!r}; use one of {', '.join(FORMATS)}")
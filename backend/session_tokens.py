@@ -0,0 +1,85 @@
+"""Stateless signed session tokens.
+
+A token is ``<payload>.<signature>``: the base64url JSON claims and their
+HMAC-SHA256 under ``MAJKA_SESSION_SECRET``. Besides ``sub`` (the mother id),
+tokens carry the profile fields the plan and chat prompts need (``name``,
+``delivered_at``), so authenticated requests skip the profile read. Signatures
+are compared in constant time and no database access is needed to verify.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    def __init__(self, secret: str, ttl_seconds: int, max_age_seconds: int):
+        self._key = secret.encode("utf-8")
+        self.ttl = ttl_seconds
+        # Upper bound on how long refreshes can extend one login.
+        self.max_age = max_age_seconds
+
+    def _sign(self, payload: str) -> str:
+        digest = hmac.new(self._key, payload.encode("utf-8"), hashlib.sha256).digest()
+        return _b64encode(digest)
+
+    def issue(
+        self,
+        mother_id: int,
+        name: str | None,
+        delivered_at: str | None,
+        auth_time: int | None = None,
+    ) -> dict:
+        now = int(time.time())
+        claims = {
+            "sub": mother_id,
+            "name": name,
+            "delivered_at": delivered_at,
+            "iat": now,
+            "auth_time": auth_time or now,
+            "exp": now + self.ttl,
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return {
+            "access_token": f"{payload}.{self._sign(payload)}",
+            "token_type": "bearer",
+            "expires_in": self.ttl,
+        }
+
+    def verify(self, token: str) -> dict:
+        payload, _, signature = token.partition(".")
+        if not payload or not signature:
+            raise InvalidToken("Malformed session token")
+        expected = self._sign(payload)
+        if not hmac.compare_digest(signature.encode("utf-8"), expected.encode("utf-8")):
+            raise InvalidToken("Invalid session token")
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError as exc:
+            raise InvalidToken("Malformed session token") from exc
+        if claims.get("exp", 0) < time.time():
+            raise InvalidToken("Session token expired")
+        return claims
+
+    def refresh(self, token: str) -> dict:
+        """Re-issue a valid token with a new expiry; no password check."""
+        claims = self.verify(token)
+        if time.time() - claims.get("auth_time", 0) > self.max_age:
+            raise InvalidToken("Session too old, please sign in again")
+        return self.issue(
+            claims["sub"], claims.get("name"), claims.get("delivered_at"), claims["auth_time"]
+        )
@@ -0,0 +1,223 @@
+"""Materialized per-mother intake snapshots (see ``sql/intake_snapshots.sql``).
+
+Answer writes go through the store, which replaces the answer rows and
+rebuilds the mother's snapshot in one transaction. Read paths then load the
+labelled pairs, answered ids, resume question and completion flag with a
+single primary-key lookup instead of joining answers, questions and options.
+
+``SupabaseSnapshotStore`` uses the Postgres functions over PostgREST;
+``SqliteSnapshotStore`` implements the same contract on the local stand-in
+database shared with ``bundles.SqliteBundleStore``, for offline benchmarks
+only; the API does not use it, since the file's catalog is empty and its
+answers would never reach Supabase. ``content_hash`` is only meaningful
+within one backend.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+
+from fastapi import HTTPException
+
+from .bundles import SQLITE_SCHEMA
+
+SNAPSHOTS_TABLE = "mother_intake_snapshots"
+
+
+def build_snapshot(
+    questions: list[dict],
+    option_lookup: dict[int, dict[str, str]],
+    answer_map: dict[int, str],
+) -> dict:
+    """Python twin of ``majka_refresh_snapshot``.
+
+    ``questions`` is the active catalog ordered by ``order_index``.
+    """
+    pairs = []
+    answers = {}
+    resume_question_id = None
+    for question in questions:
+        qid = question["id"]
+        if qid not in answer_map:
+            if resume_question_id is None:
+                resume_question_id = qid
+            continue
+        raw_answer = answer_map[qid]
+        answers[str(qid)] = raw_answer
+        if raw_answer:
+            pairs.append(
+                {
+                    "question": question["text"],
+                    "answer": option_lookup.get(qid, {}).get(raw_answer, raw_answer),
+                    "order_index": question["order_index"],
+                }
+            )
+    encoded = json.dumps(pairs, sort_keys=True, separators=(",", ":"))
+    return {
+        "pairs": pairs,
+        "answered_ids": sorted(answer_map),
+        "answers": answers,
+        "resume_question_id": resume_question_id,
+        "complete": bool(questions) and resume_question_id is None,
+        "content_hash": hashlib.sha256(encoded.encode("utf-8")).hexdigest(),
+    }
+
+
+class SupabaseSnapshotStore:
+    def __init__(self, get_client, max_order: int):
+        self._get_client = get_client
+        self.max_order = max_order
+
+    @staticmethod
+    def _data(resp):
+        error = getattr(resp, "error", None)
+        if error:
+            raise HTTPException(status_code=500, detail=str(error))
+        return getattr(resp, "data", None)
+
+    def _rpc(self, fn: str, params: dict):
+        params = {**params, "p_max_order": self.max_order}
+        return self._data(self._get_client().rpc(fn, params).execute())
+
+    def get(self, mother_id: int) -> dict | None:
+        resp = (
+            self._get_client().table(SNAPSHOTS_TABLE)
+            .select("payload")
+            .eq("mother_id", mother_id)
+            .limit(1)
+            .execute()
+        )
+        rows = self._data(resp) or []
+        return rows[0]["payload"] if rows else None
+
+    def refresh(self, mother_id: int) -> dict | None:
+        return self._rpc("majka_refresh_snapshot", {"p_mother_id": mother_id}) or None
+
+    def save_answer(
+        self, mother_id: int, question_id: int, answer_text: str, created_at: str
+    ) -> int | None:
+        result = self._rpc(
+            "majka_save_answer",
+            {
+                "p_mother_id": mother_id,
+                "p_question_id": question_id,
+                "p_answer_text": answer_text,
+                "p_created_at": created_at,
+            },
+        )
+        return (result or {}).get("answer_id")
+
+    def save_answers(self, rows: list[dict]):
+        self._rpc("majka_save_answers", {"p_rows": rows})
+
+    def reset_answers(self, mother_id: int):
+        self._rpc("majka_reset_answers", {"p_mother_id": mother_id})
+
+
+_SQLITE_SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mother_intake_snapshots (
+    mother_id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+class SqliteSnapshotStore:
+    def __init__(self, path: str, max_order: int):
+        self.max_order = max_order
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SQLITE_SCHEMA + _SQLITE_SNAPSHOT_SCHEMA)
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._conn
+
+    def get(self, mother_id: int) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM mother_intake_snapshots WHERE mother_id = ?",
+                (mother_id,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def refresh(self, mother_id: int) -> dict | None:
+        with self._lock, self._conn:
+            return self._refresh(mother_id)
+
+    def save_answer(
+        self, mother_id: int, question_id: int, answer_text: str, created_at: str
+    ) -> int | None:
+        with self._lock, self._conn:
+            answer_id = self._replace(mother_id, question_id, answer_text, created_at)
+            self._refresh(mother_id)
+        return answer_id
+
+    def save_answers(self, rows: list[dict]):
+        with self._lock, self._conn:
+            for row in rows:
+                self._replace(
+                    row["mother_id"], row["question_id"], row["answer_text"], row["created_at"]
+                )
+            for mother_id in {row["mother_id"] for row in rows}:
+                self._refresh(mother_id)
+
+    def reset_answers(self, mother_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers WHERE mother_id = ?", (mother_id,))
+            self._refresh(mother_id)
+
+    def _replace(self, mother_id, question_id, answer_text, created_at) -> int:
+        self._conn.execute(
+            "DELETE FROM answers WHERE mother_id = ? AND question_id = ?",
+            (mother_id, question_id),
+        )
+        label = self._conn.execute(
+            "SELECT label FROM question_options WHERE question_id = ? AND value = ? LIMIT 1",
+            (question_id, answer_text),
+        ).fetchone()
+        cursor = self._conn.execute(
+            "INSERT INTO answers (mother_id, question_id, answer_text, created_at)"
+            " VALUES (?, ?, ?, ?)",
+            (mother_id, question_id, label[0] if label else answer_text, created_at),
+        )
+        return cursor.lastrowid
+
+    def _refresh(self, mother_id: int) -> dict | None:
+        exists = self._conn.execute(
+            "SELECT 1 FROM mothers WHERE id = ?", (mother_id,)
+        ).fetchone()
+        if not exists:
+            return None
+        questions = [
+            {"id": qid, "text": text, "order_index": order_index}
+            for qid, text, order_index in self._conn.execute(
+                "SELECT id, text, order_index FROM questions"
+                " WHERE is_active AND order_index <= ? ORDER BY order_index",
+                (self.max_order,),
+            )
+        ]
+        option_lookup: dict[int, dict[str, str]] = {}
+        for qid, value, label in self._conn.execute(
+            "SELECT question_id, value, label FROM question_options"
+        ):
+            option_lookup.setdefault(qid, {})[value] = label
+        answer_map = {
+            qid: answer_text
+            for qid, answer_text in self._conn.execute(
+                "SELECT question_id, answer_text FROM answers WHERE mother_id = ? ORDER BY id",
+                (mother_id,),
+            )
+        }
+        snapshot = build_snapshot(questions, option_lookup, answer_map)
+        self._conn.execute(
+            "INSERT INTO mother_intake_snapshots (mother_id, payload, content_hash, updated_at)"
+            " VALUES (?, ?, ?, CURRENT_TIMESTAMP)"
+            " ON CONFLICT (mother_id) DO UPDATE SET payload = excluded.payload,"
+            " content_hash = excluded.content_hash, updated_at = excluded.updated_at",
+            (mother_id, json.dumps(snapshot), snapshot["content_hash"]),
+        )
+        return snapshot
@@ -0,0 +1,95 @@
+"""Speculative plan generation once a mother finishes the intake.
+
+``save_answer`` schedules a background generation as soon as the last active
+question is answered, so the plan is usually cached by the time the frontend
+asks for it. Any later answer change cancels the speculation; results that
+finish after a cancellation are dropped and counted as waste.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from .logging_setup import get_logger
+from .metrics import metrics
+
+log = get_logger("majka.speculation")
+
+
+class SpeculativePlanner:
+    """Runs at most ``max_concurrent`` speculative generations at a time."""
+
+    def __init__(self, generate, max_concurrent: int = 2):
+        # ``generate(mother_id, is_current)`` must produce and cache the plan,
+        # storing it only while ``is_current()`` is still true.
+        self._generate = generate
+        self.max_concurrent = max_concurrent
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="majka-speculative"
+        )
+        self._inflight: dict[int, tuple[object, object]] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, mother_id: int) -> bool:
+        """Start a speculative generation for ``mother_id`` unless capped."""
+        with self._lock:
+            self._cancel_locked(mother_id)
+            if len(self._inflight) >= self.max_concurrent:
+                metrics.inc("speculative.skipped_cap")
+                return False
+            token = object()
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, self._run, mother_id, token)
+            self._inflight[mother_id] = (token, future)
+        metrics.inc("speculative.scheduled")
+        return True
+
+    def cancel(self, mother_id: int):
+        """Invalidate any pending or running speculation for ``mother_id``."""
+        with self._lock:
+            self._cancel_locked(mother_id)
+
+    def wait(self, mother_id: int, timeout: float) -> bool:
+        """Block until an in-flight speculation for ``mother_id`` finishes.
+
+        Returns True if there was one to wait for and it completed in time.
+        """
+        with self._lock:
+            inflight = self._inflight.get(mother_id)
+        if not inflight:
+            return False
+        try:
+            inflight[1].result(timeout=timeout)
+        except FutureTimeout:
+            return False
+        except Exception:
+            return False
+        return True
+
+    def _cancel_locked(self, mother_id: int):
+        inflight = self._inflight.pop(mother_id, None)
+        if inflight is None:
+            return
+        _, future = inflight
+        if future.cancel():
+            metrics.inc("speculative.cancelled_queued")
+        elif not future.done():
+            metrics.inc("speculative.cancelled_running")
+
+    def _is_current(self, mother_id: int, token) -> bool:
+        with self._lock:
+            inflight = self._inflight.get(mother_id)
+            return inflight is not None and inflight[0] is token
+
+    def _run(self, mother_id: int, token):
+        try:
+            self._generate(mother_id, lambda: self._is_current(mother_id, token))
+            metrics.inc("speculative.completed")
+        except Exception as exc:
+            metrics.inc("speculative.failed")
+            log.warning("speculative.failed", mother_id=mother_id, error=str(exc))
+        finally:
+            with self._lock:
+                inflight = self._inflight.get(mother_id)
+                if inflight is not None and inflight[0] is token:
+                    del self._inflight[mother_id]
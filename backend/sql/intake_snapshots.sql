@@ -0,0 +1,190 @@
+-- Denormalized per-mother intake snapshot, maintained on every answer write.
+-- Apply in the Supabase SQL editor (or psql) and set MAJKA_INTAKE_SNAPSHOTS=supabase.
+-- The SQLite stand-in in backend/snapshots.py implements the same contract.
+-- Like rpc_bundles.sql, this names the default tables directly; the API
+-- refuses to start with SUPABASE_*_TABLE overrides.
+--
+-- payload:
+--   pairs               labelled QA pairs for the active catalog, in order
+--   answered_ids        every question id the mother has answered
+--   answers             {"<question_id>": answer_text} for the active catalog
+--   resume_question_id  first unanswered active question, or null
+--   complete            true when every active question is answered
+--   content_hash        hash of the pairs; changes whenever the intake does
+
+create table if not exists mother_intake_snapshots (
+  mother_id int primary key references mothers (id) on delete cascade,
+  payload jsonb not null,
+  content_hash text not null,
+  updated_at timestamptz not null default now()
+);
+
+-- Rebuild one mother's snapshot. Returns NULL when the mother does not exist.
+create or replace function majka_refresh_snapshot(p_mother_id int, p_max_order int)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_pairs jsonb;
+  v_answers jsonb;
+  v_answered jsonb;
+  v_resume int;
+  v_catalog_size int;
+  v_payload jsonb;
+begin
+  if not exists (select 1 from mothers where id = p_mother_id) then
+    return null;
+  end if;
+
+  select coalesce(jsonb_agg(
+           jsonb_build_object(
+             'question', q.text,
+             'answer', coalesce(o.label, a.answer_text),
+             'order_index', q.order_index
+           )
+           order by q.order_index
+         ), '[]'::jsonb)
+    into v_pairs
+    from questions q
+    join answers a on a.question_id = q.id and a.mother_id = p_mother_id
+    left join question_options o on o.question_id = q.id and o.value = a.answer_text
+   where q.is_active
+     and q.order_index <= p_max_order
+     and coalesce(a.answer_text, '') <> '';
+
+  select coalesce(jsonb_object_agg(a.question_id::text, a.answer_text), '{}'::jsonb)
+    into v_answers
+    from answers a
+    join questions q on q.id = a.question_id
+   where a.mother_id = p_mother_id
+     and q.is_active
+     and q.order_index <= p_max_order;
+
+  select coalesce(jsonb_agg(distinct a.question_id), '[]'::jsonb)
+    into v_answered
+    from answers a
+   where a.mother_id = p_mother_id;
+
+  select count(*) into v_catalog_size
+    from questions q
+   where q.is_active and q.order_index <= p_max_order;
+
+  select q.id into v_resume
+    from questions q
+   where q.is_active
+     and q.order_index <= p_max_order
+     and not exists (
+       select 1 from answers a where a.mother_id = p_mother_id and a.question_id = q.id
+     )
+   order by q.order_index
+   limit 1;
+
+  v_payload := jsonb_build_object(
+    'pairs', v_pairs,
+    'answered_ids', v_answered,
+    'answers', v_answers,
+    'resume_question_id', v_resume,
+    'complete', v_catalog_size > 0 and v_resume is null,
+    'content_hash', md5(v_pairs::text)
+  );
+
+  insert into mother_intake_snapshots (mother_id, payload, content_hash, updated_at)
+  values (p_mother_id, v_payload, v_payload ->> 'content_hash', now())
+  on conflict (mother_id) do update
+    set payload = excluded.payload,
+        content_hash = excluded.content_hash,
+        updated_at = excluded.updated_at;
+
+  return v_payload;
+end;
+$$;
+
+-- Replace one answer and refresh the snapshot in the same transaction.
+-- Option values are stored as their labels, as the API always did.
+create or replace function majka_save_answer(
+  p_mother_id int,
+  p_question_id int,
+  p_answer_text text,
+  p_created_at timestamptz,
+  p_max_order int
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_answer_id int;
+begin
+  -- Serialize writers per mother so the snapshot reflects the last commit.
+  perform 1 from mothers where id = p_mother_id for update;
+
+  delete from answers
+   where mother_id = p_mother_id and question_id = p_question_id;
+
+  insert into answers (mother_id, question_id, answer_text, created_at)
+  values (
+    p_mother_id,
+    p_question_id,
+    coalesce(
+      (select label from question_options
+        where question_id = p_question_id and value = p_answer_text
+        limit 1),
+      p_answer_text
+    ),
+    p_created_at
+  )
+  returning id into v_answer_id;
+
+  return jsonb_build_object(
+    'answer_id', v_answer_id,
+    'snapshot', majka_refresh_snapshot(p_mother_id, p_max_order)
+  );
+end;
+$$;
+
+-- Bulk variant for the write-behind flusher.
+-- p_rows: [{mother_id, question_id, answer_text, created_at}, ...]
+create or replace function majka_save_answers(p_rows jsonb, p_max_order int)
+returns void
+language plpgsql
+as $$
+declare
+  v_mother_id int;
+begin
+  perform 1 from mothers
+   where id in (select (r ->> 'mother_id')::int from jsonb_array_elements(p_rows) r)
+   order by id
+   for update;
+
+  delete from answers a
+   using jsonb_to_recordset(p_rows) as r(mother_id int, question_id int)
+   where a.mother_id = r.mother_id and a.question_id = r.question_id;
+
+  insert into answers (mother_id, question_id, answer_text, created_at)
+  select r.mother_id,
+         r.question_id,
+         coalesce(o.label, r.answer_text),
+         r.created_at
+    from jsonb_to_recordset(p_rows)
+         as r(mother_id int, question_id int, answer_text text, created_at timestamptz)
+    left join question_options o
+      on o.question_id = r.question_id and o.value = r.answer_text;
+
+  for v_mother_id in
+    select distinct (r ->> 'mother_id')::int from jsonb_array_elements(p_rows) r
+  loop
+    perform majka_refresh_snapshot(v_mother_id, p_max_order);
+  end loop;
+end;
+$$;
+
+-- Delete all answers (retake) and refresh the snapshot in one transaction.
+create or replace function majka_reset_answers(p_mother_id int, p_max_order int)
+returns jsonb
+language plpgsql
+as $$
+begin
+  perform 1 from mothers where id = p_mother_id for update;
+  delete from answers where mother_id = p_mother_id;
+  return majka_refresh_snapshot(p_mother_id, p_max_order);
+end;
+$$;
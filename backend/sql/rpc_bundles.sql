@@ -0,0 +1,75 @@
+-- One-round-trip read bundles for the Majka API.
+-- Apply in the Supabase SQL editor (or psql) and set MAJKA_RPC_BUNDLES=supabase.
+-- The SQLite stand-in in backend/bundles.py implements the same contract.
+-- Table names are fixed (mothers, questions, answers, question_options); the
+-- API refuses to start with SUPABASE_*_TABLE overrides, so rename them here too
+-- if your tables differ.
+
+-- Login: the mother's record (incl. password hash for bcrypt verification in
+-- the API), the ordered active question ids and her raw answers.
+-- Returns NULL when no mother has that name.
+create or replace function majka_login_bundle(p_name text, p_max_order int)
+returns jsonb
+language sql
+stable
+as $$
+  select jsonb_build_object(
+    'mother', jsonb_build_object(
+      'id', m.id,
+      'password_hash', m.password_hash,
+      'name', m.name,
+      'age', m.age,
+      'country', m.country,
+      'delivered_at', m.delivered_at
+    ),
+    'question_ids', coalesce((
+      select jsonb_agg(q.id order by q.order_index)
+      from questions q
+      where q.is_active and q.order_index <= p_max_order
+    ), '[]'::jsonb),
+    'answers', coalesce((
+      select jsonb_object_agg(a.question_id::text, a.answer_text)
+      from answers a
+      where a.mother_id = m.id
+    ), '{}'::jsonb)
+  )
+  from mothers m
+  where m.name = p_name
+  limit 1;
+$$;
+
+-- Context: profile plus labelled QA pairs for the active catalog, in order.
+-- Answers stored as option values are mapped to their labels.
+-- Returns NULL when the mother does not exist.
+create or replace function majka_context_bundle(p_mother_id int, p_max_order int)
+returns jsonb
+language sql
+stable
+as $$
+  select jsonb_build_object(
+    'profile', jsonb_build_object(
+      'name', m.name,
+      'age', m.age,
+      'country', m.country,
+      'delivered_at', m.delivered_at
+    ),
+    'pairs', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'question', q.text,
+          'answer', coalesce(o.label, a.answer_text),
+          'order_index', q.order_index
+        )
+        order by q.order_index
+      )
+      from questions q
+      join answers a on a.question_id = q.id and a.mother_id = m.id
+      left join question_options o on o.question_id = q.id and o.value = a.answer_text
+      where q.is_active
+        and q.order_index <= p_max_order
+        and coalesce(a.answer_text, '') <> ''
+    ), '[]'::jsonb)
+  )
+  from mothers m
+  where m.id = p_mother_id;
+$$;
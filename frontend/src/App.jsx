@@ -6,6 +6,12 @@ import AvatarPlaceholder from "./assets/woman.png";
 const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
 const BOT_API_BASE = import.meta.env.VITE_BOT_API_URL || API_BASE;
 
+// Session tokens carry the profile fields the plan and chat prompts need.
+const authHeaders = (token) => ({
+  "Content-Type": "application/json",
+  ...(token ? { Authorization: `Bearer ${token}` } : {}),
+});
+
 const INITIAL_SIGNUP = {
   name: "",
   password: "",
@@ -26,6 +32,8 @@ function App() {
   const [loginForm, setLoginForm] = useState(INITIAL_LOGIN);
   const [motherName, setMotherName] = useState("");
   const [motherId, setMotherId] = useState(null);
+  const [sessionToken, setSessionToken] = useState(null);
+  const [sessionTtl, setSessionTtl] = useState(null);
   const [step, setStep] = useState("auth"); // auth | questions | done
   const [resumeQuestionId, setResumeQuestionId] = useState(null);
 
@@ -330,6 +338,48 @@ function App() {
     [loginForm]
   );
 
+  const applySession = (data) => {
+    setSessionToken(data?.access_token || null);
+    setSessionTtl(data?.expires_in || null);
+  };
+
+  // Refresh the session token before it expires. If that fails, drop it:
+  // the API then reads the profile itself.
+  useEffect(() => {
+    if (!sessionToken || !sessionTtl) return undefined;
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(`${API_BASE}/api/auth/refresh`, {
+          method: "POST",
+          headers: authHeaders(sessionToken),
+        });
+        if (!res.ok) throw new Error("Unable to refresh the session");
+        applySession(await res.json());
+      } catch (err) {
+        console.error(err);
+        applySession(null);
+      }
+    }, sessionTtl * 800);
+    return () => clearTimeout(timer);
+  }, [sessionToken, sessionTtl]);
+
+  // POST with the session token, retrying once without it on a 401.
+  const postWithSession = useCallback(
+    async (url, body) => {
+      const request = (token) =>
+        fetch(url, {
+          method: "POST",
+          headers: authHeaders(token),
+          body: JSON.stringify(body),
+        });
+      const res = await request(sessionToken);
+      if (res.status !== 401 || !sessionToken) return res;
+      applySession(null);
+      return request(null);
+    },
+    [sessionToken]
+  );
+
   const resetPlanState = () => {
     setPlanStructured(null);
     setPlanRaw("");
@@ -344,10 +394,8 @@ function App() {
     setPlanLoading(true);
     setPlanError("");
     try {
-      const res = await fetch(`${API_BASE}/api/recommendations`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ mother_id: motherId }),
+      const res = await postWithSession(`${API_BASE}/api/recommendations`, {
+        mother_id: motherId,
       });
       const data = await res.json();
       if (!res.ok) throw new Error(data?.detail || "Unable to generate your plan");
@@ -359,7 +407,7 @@ function App() {
     } finally {
       setPlanLoading(false);
     }
-  }, [motherId]);
+  }, [motherId, postWithSession]);
 
   const handleStartGuidedSession = useCallback(
     async (exercise) => {
@@ -414,14 +462,10 @@ function App() {
     setChatLoading(true);
     setChatError("");
     try {
-      const res = await fetch(`${BOT_API_BASE}/ask-majka`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          question: message,
-          mother_id: motherId,
-          mother_name: motherName,
-        }),
+      const res = await postWithSession(`${BOT_API_BASE}/ask-majka`, {
+        question: message,
+        mother_id: motherId,
+        mother_name: motherName,
       });
       const data = await res.json();
       if (!res.ok) {
@@ -613,6 +657,7 @@ function App() {
       const data = await res.json();
       if (!res.ok) throw new Error(data?.detail || "Unable to create your Majka profile");
       setMotherId(data.mother_id);
+      applySession(data);
       setMotherName(signupForm.name.trim());
       setResumeQuestionId(null);
       answeredCacheRef.current = new Map();
@@ -645,6 +690,7 @@ function App() {
       const data = await res.json();
       if (!res.ok) throw new Error(data?.detail || "Invalid name or password");
       setMotherId(data.mother_id);
+      applySession(data);
       setMotherName(data.profile?.name || loginForm.name.trim());
       const answeredEntries = Object.entries(data.answered_answers || {}).map(
         ([key, value]) => [Number(key), value]